@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+"""
+Sprite! — Engine Benchmarks
+Times hot paths of sprite_engine against their previous implementations
+and checks that threaded generation stays byte-identical to serial runs.
+
+Usage:
+    python3 benchmark.py            # Run every benchmark
+    python3 benchmark.py tile       # Run a single benchmark by name
+    python3 benchmark.py determinism  # Exits non-zero on any threaded/serial mismatch
+    python3 benchmark.py render     # NumPy rasterizer vs matplotlib 3D views
+    python3 benchmark.py mesh       # Mesh build, LOD chain and OBJ / PLY / GLB serializer cost
+    python3 benchmark.py animation  # Part-posed sheets vs one fresh sprite per frame
+    python3 benchmark.py noise      # fBm gradient noise vs the old zoomed random grid, plus seam checks
+    python3 benchmark.py world      # World chunk cost, cache hits and chunk-border continuity
+    python3 benchmark.py indexed    # Palette-mode PNG size / encode time and palette-table swaps
+    python3 benchmark.py palette    # One sprite into all 12 palettes vs twelve separate swaps
+    python3 benchmark.py prompt     # Keyword-index parse_prompt vs substring scans on 100k prompts
+    python3 benchmark.py pbr        # One-pass PBR derivation vs separate map functions, single and stacked
+    python3 benchmark.py metrics    # Cost of stage timers with SPRITE_METRICS on and off
+    python3 benchmark.py singleflight  # Burst of identical requests: computed each time vs shared
+"""
+
+import hashlib
+import io
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import sprite_engine as eng
+
+
+def _timeit(fn, repeat=5):
+    """Best-of-N wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+# ─────────────────────────────────────────────
+#  TILE SHADING
+# ─────────────────────────────────────────────
+
+def _legacy_tile_shade(noise, c1, c2):
+    """Per-pixel blend used by _gen_tile before vectorization."""
+    s = noise.shape[0]
+    arr = np.zeros((s, s, 3), dtype=float)
+    for y in range(s):
+        for x in range(s):
+            t = noise[y, x]
+            arr[y, x] = c1 * (1-t) + c2 * t
+    return Image.fromarray(arr.astype(np.uint8), "RGB")
+
+
+def _legacy_tilemap(info, cols, rows, tile_size=32):
+    """TilemapGenerator before tile-size rendering: a full-size tile per cell, LANCZOS-downscaled."""
+    sheet = Image.new("RGBA", (cols * tile_size, rows * tile_size))
+    for row in range(rows):
+        for col in range(cols):
+            gen = eng.SpriteGenerator(dict(info, seed=info["seed"] + row*100 + col))
+            tile = gen._gen_tile().resize((tile_size, tile_size), Image.LANCZOS)
+            sheet.paste(tile, (col * tile_size, row * tile_size))
+    return sheet
+
+
+def bench_tile():
+    print("Tile shading (_gen_tile noise blend)")
+    print(f"  {'size':>6}  {'loop ms':>10}  {'numpy ms':>10}  {'ramp6 ms':>10}  {'speedup':>8}")
+    pal = eng.get_palette("stone")
+    c1 = np.array(pal[0], dtype=float)
+    c2 = np.array(pal[1], dtype=float)
+    ramp = eng.palette_ramp(pal)
+    for s in (16, 32, 64, 128, 256, 512):
+        noise = eng.fbm_noise(s, s, scale=max(4, s//8), seed=1)
+        repeat = 1 if s >= 256 else 3
+        before = _timeit(lambda: _legacy_tile_shade(noise, c1, c2), repeat)
+        after = _timeit(lambda: Image.fromarray(
+            eng.gradient_ramp(noise, [pal[0], pal[1]]).astype(np.uint8), "RGB"))
+        multi = _timeit(lambda: Image.fromarray(
+            eng.gradient_ramp(noise, ramp).astype(np.uint8), "RGB"))
+        print(f"  {s:>6}  {before:>10.2f}  {after:>10.2f}  {multi:>10.2f}  {before/after:>7.1f}x")
+
+    print(f"\n  {'tiles':>7}  {'per-tile+LANCZOS ms':>20}  {'shared field ms':>16}")
+    for n in (4, 8, 16):
+        info = eng.parse_prompt("stone floor tile 128px")
+        info["category"] = "tile"
+        before = _timeit(lambda: _legacy_tilemap(info, n, n), 1)
+        after = _timeit(lambda: eng.TilemapGenerator(info, n, n).generate(), 3)
+        print(f"  {f'{n}x{n}':>7}  {before:>20.1f}  {after:>16.1f}")
+
+    print(f"\n  {'size':>6}  {'_gen_tile ms':>12}")
+    for s in (32, 128, 512):
+        info = eng.parse_prompt(f"stone floor tile {s}px")
+        gen = eng.SpriteGenerator(info)
+        print(f"  {s:>6}  {_timeit(gen._gen_tile):>12.2f}")
+
+
+# ─────────────────────────────────────────────
+#  NOISE
+# ─────────────────────────────────────────────
+
+def _legacy_noise(w, h, scale=8, seed=0):
+    """perlin_like_noise before the gradient-noise module: a random grid upsampled with a cubic zoom."""
+    from scipy.ndimage import zoom
+    grid = np.random.default_rng(seed).random((h // scale + 2, w // scale + 2))
+    big = zoom(grid, (h / grid.shape[0], w / grid.shape[1]), order=3)[:h, :w]
+    return (big - big.min()) / (big.max() - big.min() + 1e-9)
+
+
+def bench_noise():
+    print("Noise fields (ms)")
+    print(f"  {'size':>6}  {'zoom grid':>10}  {'fbm 1 oct':>10}  {'fbm 3 oct':>10}  {'wrap':>8}  {'warp':>8}")
+    for s in (64, 256, 1024, 2048):
+        repeat = 1 if s >= 1024 else 5
+        legacy = _timeit(lambda: _legacy_noise(s, s, 8, 1), repeat)
+        one = _timeit(lambda: eng.fbm_noise(s, s, 8, seed=1, octaves=1), repeat)
+        fbm = _timeit(lambda: eng.fbm_noise(s, s, 8, seed=1), repeat)
+        wrap = _timeit(lambda: eng.fbm_noise(s, s, 8, seed=1, wrap=True), repeat)
+        warp = _timeit(lambda: eng.fbm_noise(s, s, 8, seed=1, warp=1.5), repeat)
+        print(f"  {s:>6}  {legacy:>10.2f}  {one:>10.2f}  {fbm:>10.2f}  {wrap:>8.2f}  {warp:>8.2f}")
+
+    # Mean step across the wrap seam vs between ordinary neighbouring columns
+    n = eng.fbm_noise(256, 256, 16, seed=7, wrap=True, warp=1.0)
+    seam, inner = np.abs(n[:, 0] - n[:, -1]).mean(), np.abs(np.diff(n, axis=1)).mean()
+    left = eng.fbm_noise(128, 128, 16, seed=7)
+    right = eng.fbm_noise(128, 128, 16, seed=7, origin=(128, 0))
+    joined = eng.fbm_noise(256, 128, 16, seed=7)
+    print(f"\n  wrap seam step {seam:.4f} vs neighbour step {inner:.4f}; "
+          f"windowed == joined: {np.array_equal(np.hstack([left, right]), joined)}")
+
+
+# ─────────────────────────────────────────────
+#  WORLD CHUNKS
+# ─────────────────────────────────────────────
+
+def bench_world():
+    print("World chunks (16x16 tiles of 32px)")
+    world = eng.WorldGenerator(eng.parse_prompt("grassland terrain"))
+    cold = _timeit(lambda: world.chunk(3, -2), 3)
+    eng.world_chunk_bundle("grassland terrain", 0, 0)
+    cached = _timeit(lambda: eng.world_chunk_bundle("grassland terrain", 0, 0), 20)
+    print(f"  cold chunk {cold:.1f} ms   cached chunk {cached:.3f} ms")
+    # The shaded field across a chunk border must match one render spanning both chunks
+    a, b = (np.asarray(world.chunk(x, 0))[:, :, :3].astype(int) for x in (0, 1))
+    step = np.abs(a[:, -2] - b[:, 1]).mean()
+    inner = np.abs(np.diff(a[:, 1:-1], axis=1)).mean()
+    print(f"  step across border (2px) {step:.2f} vs mean neighbour step {inner:.2f}")
+
+
+# ─────────────────────────────────────────────
+#  INDEXED COLOUR
+# ─────────────────────────────────────────────
+
+INDEXED_PROMPTS = [
+    "pixel art warrior character fire 64px",
+    "pixel knight 512px",
+    "stone floor tile 256px",
+    "pixel lava tile 512px",
+]
+
+
+def _legacy_swap(img, old_colors, new_colors, threshold=40):
+    """swap_palette before colour matching: a full-image distance pass per swap, applied in sequence."""
+    arr = np.array(img.convert("RGBA"), dtype=np.int32)
+    for old, new in zip(old_colors, new_colors):
+        mask = np.abs(arr[:, :, :3] - np.array(old[:3])).sum(axis=2) < threshold
+        arr[mask, :3] = new[:3]
+    return Image.fromarray(arr.astype(np.uint8), "RGBA")
+
+
+def _per_pixel_swap(img, old_colors, new_colors, threshold=40):
+    """swap_palette's per-pixel path (used above 256 colours), forced for any image."""
+    rgba = np.array(img.convert("RGBA"))
+    old = np.array([c[:3] for c in old_colors], dtype=np.int16)
+    return eng._apply_swap(rgba, eng._nearest_colors(rgba, old, threshold), new_colors)
+
+
+def bench_indexed():
+    print("Indexed PNG output and palette swaps")
+    print(f"  {'prompt':<38}  {'colours':>7}  {'RGBA B':>7}  {'P B':>6}  {'RGBA ms':>8}  {'P ms':>6}  "
+          f"{'swap':>7}  {'table':>7}  {'in-mem':>7}  same")
+    for prompt in INDEXED_PROMPTS:
+        info = eng.parse_prompt(prompt)
+        img = eng.SpriteGenerator(info).generate()
+        indexed, _ = eng.SpriteGenerator(info).generate_indexed()
+        rgba_png, p_png = eng.encode_png(img), indexed.encode_png()
+        t_rgba = _timeit(lambda: eng.encode_png(eng.SpriteGenerator(info).generate()), 5)
+        t_p = _timeit(lambda: eng.SpriteGenerator(info).generate_indexed()[0].encode_png(), 5)
+        old, new = indexed.palette[:3, :3].tolist(), [(255, 0, 255)] * 3
+        t_legacy = _timeit(lambda: _legacy_swap(img, old, new), 5)
+        t_table = _timeit(lambda: eng.swap_palette(img, old, new), 5)
+        t_mem = _timeit(lambda: eng.swap_palette(indexed, old, new), 20)
+        same = np.array_equal(np.asarray(eng.swap_palette(img, old, new)),
+                              np.asarray(_per_pixel_swap(img, old, new)))
+        print(f"  {prompt:<38}  {len(indexed.palette):>7}  {len(rgba_png):>7}  {len(p_png):>6}  "
+              f"{t_rgba:>8.2f}  {t_p:>6.2f}  {t_legacy:>7.2f}  {t_table:>7.2f}  {t_mem:>7.3f}  {same}")
+
+
+def bench_palette():
+    print("Colour variants: one sprite into all 12 palettes (ms)")
+    print(f"  {'prompt':<38}  {'12 swaps (old)':>14}  {'variants cold':>13}  {'warm':>7}  {'bundle':>7}")
+    for prompt in INDEXED_PROMPTS + ["neon spaceship vehicle 128px"]:
+        img = eng.SpriteGenerator(eng.parse_prompt(prompt)).generate()
+
+        def legacy():
+            for name in eng.PALETTES:
+                old = eng.extract_dominant_colors(img, 6)
+                _legacy_swap(img, old, eng.get_palette(name))
+
+        def cold():
+            eng._dominant_colors.clear()
+            eng.palette_variants(img)
+
+        t_legacy = _timeit(legacy, 3)
+        t_cold = _timeit(cold, 3)
+        t_warm = _timeit(lambda: eng.palette_variants(img), 5)
+        t_bundle = _timeit(lambda: eng.palette_variants_bundle(img), 3)
+        print(f"  {prompt:<38}  {t_legacy:>14.2f}  {t_cold:>13.2f}  {t_warm:>7.2f}  {t_bundle:>7.2f}")
+
+
+# ─────────────────────────────────────────────
+#  PROMPT PARSING
+# ─────────────────────────────────────────────
+
+def _legacy_parse_prompt(prompt: str) -> dict:
+    """parse_prompt before the keyword index: per-call dicts and first-hit substring checks."""
+    prompt_lower = prompt.lower()
+
+    # Category detection
+    categories = {
+        "character": ["character", "hero", "enemy", "npc", "player", "warrior", "wizard", "knight",
+                      "monster", "creature", "robot", "alien", "zombie", "dragon", "boss"],
+        "tile": ["tile", "tileset", "floor", "wall", "ground", "platform", "terrain", "brick", "stone"],
+        "item": ["item", "weapon", "sword", "gun", "potion", "chest", "key", "coin", "gem", "shield", "bow"],
+        "ui": ["ui", "button", "hud", "icon", "cursor", "frame", "panel", "bar", "health", "mana"],
+        "environment": ["tree", "rock", "bush", "cloud", "mountain", "house", "castle", "dungeon", "cave", "water"],
+        "vehicle": ["car", "ship", "spaceship", "tank", "plane", "boat", "rocket"],
+        "prop": ["barrel", "crate", "table", "chair", "lamp", "door", "window", "sign", "fence", "pillar"],
+        "particle": ["particle", "explosion", "fire", "smoke", "spark", "magic", "effect", "trail"],
+        "icon": ["icon", "logo", "badge", "medal", "star", "heart", "diamond"],
+    }
+    detected_category = "character"
+    for cat, keywords in categories.items():
+        if any(k in prompt_lower for k in keywords):
+            detected_category = cat
+            break
+
+    # Style detection
+    styles = {
+        "pixel": ["pixel", "8-bit", "8bit", "16-bit", "16bit", "retro", "nes", "snes", "gameboy"],
+        "cartoon": ["cartoon", "toon", "comic", "cel", "flat", "chibi", "cute", "kawaii"],
+        "realistic": ["realistic", "realistic", "detailed", "hd", "high detail", "gritty"],
+        "neon": ["neon", "glow", "cyberpunk", "cyber", "synthwave", "glowing"],
+        "minimalist": ["minimal", "simple", "clean", "flat design", "icon style"],
+        "fantasy": ["fantasy", "magical", "medieval", "rpg", "enchanted", "arcane"],
+        "sci-fi": ["sci-fi", "scifi", "futuristic", "space", "alien", "cyber"],
+    }
+    detected_style = "pixel"
+    for sty, keywords in styles.items():
+        if any(k in prompt_lower for k in keywords):
+            detected_style = sty
+            break
+
+    # Color palette detection
+    palettes = {
+        "fire": ["fire", "flame", "lava", "hot", "red", "orange", "ember"],
+        "ice": ["ice", "frost", "frozen", "cold", "blue", "winter", "snow"],
+        "nature": ["nature", "forest", "green", "grass", "plant", "leaf", "jungle"],
+        "dark": ["dark", "shadow", "black", "night", "void", "evil", "undead", "demon"],
+        "gold": ["gold", "treasure", "rich", "yellow", "sunny", "divine"],
+        "poison": ["poison", "toxic", "purple", "venom", "acid", "swamp"],
+        "ocean": ["ocean", "water", "sea", "aqua", "cyan", "underwater"],
+        "stone": ["stone", "rock", "gray", "grey", "iron", "steel", "metal"],
+        "magic": ["magic", "arcane", "mystical", "ethereal", "enchanted", "spell"],
+    }
+    detected_palette = "magic"
+    for pal, keywords in palettes.items():
+        if any(k in prompt_lower for k in keywords):
+            detected_palette = pal
+            break
+
+    # Size detection
+    size = 64
+    if any(x in prompt_lower for x in ["128", "large"]):    size = 128
+    if any(x in prompt_lower for x in ["256", "big"]):      size = 256
+    if any(x in prompt_lower for x in ["32", "small"]):     size = 32
+    if any(x in prompt_lower for x in ["16", "tiny"]):      size = 16
+    if any(x in prompt_lower for x in ["512", "huge"]):     size = 512
+
+    # Seed from prompt for reproducibility
+    seed = int(hashlib.md5(prompt.encode()).hexdigest(), 16) % (2**32)
+
+    return {
+        "prompt": prompt,
+        "category": detected_category,
+        "style": detected_style,
+        "palette": detected_palette,
+        "size": size,
+        "seed": seed,
+    }
+
+
+def _prompt_corpus(n, seed=0):
+    """n random prompts mixing vocabulary keywords, size tokens and filler words."""
+    rng = random.Random(seed)
+    words = [kw for values in eng.PROMPT_VOCAB.values() for kws in values.values() for kw in kws]
+    words += ["cool", "the", "with", "armored", "ancient", "small", "big", "glowing", "spiky", "round"]
+    sizes = ["16px", "32px", "64px", "128", "256px", "48x48", "320px", "huge", "tiny", ""]
+    return [" ".join(rng.choices(words, k=rng.randint(2, 7)) + [rng.choice(sizes)]).strip() for _ in range(n)]
+
+
+def bench_prompt(n=100_000):
+    corpus = _prompt_corpus(n)
+    print(f"parse_prompt over {n:,} prompts")
+    legacy = _timeit(lambda: [_legacy_parse_prompt(p) for p in corpus], 3)
+    indexed = _timeit(lambda: [eng.parse_prompt(p) for p in corpus], 3)
+    print(f"  substring scan {legacy:8.1f} ms ({legacy * 1000 / n:.2f} us/prompt)")
+    print(f"  keyword index  {indexed:8.1f} ms ({indexed * 1000 / n:.2f} us/prompt)  {legacy / indexed:.1f}x")
+    old, new = [_legacy_parse_prompt(p) for p in corpus], [eng.parse_prompt(p) for p in corpus]
+    for field in ("category", "style", "palette", "size"):
+        same = sum(a[field] == b[field] for a, b in zip(old, new))
+        print(f"  {field:<9} unchanged for {same / n:6.1%}")
+
+
+# ─────────────────────────────────────────────
+#  PBR MAPS
+# ─────────────────────────────────────────────
+
+def _legacy_pbr(img, palette):
+    """Normal, emissive and roughness before derive_pbr_maps: three conversions, three blurs, float64."""
+    from scipy.ndimage import gaussian_filter
+    from PIL import ImageFilter
+    gray = np.array(img.convert("L"), dtype=float) / 255.0
+    smoothed = gaussian_filter(gray, sigma=1.5)
+    dx, dy = np.gradient(smoothed, axis=1), np.gradient(smoothed, axis=0)
+    nx, ny, nz = -dx * 4.0, dy * 4.0, np.ones_like(dx)
+    length = np.sqrt(nx**2 + ny**2 + nz**2) + 1e-8
+    normal = np.stack([((nx / length + 1) / 2 * 255).astype(np.uint8),
+                       ((ny / length + 1) / 2 * 255).astype(np.uint8),
+                       (nz / length * 255).astype(np.uint8)], axis=2)
+    arr = np.array(img.convert("RGBA"), dtype=np.float32)
+    glow = np.zeros((arr.shape[0], arr.shape[1], 3), dtype=np.uint8)
+    for col in palette[:2]:
+        glow[np.abs(arr[:, :, :3] - np.array(col[:3], dtype=np.float32)).sum(axis=2) < 80] = col[:3]
+    emissive = Image.fromarray(glow, "RGB").filter(ImageFilter.GaussianBlur(radius=2))
+    rough = gaussian_filter(np.array(img.convert("L"), dtype=np.float32), sigma=2)
+    rough = (rough - rough.min()) / (rough.max() - rough.min() + 1e-8) * 255
+    return Image.fromarray(normal, "RGB"), emissive, Image.fromarray(rough.astype(np.uint8), "L")
+
+
+def bench_pbr():
+    print("PBR maps: normal + emissive + roughness (ms)")
+    print(f"  {'sprites':<16}  {'legacy':>8}  {'derive 3':>8}  {'derive 5':>8}  max diff")
+    for prompt, n in (("pixel art warrior character fire 64px", 1), ("stone floor tile 256px", 1),
+                      ("pixel knight 512px", 1), ("pixel art warrior character fire 64px", 32),
+                      ("pixel gem item 32px", 64)):
+        info = eng.parse_prompt(prompt)
+        img = eng.SpriteGenerator(info).generate()
+        palette = eng.get_palette(info["palette"])
+        stack = np.stack([np.asarray(img)] * n)
+        legacy = _timeit(lambda: [_legacy_pbr(img, palette) for _ in range(n)], 3)
+        three = _timeit(lambda: eng.derive_pbr_maps(stack, [palette], ("normal", "emissive", "roughness")), 3)
+        five = _timeit(lambda: eng.derive_pbr_maps(stack, [palette]), 3)
+        new = eng.derive_pbr_maps(img, palette)
+        diff = max(np.abs(np.asarray(a, dtype=int) - np.asarray(new[m], dtype=int)).max()
+                   for a, m in zip(_legacy_pbr(img, palette), ("normal", "emissive", "roughness")))
+        label = f"{n} x {info['size']}px"
+        print(f"  {label:<16}  {legacy:>8.2f}  {three:>8.2f}  {five:>8.2f}  {diff}")
+
+
+# ─────────────────────────────────────────────
+#  METRICS OVERHEAD
+# ─────────────────────────────────────────────
+
+def bench_metrics(calls=100_000):
+    print("Stage timer overhead")
+    enabled = eng.METRICS.enabled
+
+    def spans():
+        for _ in range(calls):
+            with eng.span("bench"):
+                pass
+
+    try:
+        for state in (False, True):
+            eng.METRICS.enabled = state
+            per_span = _timeit(spans, 3) * 1000 / calls
+            parse = _timeit(lambda: [eng.parse_prompt("pixel art warrior fire 64px") for _ in range(10_000)], 3) / 10
+            sprite = _timeit(lambda: eng.sprite_bundle.__wrapped__("pixel art warrior character fire 64px"), 20)
+            print(f"  metrics {'on ' if state else 'off'}  span {per_span:6.3f} us   "
+                  f"parse_prompt {parse:6.2f} us   sprite bundle {sprite:6.3f} ms")
+    finally:
+        eng.METRICS.enabled = enabled
+        eng.METRICS.reset()
+
+
+# ─────────────────────────────────────────────
+#  SINGLE-FLIGHT (identical concurrent requests)
+# ─────────────────────────────────────────────
+
+SINGLEFLIGHT_CALLS = [
+    ("sprite", eng.sprite_bundle, ("Pixel Art Warrior fire 128px",)),
+    ("tilemap", eng.tilemap_bundle, ("stone floor tile 32px", 8, 8, True)),
+    ("animation", eng.animation_bundle, ("walk cycle knight 64px", 8)),
+]
+
+
+def bench_singleflight(clients=8):
+    """`clients` threads ask for the same asset at once, cache off: every call computes vs one shared call."""
+    print(f"Single-flight ({clients} concurrent identical requests, result cache off)")
+    max_bytes = eng.RESULT_CACHE.max_bytes
+    eng.RESULT_CACHE.max_bytes = 0
+    try:
+        for label, fn, args in SINGLEFLIGHT_CALLS:
+            def run(call):
+                start = threading.Barrier(clients)
+
+                def client(_):
+                    start.wait()
+                    return call(*args)
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    return list(pool.map(client, range(clients)))
+
+            naive = _timeit(lambda: run(fn.__wrapped__), 3)
+            before = eng.IN_FLIGHT.stats()["leaders"]
+            shared = _timeit(lambda: run(fn), 3)
+            computed = (eng.IN_FLIGHT.stats()["leaders"] - before) / 3
+            same = all(b.files == fn.__wrapped__(*args).files for b in run(fn))
+            print(f"  {label:<10} every call {naive:>8.1f} ms   single-flight {shared:>8.1f} ms   "
+                  f"{naive / shared:5.1f}x   {computed:.1f} computed/burst   same={same}")
+    finally:
+        eng.RESULT_CACHE.max_bytes = max_bytes
+
+
+# ─────────────────────────────────────────────
+#  DETERMINISM (threaded vs serial)
+# ─────────────────────────────────────────────
+
+DETERMINISM_PROMPTS = [
+    "pixel art warrior character fire 64px", "stone floor tile 32px", "health potion item",
+    "neon spaceship vehicle 128px", "explosion particle effect", "star icon gold",
+    "wooden crate prop", "cartoon tree environment", "ui health heart", "zombie enemy dark 16px",
+]
+
+
+def _render_png(prompt):
+    img = eng.SpriteGenerator(eng.parse_prompt(prompt)).generate()
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _render_tilemap(prompt):
+    info = eng.parse_prompt(prompt)
+    info["category"] = "tile"
+    buf = io.BytesIO()
+    eng.TilemapGenerator(info, 3, 3).generate().save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _rgba(png):
+    return np.asarray(Image.open(io.BytesIO(png)).convert("RGBA"))
+
+
+def _sprite_paths(prompt):
+    """The same sprite through every public path: generator, render_sprite, sprite bundle, pack bundle."""
+    return {
+        "generate": np.asarray(eng.SpriteGenerator(eng.parse_prompt(prompt)).generate().convert("RGBA")),
+        "render_sprite": eng.render_sprite(prompt, as_array=True),
+        "sprite_bundle": _rgba(eng.sprite_bundle.__wrapped__(prompt).data("sprite.png")),
+        "pack_bundle": _rgba(eng.pack_bundle.__wrapped__(prompt).data("sprite.png")),
+    }
+
+
+def bench_determinism(rounds=8, threads=8):
+    """Generate every prompt serially, then `rounds` times across threads; outputs must be byte-identical."""
+    print(f"Determinism ({len(DETERMINISM_PROMPTS)} prompts x {rounds} rounds on {threads} threads)")
+    failures = 0
+    for label, render in (("sprite", _render_png), ("tilemap", _render_tilemap)):
+        serial = [render(p) for p in DETERMINISM_PROMPTS]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            parallel = list(pool.map(render, DETERMINISM_PROMPTS * rounds))
+        elapsed = (time.perf_counter() - t0) * 1000
+        bad = [DETERMINISM_PROMPTS[i % len(DETERMINISM_PROMPTS)]
+               for i, png in enumerate(parallel) if png != serial[i % len(serial)]]
+        failures += len(bad)
+        status = "OK" if not bad else f"MISMATCH: {sorted(set(bad))}"
+        print(f"  {label:<8} {len(parallel):>4} renders  {elapsed:>8.1f} ms  {status}")
+    # Indexed and RGBA encodings, cached pipelines and plain renders must all agree
+    bad = []
+    for prompt in DETERMINISM_PROMPTS + ["cartoon slime enemy", "neon wizard character 128px"]:
+        paths = _sprite_paths(prompt)
+        bad += [f"{prompt} ({name})" for name, arr in paths.items()
+                if not np.array_equal(arr, paths["generate"])]
+    failures += len(bad)
+    print(f"  {'paths':<8} {'4 per prompt':>13}  {'':>11}  {'OK' if not bad else 'MISMATCH: ' + ', '.join(bad)}")
+    if failures:
+        sys.exit(1)
+
+
+# ─────────────────────────────────────────────
+#  3D VIEW RENDERING (raster vs matplotlib)
+# ─────────────────────────────────────────────
+
+RENDER_PROMPTS = ["knight character", "red sports car vehicle", "oak tree environment", "treasure chest prop"]
+
+
+def bench_render():
+    print("3D view renders (4 views + PNG encode per call)")
+    print(f"  {'prompt':<24}  {'tris':>5}  {'matplotlib ms':>14}  {'raster ms':>10}  {'speedup':>8}")
+    for prompt in RENDER_PROMPTS:
+        gen = eng.Asset3DGenerator(eng.parse_prompt(prompt))
+        mesh = gen.build_mesh()
+        try:
+            before = _timeit(lambda: gen._render_views_matplotlib(mesh), 3)
+        except ImportError:
+            before = float("nan")
+        after = _timeit(lambda: gen._render_views_raster(mesh))
+        print(f"  {prompt:<24}  {len(mesh.faces):>5}  {before:>14.1f}  {after:>10.1f}  {before/after:>7.1f}x")
+
+    print(f"\n  {'size':>6}  {'ortho ms':>9}  {'persp ms':>9}   (single view, 2x supersampled)")
+    mesh = eng.Asset3DGenerator(eng.parse_prompt("knight character")).build_mesh()
+    V, F = mesh.vertices, mesh.faces
+    rgb = np.full((len(F), 3), 200.0)
+    for size in (128, 240, 512, 1024):
+        ortho = _timeit(lambda: eng.rasterize_mesh(V, F, rgb, size=size))
+        persp = _timeit(lambda: eng.rasterize_mesh(V, F, rgb, size=size, perspective=True))
+        print(f"  {size:>6}  {ortho:>9.2f}  {persp:>9.2f}")
+
+
+def bench_mesh():
+    print("Mesh build + serializers (µs per call)")
+    print(f"  {'prompt':<24}  {'build':>7}  {'lods':>7}  {'obj':>7}  {'ply':>7}  {'glb':>7}"
+          f"  {'obj KB':>7}  {'ply KB':>7}  {'glb KB':>7}  LOD0-3 triangles")
+    for prompt in RENDER_PROMPTS:
+        gen = eng.Asset3DGenerator(eng.parse_prompt(prompt))
+        mesh = gen.build_mesh()
+        lods = gen.build_lods(mesh)
+        build = _timeit(gen.build_mesh) * 1000
+        lod = _timeit(lambda: gen.build_lods(mesh)) * 1000
+        obj = _timeit(lambda: gen.generate_obj(mesh)) * 1000
+        ply = _timeit(lambda: gen.generate_ply(mesh)) * 1000
+        glb = _timeit(lambda: gen.generate_glb(mesh, lods=lods)) * 1000
+        sizes = [len(gen.generate_obj(mesh)) / 1024, len(gen.generate_ply(mesh)) / 1024,
+                 len(gen.generate_glb(mesh, lods=lods)) / 1024]
+        print(f"  {prompt:<24}  {build:>7.0f}  {lod:>7.0f}  {obj:>7.0f}  {ply:>7.0f}  {glb:>7.0f}  "
+              + "  ".join(f"{kb:>7.1f}" for kb in sizes) + "  " + "/".join(str(len(m.faces)) for m in lods))
+
+
+ANIMATION_PROMPTS = ["pixel warrior character fire 64px", "neon wizard character", "cartoon hero character",
+                     "health potion item"]
+
+
+def bench_animation(frames=8):
+    print(f"Animation sheets ({frames} frames, ms per sheet)")
+    cycles = list(eng.ANIMATION_CYCLES)
+    print(f"  {'prompt':<34}  {'sprite':>7}  {'reseed':>7}  " + "  ".join(f"{c:>7}" for c in cycles))
+    for prompt in ANIMATION_PROMPTS:
+        info = eng.parse_prompt(prompt)
+        one = _timeit(eng.SpriteGenerator(dict(info, size=min(info["size"], 64))).generate, 10)
+        reseed = _timeit(eng.AnimationGenerator(info, frames, mode="reseed").generate, 10)
+        parts = [_timeit(eng.AnimationGenerator(info, frames, c).generate, 10) for c in cycles]
+        print(f"  {prompt:<34}  {one:>7.2f}  {reseed:>7.2f}  " + "  ".join(f"{t:>7.2f}" for t in parts))
+
+
+BENCHMARKS = {
+    "tile": bench_tile,
+    "determinism": bench_determinism,
+    "render": bench_render,
+    "mesh": bench_mesh,
+    "animation": bench_animation,
+    "noise": bench_noise,
+    "world": bench_world,
+    "indexed": bench_indexed,
+    "palette": bench_palette,
+    "prompt": bench_prompt,
+    "pbr": bench_pbr,
+    "metrics": bench_metrics,
+    "singleflight": bench_singleflight,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (choose from {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
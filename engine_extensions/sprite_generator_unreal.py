@@ -14,11 +14,15 @@ import urllib.request
 import urllib.error
 import json
 import os
-import base64
+import struct
 import tempfile
+import time
 
 SPRITE_SERVER = "http://localhost:7777"
 CONTENT_PATH  = "/Game/GeneratedSprites/"
+JOB_TIMEOUT   = 600   # seconds a background job may take before we give up
+POLL_INTERVAL = 0.5
+BUNDLE_TYPE   = "application/x-sprite-bundle"
 
 # ─── MENU ENTRY ─────────────────────────────────────────────
 menus = unreal.ToolMenus.get()
@@ -55,6 +59,87 @@ def generate_sprite(prompt: str, asset_type: str = "sprite") -> dict:
         return {}
 
 
+def _request(path: str, payload: dict = None, accept: str = "application/json", timeout: float = 10) -> bytes:
+    """One short HTTP call to the Sprite! server; POSTs JSON when payload is given."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(f"{SPRITE_SERVER}{path}", data=data,
+                                  headers={"Content-Type": "application/json", "Accept": accept},
+                                  method="POST" if data is not None else "GET")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+
+def run_job(job_type: str, params: dict, accept: str = BUNDLE_TYPE) -> bytes:
+    """
+    Run a generation as a server-side background job and return the result body.
+    Each HTTP call is short, so large packs, ZIPs and batches never hit a socket timeout.
+    Shows a cancellable progress dialog; returns b"" on failure or cancel.
+    """
+    try:
+        job = json.loads(_request("/api/jobs", dict(params, type=job_type)))
+    except urllib.error.URLError as e:
+        unreal.log_error(f"[Sprite!] Server error: {e}. Is server.py running?")
+        return b""
+    deadline = time.time() + JOB_TIMEOUT
+    with unreal.ScopedSlowTask(1, f"Sprite! generating {job_type}...") as task:
+        task.make_dialog(True)
+        while job["status"] not in ("done", "failed"):
+            if task.should_cancel() or time.time() > deadline:
+                unreal.log_warning(f"[Sprite!] Gave up waiting for job {job['id']}")
+                return b""
+            time.sleep(POLL_INTERVAL)
+            task.enter_progress_frame(0, f"Sprite! {job_type}: {job['status']}")
+            try:
+                job = json.loads(_request(f"/api/jobs/{job['id']}"))
+            except urllib.error.URLError as e:
+                unreal.log_error(f"[Sprite!] Lost job {job['id']}: {e}")
+                return b""
+    if job["status"] == "failed":
+        unreal.log_error(f"[Sprite!] Job failed: {job.get('error')}")
+        return b""
+    try:
+        return _request(job["result"], accept=accept, timeout=60)
+    except urllib.error.URLError as e:
+        unreal.log_error(f"[Sprite!] Could not fetch result of job {job['id']}: {e}")
+        return b""
+
+
+def _parse_bundle(data: bytes) -> dict:
+    """Split an application/x-sprite-bundle body into {filename: bytes}."""
+    if data[:4] != b"SPRB":
+        unreal.log_error("[Sprite!] Unexpected response (server too old for bundles?)")
+        return {}
+    _, count = struct.unpack_from("<BH", data, 4)
+    pos, files = 7, {}
+    for _ in range(count):
+        (n,) = struct.unpack_from("<H", data, pos); pos += 2
+        name = data[pos:pos+n].decode("utf-8"); pos += n
+        (t,) = struct.unpack_from("<H", data, pos); pos += 2 + t
+        (size,) = struct.unpack_from("<I", data, pos); pos += 4
+        files[name] = data[pos:pos+size]; pos += size
+    files["meta.json"] = json.loads(files["meta.json"])
+    return files
+
+
+def fetch_bundle(prompt: str, asset_type: str = "sprite") -> dict:
+    """
+    Call Sprite! server asking for the binary bundle (no base64).
+    Returns {filename: bytes}; "meta.json" is already decoded to a dict.
+    """
+    try:
+        data = _request(f"/api/generate/{asset_type}", {"prompt": prompt}, accept=BUNDLE_TYPE, timeout=30)
+    except urllib.error.URLError as e:
+        unreal.log_error(f"[Sprite!] Server error: {e}. Is server.py running?")
+        return {}
+    return _parse_bundle(data)
+
+
+def fetch_bundle_job(prompt: str, asset_type: str = "pack") -> dict:
+    """fetch_bundle for slow asset types: runs as a background job instead of one long request."""
+    data = run_job(asset_type, {"prompt": prompt})
+    return _parse_bundle(data) if data else {}
+
+
 def import_sprite(prompt: str, name: str = None, size: int = 64) -> str:
     """
     Generate a sprite and import it into Unreal's Content Browser.
@@ -63,13 +148,12 @@ def import_sprite(prompt: str, name: str = None, size: int = 64) -> str:
     full_prompt = f"{prompt} {size}px"
     unreal.log(f"[Sprite!] Generating: {full_prompt}")
 
-    data = generate_sprite(full_prompt)
-    if not data.get("image_b64"):
+    files = fetch_bundle(full_prompt)
+    img_bytes = files.get("sprite.png")
+    if not img_bytes:
         unreal.log_error("[Sprite!] No image data returned")
         return ""
 
-    # Decode PNG
-    img_bytes = base64.b64decode(data["image_b64"])
     safe_name = (name or prompt.replace(" ", "_"))[:30]
     tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
     tmp.write(img_bytes); tmp.close()
@@ -93,12 +177,13 @@ def import_sprite(prompt: str, name: str = None, size: int = 64) -> str:
 
 def import_pack(prompt: str) -> dict:
     """Generate and import a full asset pack (sprite + normal + emissive)."""
-    data = generate_sprite(prompt + " 64px", "pack")
+    files = fetch_bundle_job(prompt + " 64px", "pack")
     results = {}
-    maps = [("sprite","_base"), ("normal","_normal"), ("emissive","_emissive")]
-    for key, suffix in maps:
-        if not data.get(key): continue
-        img_bytes = base64.b64decode(data[key])
+    maps = [("sprite","sprite.png","_base"), ("normal","normal_map.png","_normal"),
+            ("emissive","emissive_map.png","_emissive")]
+    for key, filename, suffix in maps:
+        img_bytes = files.get(filename)
+        if not img_bytes: continue
         safe_name = prompt.replace(" ","_")[:20] + suffix
         tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
         tmp.write(img_bytes); tmp.close()
@@ -116,6 +201,30 @@ def import_pack(prompt: str) -> dict:
     return results
 
 
+def import_model(prompt: str, name: str = None) -> str:
+    """Generate a 3D asset and import its GLB (mesh + PBR textures) in one step."""
+    files = fetch_bundle_job(prompt, "3d")
+    glb = files.get("model.glb")
+    if not glb:
+        unreal.log_error("[Sprite!] No model returned")
+        return ""
+    safe_name = (name or prompt.replace(" ", "_"))[:30]
+    tmp = tempfile.NamedTemporaryFile(suffix=".glb", delete=False)
+    tmp.write(glb); tmp.close()
+    task = unreal.AssetImportTask()
+    task.path             = tmp.name
+    task.destination_path = CONTENT_PATH
+    task.destination_name = safe_name
+    task.replace_existing = True
+    task.automated        = True
+    task.save             = True
+    unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([task])
+    os.unlink(tmp.name)
+    full_path = f"{CONTENT_PATH}{safe_name}"
+    unreal.log(f"[Sprite!] ✓ Imported model: {full_path}")
+    return full_path
+
+
 def open_browser():
     """Open the Sprite! web UI in the default browser."""
     import webbrowser
@@ -123,20 +232,26 @@ def open_browser():
 
 
 def generate_batch(prompts: list) -> list:
-    """Generate multiple sprites at once."""
-    url = f"{SPRITE_SERVER}/api/addon/batch"
-    payload = json.dumps({"prompts": prompts}).encode("utf-8")
-    req = urllib.request.Request(url, data=payload,
-                                  headers={"Content-Type":"application/json"},
-                                  method="POST")
+    """Generate multiple sprites at once (as a background job, so big batches don't time out)."""
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            return json.loads(resp.read().decode("utf-8")).get("results",[])
+        data = run_job("batch", {"prompts": prompts}, accept="application/json")
+        return json.loads(data.decode("utf-8")).get("results", []) if data else []
     except Exception as e:
         unreal.log_error(f"[Sprite!] Batch error: {e}")
         return []
 
 
+def download_zip(prompt: str, path: str) -> str:
+    """Build the full asset ZIP as a background job and save it to path. Returns path or ""."""
+    data = run_job("zip", {"prompt": prompt}, accept="application/zip")
+    if not data:
+        return ""
+    with open(path, "wb") as f:
+        f.write(data)
+    unreal.log(f"[Sprite!] ✓ Saved {path}")
+    return path
+
+
 # ─── QUICK START ────────────────────────────────────────────
 unreal.log("=" * 50)
 unreal.log("  Sprite! — Game Asset Generator loaded!")
@@ -144,5 +259,7 @@ unreal.log(f"  Server: {SPRITE_SERVER}")
 unreal.log("  Usage:")
 unreal.log("    import_sprite('pixel warrior fire 64px')")
 unreal.log("    import_pack('wizard ice magic')")
+unreal.log("    import_model('knight character')")
+unreal.log("    download_zip('dragon boss', 'C:/tmp/dragon.zip')")
 unreal.log("    open_browser()")
 unreal.log("=" * 50)
@@ -7,6 +7,7 @@ Usage:
     python3 run.py              # Start server on http://localhost:7777
     python3 run.py --port 8080  # Custom port
     python3 run.py --no-browser # Don't auto-open browser
+    python3 run.py --mode process --workers 8   # Concurrency mode (single/thread/process)
 """
 
 import sys
@@ -23,8 +24,9 @@ def check_deps():
     except ImportError: missing.append("numpy")
     try: import scipy
     except ImportError: missing.append("scipy")
-    try: import matplotlib
-    except ImportError: missing.append("matplotlib")
+    if os.environ.get("SPRITE_RENDER_BACKEND") == "matplotlib":
+        try: import matplotlib
+        except ImportError: print("ℹ  matplotlib not installed — 3D views use the built-in rasterizer")
     if missing:
         print(f"\n⚠  Missing packages: {', '.join(missing)}")
         print(f"   Run: pip install {' '.join(missing)}")
@@ -44,6 +46,10 @@ def main():
             port = int(sys.argv[i+2])
         if arg == "--no-browser":
             open_browser_flag = False
+        if arg == "--mode" and i+2 <= len(sys.argv[1:]):
+            os.environ["SPRITE_MODE"] = sys.argv[i+2]
+        if arg == "--workers" and i+2 <= len(sys.argv[1:]):
+            os.environ["SPRITE_WORKERS"] = sys.argv[i+2]
 
     print("""
 ╔══════════════════════════════════════════════════╗
@@ -7,20 +7,339 @@ Then open: http://localhost:7777
 
 import os
 import sys
+import re
 import json
-import base64
-import io
+import time
+import functools
 import urllib.parse
 import traceback
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(__file__))
 import sprite_engine as eng
 
+MAX_BATCH_PROMPTS = 500
+MAX_ATLAS_PROMPTS = 256
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JOB_PATH_RE = re.compile(r"^/api/jobs/([0-9a-f]+)(/result|/events)?$")
+JOB_HEARTBEAT = 15  # seconds between keep-alive comments on an idle event stream
+MAX_EVENT_STREAMS = 64
+
+
+class BadRequest(ValueError):
+    """Invalid request parameters; answered with 400."""
+
+
+def _int(data, key, default, minimum=None, maximum=None):
+    """
+    data[key] as an int (default when absent); BadRequest if it isn't one or is below
+    minimum. Values above maximum are clamped to it, as the engine would, so they
+    share one cache key.
+    """
+    value = data.get(key, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"{key} must be an integer, got {value!r}") from None
+    if minimum is not None and value < minimum:
+        raise BadRequest(f"{key} must be at least {minimum}, got {value}")
+    return value if maximum is None else min(value, maximum)
+
+
+def _choice(data, key, choices, default=None):
+    """data[key] if it is one of choices (default when absent or empty); BadRequest otherwise."""
+    value = data.get(key) or default
+    if value is not None and (not isinstance(value, str) or value not in choices):
+        raise BadRequest(f'{key} must be one of: {", ".join(choices)}, got {value!r}')
+    return value
+
+
+def _prompts(data, default):
+    """The non-empty "prompts" list of a batch/atlas request."""
+    prompts = data.get("prompts", default)
+    if not isinstance(prompts, list) or not prompts or not all(isinstance(p, str) for p in prompts):
+        raise BadRequest("prompts must be a non-empty list of strings")
+    return prompts
+
+
+def _pbr_maps(data):
+    """The optional "maps" list of a batch/atlas request."""
+    maps = data.get("maps", [])
+    if maps == "all":
+        return list(eng.PBR_MAPS)
+    if not isinstance(maps, list) or any(m not in eng.PBR_MAPS for m in maps):
+        raise BadRequest(f'maps must be "all" or a list from: {", ".join(eng.PBR_MAPS)}')
+    return maps
+
+
+def _atlas_layout(data):
+    return {"padding": _int(data, "padding", 2, 0), "trim": bool(data.get("trim", False)),
+            "rotate": bool(data.get("rotate", False)), "pot": bool(data.get("pot", False)),
+            "max_size": _int(data, "max_size", 2048, 1)}
+
+
+# Request body -> (engine function, *args), shared by the direct endpoints and /api/jobs
+ENGINE_CALLS = {
+    "sprite": lambda d: (eng.sprite_bundle, d.get("prompt", "pixel character")),
+    "3d": lambda d: (eng.asset3d_bundle, d.get("prompt", "character")),
+    "tilemap": lambda d: (eng.tilemap_bundle, d.get("prompt", "stone floor tile"),
+                          _int(d, "cols", 4, 1, eng.TILEMAP_MAX_CELLS), _int(d, "rows", 4, 1, eng.TILEMAP_MAX_CELLS),
+                          bool(d.get("wrap", False)), bool(d.get("autotile", False))),
+    "animation": lambda d: (eng.animation_bundle, d.get("prompt", "walk cycle character"),
+                            _int(d, "frames", 8, 1), _choice(d, "cycle", eng.ANIMATION_CYCLES),
+                            _choice(d, "mode", eng.ANIMATION_MODES, "parts")),
+    "pack": lambda d: (eng.pack_bundle, d.get("prompt", "character")),
+    "iconset": lambda d: (eng.iconset_bundle, d.get("prompt", "star icon")),
+    "atlas": lambda d: (eng.prompt_atlas_bundle,
+                        _prompts(d, ["warrior", "wizard", "archer", "knight"])[:MAX_ATLAS_PROMPTS],
+                        _pbr_maps(d), _atlas_layout(d)),
+    "batch": lambda d: (eng.generate_batch, _prompts(d, [])[:MAX_BATCH_PROMPTS], None, _pbr_maps(d)),
+    "zip": lambda d: (eng.build_download_zip, d.get("prompt", "game asset"), d.get("include_3d", True)),
+}
+
+# These spread their prompts over the process pool themselves, so they always run in-process
+_SELF_POOLED = (eng.generate_batch, eng.prompt_atlas_bundle)
+
+
+def _negotiate(accept, offers):
+    """
+    The offer (a media type from `offers`, most preferred first) with the highest
+    q in an Accept header. Each offer takes the q of its most specific matching
+    range; q=0 excludes it. Ties and an empty or unmatched header go to offers[0].
+    """
+    ranges = {}
+    for part in (accept or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        if not media:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        ranges[media.lower()] = q
+    best, best_q = offers[0], 0.0
+    for offer in offers:
+        for media in (offer, offer.split("/")[0] + "/*", "*/*"):
+            if media in ranges:
+                if ranges[media] > best_q:
+                    best, best_q = offer, ranges[media]
+                break
+    return best
+
+
+def _zip_disposition(prompt):
+    safe_name = prompt[:30].replace(" ", "_").replace("/", "")
+    return f'attachment; filename="sprite_{safe_name}.zip"'
+
+
+class JobsFull(Exception):
+    """Every retained job is still queued or running."""
+
+
+class Job:
+    """One background generation. Every state change bumps `version` and wakes waiters."""
+
+    def __init__(self, job_id, kind, args, key):
+        self.id = job_id
+        self.kind = kind
+        self.args = args
+        self.key = key
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.nbytes = 0
+        self.error = None
+        self.created = time.time()
+        self.started = self.finished = None
+        self.version = 0
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def update(self, **fields):
+        with self._changed:
+            for k, v in fields.items():
+                setattr(self, k, v)
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait(self, version, timeout=None) -> int:
+        """Block until the job changes past `version` (or timeout); returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def to_json(self) -> dict:
+        with self._changed:
+            out = {"id": self.id, "type": self.kind, "status": self.status, "progress": dict(self.progress),
+                   "created": self.created, "started": self.started, "finished": self.finished}
+            if self.error is not None:
+                out["error"] = self.error
+            if self.status == "done":
+                out["result"] = f"/api/jobs/{self.id}/result"
+            return out
+
+
+def _result_bytes(result) -> int:
+    """Approximate size of a finished job's result."""
+    if isinstance(result, bytes):
+        return len(result)
+    if isinstance(result, eng.AssetBundle):
+        return sum(len(data) for _, _, data in result.files)
+    return len(json.dumps(result))
+
+
+class JobQueue:
+    """
+    Background jobs on their own worker threads. Identical in-flight submissions
+    share one job; finished jobs are kept for `ttl` seconds, at most `max_jobs`
+    of them and `max_bytes` of results in all.
+    """
+
+    def __init__(self, runner, workers=2, ttl=600, max_jobs=256, max_bytes=256 * 2**20):
+        self._runner = runner  # (job, fn, args) -> result
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.max_jobs = max(1, max_jobs)
+        self.max_bytes = max_bytes
+        self.coalesced = 0
+        self._jobs = OrderedDict()  # id -> Job, oldest first
+        self._inflight = {}         # key -> Job
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sprite-job")
+
+    def submit(self, kind, fn, args) -> tuple:
+        """Queue fn(*args); returns (job, coalesced)."""
+        key = json.dumps([kind, args], sort_keys=True, default=str)
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None:
+                self.coalesced += 1
+                return job, True
+            self._purge(room=1)
+            if len(self._jobs) >= self.max_jobs:
+                raise JobsFull()
+            job = Job(os.urandom(8).hex(), kind, args, key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+        self._pool.submit(self._run, job, fn, args)
+        return job, False
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args):
+        job.update(status="running", started=time.time())
+        try:
+            result = self._runner(job, fn, args)
+        except Exception as e:
+            print(f"[ERROR] job {job.id}: {e}\n{traceback.format_exc()}")
+            fields = {"status": "failed", "error": str(e)}
+        else:
+            nbytes = _result_bytes(result)
+            if nbytes > self.max_bytes:
+                fields = {"status": "failed",
+                          "error": f"Result of {nbytes} bytes is over the {self.max_bytes}-byte job result limit"}
+            else:
+                fields = {"status": "done", "result": result, "nbytes": nbytes}
+        with self._lock:
+            self._inflight.pop(job.key, None)
+            job.update(finished=time.time(), **fields)
+            self._purge()
+
+    def _purge(self, room=0):
+        """
+        Drop expired results, then the oldest finished jobs until `room` more jobs
+        fit and the results held fit in max_bytes. Caller holds _lock.
+        """
+        now = time.time()
+        finished = [j for j in self._jobs.values() if j.done]
+        held = sum(j.nbytes for j in finished)
+        for job in finished:
+            if now - job.finished > self.ttl or len(self._jobs) + room > self.max_jobs or held > self.max_bytes:
+                del self._jobs[job.id]
+                held -= job.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {s: 0 for s in ("queued", "running", "done", "failed")}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {"workers": self.workers, "ttl": self.ttl, "max_jobs": self.max_jobs,
+                    "result_bytes": sum(j.nbytes for j in self._jobs.values() if j.done),
+                    "max_bytes": self.max_bytes, "coalesced": self.coalesced, **counts}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+class _CountingWriter:
+    """Wraps a handler's wfile, counting bytes written."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        return self._raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def _instrumented(method):
+    """Record latency, status, bytes out and in-flight count of a do_* handler in eng.METRICS."""
+    @functools.wraps(method)
+    def wrapper(self):
+        metrics = eng.METRICS
+        if not metrics.enabled or not isinstance(self.wfile, _CountingWriter):
+            return method(self)
+        self._status = None
+        sent = self.wfile.written
+        metrics.inc("sprite_requests_in_flight", 1)
+        start = time.perf_counter()
+        try:
+            return method(self)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.inc("sprite_requests_in_flight", -1)
+            # Unknown paths share one label so scanners cannot blow up the series count
+            path = self.path.split("?")[0].rstrip("/") or "/"
+            job_path = JOB_PATH_RE.match(path)
+            if job_path:
+                path = "/api/jobs/{id}" + (job_path.group(2) or "")
+            endpoint = "other" if self._status in (None, 404) else path
+            metrics.observe("sprite_request_duration_seconds", elapsed, endpoint=endpoint, method=self.command)
+            metrics.inc("sprite_requests_total", endpoint=endpoint, method=self.command, status=str(self._status))
+            metrics.inc("sprite_response_bytes_total", self.wfile.written - sent, endpoint=endpoint)
+    return wrapper
+
 
 class SpriteHandler(BaseHTTPRequestHandler):
 
+    def setup(self):
+        super().setup()
+        if eng.METRICS.enabled:
+            self.wfile = _CountingWriter(self.wfile)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
     def log_message(self, fmt, *args):
         print(f"[Sprite!] {self.address_string()} {fmt % args}")
 
@@ -37,17 +356,48 @@ class SpriteHandler(BaseHTTPRequestHandler):
     def _send_json(self, data, code=200):
         self._send(code, "application/json", json.dumps(data))
 
+    def _send_bundle(self, bundle):
+        """Encode an AssetBundle per the Accept header; base64-in-JSON stays the default."""
+        offers = ["application/json", eng.BUNDLE_CONTENT_TYPE, "multipart/mixed"]
+        if bundle.first_image():
+            offers.append("image/png")
+        fmt = _negotiate(self.headers.get("Accept", ""), offers)
+        if fmt == eng.BUNDLE_CONTENT_TYPE:
+            self._send(200, eng.BUNDLE_CONTENT_TYPE, bundle.to_container())
+        elif fmt == "multipart/mixed":
+            boundary = "sprite-" + os.urandom(8).hex()
+            self._send(200, f"multipart/mixed; boundary={boundary}", bundle.to_multipart(boundary))
+        elif fmt == "image/png":
+            name, png = bundle.first_image()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", len(png))
+            self.send_header("Content-Disposition", f'inline; filename="{name}"')
+            self.send_header("X-Sprite-Meta", json.dumps(bundle.meta, separators=(",", ":")))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Expose-Headers", "X-Sprite-Meta")
+            self.end_headers()
+            self.wfile.write(png)
+        else:
+            self._send_json(bundle.to_json())
+
+    def _engine(self, fn, *args):
+        """Run a sprite_engine call inline or on the server's process pool."""
+        return self.server.run_engine(fn, *args)
+
     def _read_body(self):
         length = int(self.headers.get("Content-Length", 0))
         return self.rfile.read(length).decode("utf-8") if length else ""
 
+    @_instrumented
     def do_OPTIONS(self):
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, Accept")
         self.end_headers()
 
+    @_instrumented
     def do_GET(self):
         path = self.path.split("?")[0].rstrip("/")
 
@@ -60,10 +410,36 @@ class SpriteHandler(BaseHTTPRequestHandler):
         elif path == "/api/styles":
             self._api_styles()
         elif path == "/api/health":
-            self._send_json({"status": "ok", "version": "1.0", "app": "Sprite!"})
+            self._send_json({"status": "ok", "version": "1.0", "app": "Sprite!",
+                             "server": self.server.stats(), "cache": eng.cache_stats("result"),
+                             "chunk_cache": eng.cache_stats("chunk"), "jobs": self.server.jobs.stats(),
+                             "single_flight": eng.IN_FLIGHT.stats()})
+        elif path == "/api/metrics":
+            self._send(200, METRICS_CONTENT_TYPE, eng.METRICS.render(self.server.metric_families()))
+        elif JOB_PATH_RE.match(path):
+            job_id, view = JOB_PATH_RE.match(path).groups()
+            job = self.server.jobs.get(job_id)
+            if job is None:
+                self._send_json({"error": f"Unknown or expired job: {job_id}"}, 404)
+            elif view == "/result":
+                self._api_job_result(job)
+            elif view == "/events":
+                self._api_job_events(job)
+            else:
+                self._send_json(job.to_json())
+        elif path == "/api/world/chunk":
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            try:
+                self._api_world_chunk({k: v[-1] for k, v in query.items()})
+            except BadRequest as e:
+                self._send_json({"error": str(e)}, 400)
+            except Exception as e:
+                print(f"[ERROR] {e}\n{traceback.format_exc()}")
+                self._send_json({"error": str(e)}, 500)
         else:
             self._send(404, "text/plain", "Not Found")
 
+    @_instrumented
     def do_POST(self):
         path = self.path.rstrip("/")
         body = self._read_body()
@@ -83,6 +459,8 @@ class SpriteHandler(BaseHTTPRequestHandler):
                 self._api_gen_tilemap(data)
             elif path == "/api/generate/animation":
                 self._api_gen_animation(data)
+            elif path == "/api/world/chunk":
+                self._api_world_chunk(data)
             elif path == "/api/generate/pack":
                 self._api_gen_pack(data)
             elif path == "/api/generate/iconset":
@@ -99,8 +477,12 @@ class SpriteHandler(BaseHTTPRequestHandler):
                 self._api_batch(data)
             elif path == "/api/download/zip":
                 self._api_download_zip(data)
+            elif path == "/api/jobs":
+                self._api_job_submit(data)
             else:
                 self._send_json({"error": f"Unknown endpoint: {path}"}, 404)
+        except BadRequest as e:
+            self._send_json({"error": str(e)}, 400)
         except Exception as e:
             tb = traceback.format_exc()
             print(f"[ERROR] {e}\n{tb}")
@@ -109,132 +491,184 @@ class SpriteHandler(BaseHTTPRequestHandler):
     # ── API HANDLERS ──────────────────────────────────────
 
     def _api_gen_sprite(self, data):
-        prompt = data.get("prompt", "pixel character")
-        result = eng.generate_sprite(prompt)
-        self._send_json(result)
+        self._send_bundle(self._engine(*ENGINE_CALLS["sprite"](data)))
 
     def _api_gen_3d(self, data):
-        prompt = data.get("prompt", "character")
-        result = eng.generate_3d_asset(prompt)
-        self._send_json(result)
+        self._send_bundle(self._engine(*ENGINE_CALLS["3d"](data)))
 
     def _api_gen_tilemap(self, data):
-        prompt = data.get("prompt", "stone floor tile")
-        cols = int(data.get("cols", 4))
-        rows = int(data.get("rows", 4))
-        result = eng.generate_tilemap(prompt, cols, rows)
-        self._send_json(result)
+        self._send_bundle(self._engine(*ENGINE_CALLS["tilemap"](data)))
+
+    def _api_world_chunk(self, data):
+        prompt = data.get("prompt", "grassland terrain")
+        x, y = _int(data, "x", 0), _int(data, "y", 0)
+        chunk_tiles = _int(data, "chunk_tiles", eng.WORLD_CHUNK_TILES, 1, eng.TILEMAP_MAX_CELLS)
+        self._send_bundle(self._engine(eng.world_chunk_bundle, prompt, x, y, chunk_tiles))
 
     def _api_gen_animation(self, data):
-        prompt = data.get("prompt", "walk cycle character")
-        frames = int(data.get("frames", 8))
-        result = eng.generate_animation(prompt, frames)
-        self._send_json(result)
+        self._send_bundle(self._engine(*ENGINE_CALLS["animation"](data)))
 
     def _api_gen_pack(self, data):
-        prompt = data.get("prompt", "character")
-        result = eng.generate_full_pack(prompt)
-        self._send_json(result)
+        self._send_bundle(self._engine(*ENGINE_CALLS["pack"](data)))
 
     def _api_gen_iconset(self, data):
-        prompt = data.get("prompt", "star icon")
-        info = eng.parse_prompt(prompt)
-        icons = eng.generate_icon_set(info)
-        out = {}
-        for sz, img in icons.items():
-            buf = io.BytesIO(); img.save(buf, "PNG"); buf.seek(0)
-            out[str(sz)] = base64.b64encode(buf.read()).decode()
-        self._send_json({"icons": out, "info": info})
+        self._send_bundle(self._engine(*ENGINE_CALLS["iconset"](data)))
 
     def _api_gen_atlas(self, data):
-        prompts = data.get("prompts", ["warrior", "wizard", "archer", "knight"])
-        items = []
-        for p in prompts[:16]:
-            result = eng.generate_sprite(p)
-            img_data = base64.b64decode(result["image_b64"])
-            from PIL import Image
-            img = Image.open(io.BytesIO(img_data))
-            items.append((p, img))
-        from sprite_engine import AtlasGenerator
-        atlas_gen = AtlasGenerator(items)
-        atlas_img, meta_json = atlas_gen.pack()
-        buf = io.BytesIO(); atlas_img.save(buf, "PNG"); buf.seek(0)
-        self._send_json({
-            "atlas_b64": base64.b64encode(buf.read()).decode(),
-            "metadata": json.loads(meta_json),
-        })
+        self._send_bundle(self._engine(*ENGINE_CALLS["atlas"](data)))
 
     def _api_normalmap(self, data):
         img_b64 = data.get("image_b64")
         if not img_b64:
             self._send_json({"error": "No image_b64 provided"}, 400); return
-        from PIL import Image
-        img_data = base64.b64decode(img_b64)
-        img = Image.open(io.BytesIO(img_data))
+        img = eng.decode_image(img_b64)
         nm = eng.generate_normal_map(img)
-        buf = io.BytesIO(); nm.save(buf, "PNG"); buf.seek(0)
-        self._send_json({"normal_b64": base64.b64encode(buf.read()).decode()})
+        self._send_bundle(eng.image_bundle("normalmap", "normal_map.png", nm))
 
     def _api_upscale(self, data):
         img_b64 = data.get("image_b64")
-        factor = int(data.get("factor", 4))
+        factor = _int(data, "factor", 4, 1)
         if not img_b64:
             self._send_json({"error": "No image_b64 provided"}, 400); return
-        from PIL import Image
-        img = Image.open(io.BytesIO(base64.b64decode(img_b64)))
+        img = eng.decode_image(img_b64)
         up = eng.upscale_sprite(img, factor)
-        buf = io.BytesIO(); up.save(buf, "PNG"); buf.seek(0)
-        self._send_json({"upscaled_b64": base64.b64encode(buf.read()).decode(),
-                         "size": f"{up.width}x{up.height}"})
+        self._send_bundle(eng.image_bundle("upscale", "sprite_4x.png", up, indexed=True,
+                                           size=f"{up.width}x{up.height}"))
 
     def _api_palette_swap(self, data):
         img_b64 = data.get("image_b64")
         new_palette_name = data.get("palette", "fire")
         if not img_b64:
             self._send_json({"error": "No image_b64 provided"}, 400); return
-        from PIL import Image
-        img = Image.open(io.BytesIO(base64.b64decode(img_b64)))
+        img = eng.decode_image(img_b64)
+        names = data.get("palettes")
+        if names is not None:
+            names = list(eng.PALETTES) if names == "all" else names
+            if not isinstance(names, list) or not names or any(n not in eng.PALETTES for n in names):
+                self._send_json({"error": f'palettes must be "all" or a list from: {", ".join(eng.PALETTES)}'}, 400)
+                return
+            self._send_bundle(eng.palette_variants_bundle(img, names)); return
         old_colors = eng.extract_dominant_colors(img, 6)
         new_colors = eng.get_palette(new_palette_name)
         swapped = eng.swap_palette(img, old_colors, new_colors)
-        buf = io.BytesIO(); swapped.save(buf, "PNG"); buf.seek(0)
-        self._send_json({"swapped_b64": base64.b64encode(buf.read()).decode()})
+        self._send_bundle(eng.image_bundle("palette_swap", "sprite_recolored.png", swapped, indexed=True))
 
     def _api_batch(self, data):
-        prompts = data.get("prompts", [])
-        results = []
-        for p in prompts[:20]:
-            try:
-                r = eng.generate_sprite(p)
-                results.append({"prompt": p, "image_b64": r["image_b64"], "info": r["info"]})
-            except Exception as e:
-                results.append({"prompt": p, "error": str(e)})
-        self._send_json({"results": results})
+        self._send_json({"results": self._engine(*ENGINE_CALLS["batch"](data))})
 
     def _api_download_zip(self, data):
-        prompt = data.get("prompt", "game asset")
-        include_3d = data.get("include_3d", True)
-        zip_bytes = eng.build_download_zip(prompt, include_3d)
-        safe_name = prompt[:30].replace(" ", "_").replace("/","")
+        fn, prompt, include_3d = ENGINE_CALLS["zip"](data)
+        if not data.get("stream", True) or self.server.mode == "process":
+            self._send_zip(prompt, self._engine(fn, prompt, include_3d))
+            return
+
+        chunks = eng.iter_download_zip(prompt, include_3d)
+        first = next(chunks)  # errors before any output still become a JSON 500
+        self._send_chunked_headers("application/zip", {"Content-Disposition": _zip_disposition(prompt)})
+        try:
+            self._write_chunk(first)
+            for chunk in chunks:
+                self._write_chunk(chunk)
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception as e:
+            # Headers are gone; dropping the connection without the final chunk marks the body incomplete
+            print(f"[ERROR] ZIP stream aborted: {e}\n{traceback.format_exc()}")
+            self.close_connection = True
+
+    def _send_zip(self, prompt, zip_bytes):
         self.send_response(200)
         self.send_header("Content-Type", "application/zip")
-        self.send_header("Content-Disposition", f'attachment; filename="sprite_{safe_name}.zip"')
+        self.send_header("Content-Disposition", _zip_disposition(prompt))
         self.send_header("Content-Length", len(zip_bytes))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
         self.wfile.write(zip_bytes)
 
+    # ── JOBS ──────────────────────────────────────────────
+
+    def _api_job_submit(self, data):
+        kind = data.get("type")
+        if kind not in ENGINE_CALLS:
+            raise BadRequest(f'type must be one of: {", ".join(ENGINE_CALLS)}')
+        fn, *args = ENGINE_CALLS[kind](data)
+        try:
+            job, coalesced = self.server.jobs.submit(kind, fn, args)
+        except JobsFull:
+            body = json.dumps({"error": "Too many jobs in flight, retry shortly"}).encode("utf-8")
+            self.send_response(503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", len(body))
+            self.send_header("Retry-After", self.server.retry_after)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = json.dumps(dict(job.to_json(), coalesced=coalesced)).encode("utf-8")
+        self.send_response(202)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", len(body))
+        self.send_header("Location", f"/api/jobs/{job.id}")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "Location")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _api_job_result(self, job):
+        """The finished result, encoded as its direct endpoint would; 202 + status while pending."""
+        if not job.done:
+            self._send_json(job.to_json(), 202)
+        elif job.status == "failed":
+            self._send_json({"error": job.error, "job": job.to_json()}, 500)
+        elif job.kind == "zip":
+            self._send_zip(job.args[0], job.result)
+        elif job.kind == "batch":
+            self._send_json({"results": job.result})
+        else:
+            self._send_bundle(job.result)
+
+    def _api_job_events(self, job):
+        """
+        Server-sent events: one "status" event per state or progress change, ending when
+        the job finishes. After the headers the socket moves to its own thread, so open
+        streams hold neither a request worker nor a slot under the 503 limit.
+        """
+        if not self.server.reserve_stream():
+            self._send_json({"error": "Too many event streams open, poll /api/jobs/<id> instead"}, 503)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.server.stream_events(self.connection, job)
+
+    def _send_chunked_headers(self, content_type, extra=None):
+        self.protocol_version = "HTTP/1.1"  # chunked encoding needs 1.1; Connection: close keeps it one-shot
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+    def _write_chunk(self, chunk):
+        if chunk:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+
     def _api_palettes(self):
-        palettes = ["fire","ice","nature","dark","gold","poison","ocean","stone","magic","neon","earth","blood"]
-        self._send_json({"palettes": palettes})
+        self._send_json({"palettes": list(eng.PALETTES)})
 
     def _api_categories(self):
-        cats = ["character","tile","item","ui","environment","vehicle","prop","particle","icon"]
-        self._send_json({"categories": cats})
+        self._send_json({"categories": list(eng.PROMPT_VOCAB["category"])})
 
     def _api_styles(self):
-        styles = ["pixel","cartoon","realistic","neon","minimalist","fantasy","sci-fi"]
-        self._send_json({"styles": styles})
+        self._send_json({"styles": list(eng.PROMPT_VOCAB["style"])})
 
     # ── HTML SERVE ────────────────────────────────────────
 
@@ -245,9 +679,189 @@ class SpriteHandler(BaseHTTPRequestHandler):
         self._send(200, "text/html; charset=utf-8", content)
 
 
+class SpriteServer(HTTPServer):
+    """
+    HTTPServer with a configurable concurrency mode:
+      single  — one request at a time (the original behaviour)
+      thread  — requests handled on a bounded thread pool
+      process — requests handled on threads, engine calls run on a process pool
+    Requests beyond workers + queue_size are rejected with 503 + Retry-After.
+    """
+
+    def __init__(self, addr, handler, mode="thread", workers=None, queue_size=None, retry_after=2,
+                 job_workers=None, job_ttl=600, max_jobs=256, job_max_bytes=256 * 2**20):
+        super().__init__(addr, handler)
+        self.mode = mode
+        self.workers = max(1, workers or os.cpu_count() or 4)
+        self.queue_size = self.workers * 4 if queue_size is None else max(0, queue_size)
+        self.retry_after = retry_after
+        self._pending = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        if mode in ("thread", "process"):
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sprite-http")
+        if mode == "process":
+            eng.process_pool(self.workers)  # size it now, before a batch or atlas call can create it
+        self.jobs = JobQueue(self._run_job, job_workers or self.workers, job_ttl, max_jobs, job_max_bytes)
+        self._streams = set()    # sockets owned by event-stream threads
+        self._stream_threads = []
+        self._stream_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+    def run_engine(self, fn, *args):
+        if self.mode != "process" or fn in _SELF_POOLED:
+            return fn(*args)
+        run = lambda: eng.submit_to_pool(fn, *args, workers=self.workers).result()
+        if not hasattr(fn, "cache_key"):
+            return run()
+        # Each worker process has its own IN_FLIGHT, so identical requests are merged here first
+        return eng.IN_FLIGHT.do(fn.cache_key(*args), run, fn.endpoint)
+
+    def reserve_stream(self) -> bool:
+        return self._stream_slots.acquire(blocking=False)
+
+    def stream_events(self, sock, job):
+        """Take over a request socket (headers already sent) and feed it job events on a dedicated thread."""
+        with self._lock:
+            self._streams.add(sock)
+            self._stream_threads = [t for t in self._stream_threads if t.is_alive()]
+            thread = threading.Thread(target=self._stream_events, args=(sock, job),
+                                      name="sprite-events", daemon=True)
+            self._stream_threads.append(thread)
+        thread.start()
+
+    def _stream_events(self, sock, job):
+        version = -1
+        try:
+            while True:
+                current = job.wait(version, JOB_HEARTBEAT)
+                if current == version:
+                    sock.sendall(b": keep-alive\n\n")
+                    continue
+                version = current
+                state = job.to_json()
+                sock.sendall(f"event: status\ndata: {json.dumps(state)}\n\n".encode("utf-8"))
+                if state["status"] in ("done", "failed"):
+                    break
+        except OSError:
+            pass  # client went away; the job carries on
+        finally:
+            with self._lock:
+                self._streams.discard(sock)
+            self._stream_slots.release()
+            super().shutdown_request(sock)
+
+    def shutdown_request(self, request):
+        with self._lock:
+            if request in self._streams:
+                return  # owned by its event-stream thread now
+        super().shutdown_request(request)
+
+    def _run_job(self, job, fn, args):
+        """JobQueue runner; in-process ZIP builds report per-entry progress."""
+        if fn is not eng.build_download_zip or self.mode == "process":
+            return self.run_engine(fn, *args)
+        parts, size = [], 0
+        for chunk in eng.iter_download_zip(*args):
+            parts.append(chunk)
+            size += len(chunk)
+            job.update(progress={"chunks": len(parts), "bytes": size})
+        return b"".join(parts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "workers": self.workers, "queue_size": self.queue_size,
+                    "pending": self._pending, "rejected": self._rejected}
+
+    def metric_families(self) -> list:
+        """Server and cache state sampled at scrape time, for Metrics.render()."""
+        stats = self.stats()
+        jobs = self.jobs.stats()
+        caches = [({"cache": name}, eng.cache_stats(name)) for name in ("result", "chunk")]
+        return [
+            ("sprite_requests_pending", "gauge", "Accepted requests queued or running", [({}, stats["pending"])]),
+            ("sprite_requests_rejected_total", "counter", "Requests turned away with 503", [({}, stats["rejected"])]),
+            ("sprite_workers", "gauge", "Request worker threads", [({"mode": self.mode}, self.workers)]),
+            ("sprite_cache_entries", "gauge", "Results held in memory", [(l, c["entries"]) for l, c in caches]),
+            ("sprite_cache_bytes", "gauge", "Pickled size of in-memory results", [(l, c["bytes"]) for l, c in caches]),
+            ("sprite_cache_hits_total", "counter", "Cache hits (memory and disk)",
+             [(dict(l, tier=t), c[k]) for l, c in caches for t, k in (("memory", "hits"), ("disk", "disk_hits"))]),
+            ("sprite_cache_misses_total", "counter", "Cache misses", [(l, c["misses"]) for l, c in caches]),
+            ("sprite_cache_evictions_total", "counter", "Entries evicted (memory LRU and disk pruning)",
+             [(dict(l, tier=t), c[k]) for l, c in caches for t, k in (("memory", "evictions"), ("disk", "disk_evictions"))]),
+            ("sprite_cache_disk_bytes", "gauge", "Size of the on-disk tier at its last scan",
+             [(l, c["disk_bytes"]) for l, c in caches if c["disk_dir"]]),
+            ("sprite_singleflight_in_flight", "gauge", "Distinct computations other callers can join",
+             [({}, eng.IN_FLIGHT.stats()["in_flight"])]),
+            ("sprite_jobs", "gauge", "Retained background jobs by status",
+             [({"status": k}, jobs[k]) for k in ("queued", "running", "done", "failed")]),
+            ("sprite_jobs_coalesced_total", "counter", "Job submissions merged into an identical in-flight job",
+             [({}, jobs["coalesced"])]),
+        ]
+
+    def process_request(self, request, client_address):
+        if self._pool is None:
+            return super().process_request(request, client_address)
+        with self._lock:
+            busy = self._pending >= self.workers + self.queue_size
+            if busy:
+                self._rejected += 1
+            else:
+                self._pending += 1
+        if busy:
+            self._reject(request)
+            self.shutdown_request(request)
+            return
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._lock:
+                self._pending -= 1
+
+    def _reject(self, request):
+        body = json.dumps({"error": "Server busy, retry shortly"}).encode("utf-8")
+        head = ("HTTP/1.0 503 Service Unavailable\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Retry-After: {self.retry_after}\r\n"
+                "Access-Control-Allow-Origin: *\r\n"
+                "Connection: close\r\n\r\n")
+        try:
+            request.sendall(head.encode("latin-1") + body)
+        except OSError:
+            pass
+
+    def server_close(self):
+        """Stop accepting, then drain queued and in-flight requests."""
+        super().server_close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self.jobs.shutdown(wait=True)
+        for thread in self._stream_threads:
+            thread.join(timeout=JOB_HEARTBEAT)  # finished jobs end their streams promptly
+        eng.shutdown_process_pool(wait=True)
+
+
 def main():
     port = int(os.environ.get("SPRITE_PORT", 7777))
     host = os.environ.get("SPRITE_HOST", "0.0.0.0")
+    mode = os.environ.get("SPRITE_MODE", "thread")
+    workers = int(os.environ.get("SPRITE_WORKERS", 0)) or None
+    queue_size = os.environ.get("SPRITE_QUEUE")
+    queue_size = int(queue_size) if queue_size else None
+    job_workers = int(os.environ.get("SPRITE_JOB_WORKERS", 0)) or None
+    job_ttl = float(os.environ.get("SPRITE_JOB_TTL", 600))
+    max_jobs = int(os.environ.get("SPRITE_JOBS_MAX", 256))
+    job_max_bytes = int(float(os.environ.get("SPRITE_JOBS_MB", 256)) * 2**20)
+    if mode not in ("single", "thread", "process"):
+        print(f"  ⚠  Unknown SPRITE_MODE '{mode}', using 'thread'")
+        mode = "thread"
 
     print("""
 ╔══════════════════════════════════════════════════╗
@@ -257,16 +871,25 @@ def main():
 ║  No external APIs. No limits. Pure Python.       ║
 ╚══════════════════════════════════════════════════╝
 """)
+    server = SpriteServer((host, port), SpriteHandler, mode, workers, queue_size,
+                          job_workers=job_workers, job_ttl=job_ttl, max_jobs=max_jobs,
+                          job_max_bytes=job_max_bytes)
+
     print(f"  🎮  Server starting on http://{host}:{port}")
     print(f"  🎨  Supports: 2D Sprites, 3D Assets, Tilemaps, Animations")
     print(f"  🔌  Engine extensions: Unity, Unreal, Godot, GameMaker")
+    print(f"  ⚙   Mode: {server.mode} ({server.workers} workers, queue {server.queue_size})")
     print(f"  📦  15 addons included\n")
 
-    server = HTTPServer((host, port), SpriteHandler)
+    # SIGTERM drains like Ctrl+C; shutdown() must be called off the serving thread
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
     try:
         server.serve_forever()
     except KeyboardInterrupt:
-        print("\n  Sprite! server stopped.")
+        pass
+    print("\n  Draining in-flight requests...")
+    server.server_close()
+    print("  Sprite! server stopped.")
 
 
 if __name__ == "__main__":
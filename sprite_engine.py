@@ -6,64 +6,248 @@ Created by Shivani. No external APIs required.
 
 import math
 import random
+import re
 import colorsys
 import hashlib
 import struct
+import time
+import bisect
 import io
 import json
 import base64
 import zipfile
 import os
+import pickle
+import tempfile
+import inspect
+import functools
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image, ImageDraw, ImageFilter, ImageEnhance, ImageFont
 import numpy as np
 from scipy.ndimage import gaussian_filter
 
+# Bump whenever generator output changes — it is part of every result-cache key.
+ENGINE_VERSION = "1.16"
+
+# 3D view renderer: "raster" (built-in NumPy rasterizer) or "matplotlib" (needs matplotlib installed)
+RENDER_BACKENDS = ("raster", "matplotlib")
+RENDER_BACKEND = os.environ.get("SPRITE_RENDER_BACKEND", "raster")
 
 # ─────────────────────────────────────────────
-#  UTILITY HELPERS
+#  METRICS (span timers, Prometheus text format)
 # ─────────────────────────────────────────────
 
-def parse_prompt(prompt: str) -> dict:
-    """Extract tags, style, colors, and intent from a natural language prompt."""
-    prompt_lower = prompt.lower()
+# Upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    "sprite_stage_duration_seconds": ("histogram", "Time spent in one engine stage"),
+    "sprite_request_duration_seconds": ("histogram", "HTTP request latency by endpoint"),
+    "sprite_requests_total": ("counter", "HTTP requests by endpoint, method and status"),
+    "sprite_response_bytes_total": ("counter", "Response bytes written by endpoint"),
+    "sprite_requests_in_flight": ("gauge", "HTTP requests currently being handled"),
+    "sprite_singleflight_shared_total": ("counter", "Calls that waited on an identical in-progress computation"),
+}
+
+
+class Histogram:
+    """Latency histogram over LATENCY_BUCKETS (per-bucket counts; rendered cumulatively)."""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+
+class Metrics:
+    """
+    Process-wide registry of labelled histograms, counters and gauges.
+    When disabled every call returns straight away, so instrumentation can stay in hot paths.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._series = {}  # (name, sorted label items) -> Histogram | float
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._series.get(key)
+            if hist is None:
+                hist = self._series[key] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter (or, with a negative value, a gauge)."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def span(self, stage: str):
+        """Context manager timing one engine stage into sprite_stage_duration_seconds."""
+        return _Span(self, stage) if self.enabled else _NO_SPAN
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def drain(self) -> dict:
+        """Take every series as plain data, leaving the registry empty (for shipping to another process)."""
+        with self._lock:
+            series, self._series = self._series, {}
+        return {k: (v.counts, v.sum) if isinstance(v, Histogram) else v for k, v in series.items()}
+
+    def merge(self, series: dict):
+        """Add series from drain() (e.g. a pool worker's) into this registry."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for key, value in series.items():
+                if isinstance(value, tuple):
+                    hist = self._series.get(key)
+                    if hist is None:
+                        hist = self._series[key] = Histogram()
+                    hist.counts = [a + b for a, b in zip(hist.counts, value[0])]
+                    hist.sum += value[1]
+                else:
+                    self._series[key] = self._series.get(key, 0) + value
+
+    def render(self, extra=()) -> str:
+        """
+        Prometheus text exposition of every series, plus extra
+        (name, kind, help, [(labels, value)]) families sampled by the caller.
+        """
+        with self._lock:
+            series = [(k, (list(v.counts), v.sum) if isinstance(v, Histogram) else v)
+                      for k, v in self._series.items()]
+        families = {}
+        for (name, labels), value in sorted(series, key=lambda kv: kv[0]):
+            families.setdefault(name, []).append((dict(labels), value))
+        lines = []
+        for name, samples in families.items():
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                if kind != "histogram":
+                    lines.append(f"{name}{_label_text(labels)} {_metric_value(value)}")
+                    continue
+                counts, total = value
+                running = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), counts):
+                    running += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_label_text(dict(labels, le=le))} {running}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_metric_value(total)}")
+                lines.append(f"{name}_count{_label_text(labels)} {running}")
+        for name, kind, help_text, samples in extra:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{_label_text(labels)} {_metric_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe("sprite_stage_duration_seconds", time.perf_counter() - self.start, stage=self.stage)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _label_text(labels: dict) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
 
-    # Category detection
-    categories = {
+
+def _metric_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+METRICS = Metrics(enabled=os.environ.get("SPRITE_METRICS", "1") != "0")
+
+
+def span(stage: str):
+    """Time a block as one engine stage: `with span("pixelize"): ...`."""
+    return METRICS.span(stage)
+
+
+def timed(stage: str):
+    """Decorator form of span() for whole functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            with _Span(METRICS, stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ─────────────────────────────────────────────
+#  UTILITY HELPERS
+# ─────────────────────────────────────────────
+
+# Keyword vocabularies: field -> value -> keywords. Values are listed in tie-break order.
+PROMPT_VOCAB = {
+    "category": {
         "character": ["character", "hero", "enemy", "npc", "player", "warrior", "wizard", "knight",
                       "monster", "creature", "robot", "alien", "zombie", "dragon", "boss"],
         "tile": ["tile", "tileset", "floor", "wall", "ground", "platform", "terrain", "brick", "stone"],
         "item": ["item", "weapon", "sword", "gun", "potion", "chest", "key", "coin", "gem", "shield", "bow"],
         "ui": ["ui", "button", "hud", "icon", "cursor", "frame", "panel", "bar", "health", "mana"],
-        "environment": ["tree", "rock", "bush", "cloud", "mountain", "house", "castle", "dungeon", "cave", "water"],
-        "vehicle": ["car", "ship", "spaceship", "tank", "plane", "boat", "rocket"],
-        "prop": ["barrel", "crate", "table", "chair", "lamp", "door", "window", "sign", "fence", "pillar"],
+        "environment": ["environment", "tree", "rock", "bush", "cloud", "mountain", "house", "castle",
+                        "dungeon", "cave", "water"],
+        "vehicle": ["vehicle", "car", "ship", "spaceship", "tank", "plane", "boat", "rocket"],
+        "prop": ["prop", "barrel", "crate", "table", "chair", "lamp", "door", "window", "sign", "fence", "pillar"],
         "particle": ["particle", "explosion", "fire", "smoke", "spark", "magic", "effect", "trail"],
         "icon": ["icon", "logo", "badge", "medal", "star", "heart", "diamond"],
-    }
-    detected_category = "character"
-    for cat, keywords in categories.items():
-        if any(k in prompt_lower for k in keywords):
-            detected_category = cat
-            break
-
-    # Style detection
-    styles = {
+    },
+    "style": {
         "pixel": ["pixel", "8-bit", "8bit", "16-bit", "16bit", "retro", "nes", "snes", "gameboy"],
         "cartoon": ["cartoon", "toon", "comic", "cel", "flat", "chibi", "cute", "kawaii"],
-        "realistic": ["realistic", "realistic", "detailed", "hd", "high detail", "gritty"],
+        "realistic": ["realistic", "detailed", "hd", "high detail", "gritty"],
         "neon": ["neon", "glow", "cyberpunk", "cyber", "synthwave", "glowing"],
         "minimalist": ["minimal", "simple", "clean", "flat design", "icon style"],
         "fantasy": ["fantasy", "magical", "medieval", "rpg", "enchanted", "arcane"],
         "sci-fi": ["sci-fi", "scifi", "futuristic", "space", "alien", "cyber"],
-    }
-    detected_style = "pixel"
-    for sty, keywords in styles.items():
-        if any(k in prompt_lower for k in keywords):
-            detected_style = sty
-            break
-
-    # Color palette detection
-    palettes = {
+    },
+    "palette": {
         "fire": ["fire", "flame", "lava", "hot", "red", "orange", "ember"],
         "ice": ["ice", "frost", "frozen", "cold", "blue", "winter", "snow"],
         "nature": ["nature", "forest", "green", "grass", "plant", "leaf", "jungle"],
@@ -73,51 +257,185 @@ def parse_prompt(prompt: str) -> dict:
         "ocean": ["ocean", "water", "sea", "aqua", "cyan", "underwater"],
         "stone": ["stone", "rock", "gray", "grey", "iron", "steel", "metal"],
         "magic": ["magic", "arcane", "mystical", "ethereal", "enchanted", "spell"],
-    }
-    detected_palette = "magic"
-    for pal, keywords in palettes.items():
-        if any(k in prompt_lower for k in keywords):
-            detected_palette = pal
-            break
-
-    # Size detection
-    size = 64
-    if any(x in prompt_lower for x in ["128", "large"]):    size = 128
-    if any(x in prompt_lower for x in ["256", "big"]):      size = 256
-    if any(x in prompt_lower for x in ["32", "small"]):     size = 32
-    if any(x in prompt_lower for x in ["16", "tiny"]):      size = 16
-    if any(x in prompt_lower for x in ["512", "huge"]):     size = 512
+        "neon": ["neon"],
+        "earth": ["earth", "dirt", "mud", "soil", "clay", "brown"],
+        "blood": ["blood", "crimson", "gore", "scarlet"],
+    },
+}
+PROMPT_DEFAULTS = {"category": "character", "style": "pixel", "palette": "magic"}
+# A keyword naming the value itself ("tile", "neon") outweighs a synonym
+PROMPT_NAME_WEIGHT = 2.0
+
+SIZE_WORDS = {"tiny": 16, "small": 32, "large": 128, "big": 256, "huge": 512}
+BARE_SIZES = (16, 32, 64, 128, 256, 512)  # plain numbers only count as sizes when they are one of these
+SIZE_LIMITS = (16, 512)                  # "48px" / "48x48" may be any size in this range
+DEFAULT_SIZE = 64
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SIZE_TOKEN_RE = re.compile(r"(\d+)(px|x\d+)?")
+
+
+class PromptIndex:
+    """
+    Keyword index over every field, built once, so one left-to-right pass over a prompt's
+    tokens finds all matches. Keywords are tokenized like prompts ("8-bit" is 8, bit):
+    single-token keywords (and their plurals) sit in one dict, and multi-token keywords
+    hang off their first token.
+    """
+
+    def __init__(self, vocab: dict, extra=()):
+        self.order = {field: {v: i for i, v in enumerate(values)} for field, values in vocab.items()}
+        self.words = {}    # token -> {(field, value): weight}
+        self.phrases = {}  # first token -> {rest tokens: {(field, value): weight}}
+        for field, values in vocab.items():
+            for value, keywords in values.items():
+                for kw in keywords:
+                    # Multi-word keywords are more specific: "flat design" beats "flat"
+                    weight = (PROMPT_NAME_WEIGHT if kw == value else 1.0) * len(_TOKEN_RE.findall(kw))
+                    self._add(kw, field, value, weight)
+        for field, value, kw, weight in extra:
+            self._add(kw, field, value, weight)
+        for tok in list(self.words):
+            self.words.setdefault(tok + "s", self.words[tok])
+
+    def _add(self, keyword, field, value, weight):
+        first, *rest = _TOKEN_RE.findall(keyword.lower())
+        hits = (self.phrases.setdefault(first, {}).setdefault(tuple(rest), {}) if rest
+                else self.words.setdefault(first, {}))
+        hits[(field, value)] = weight  # re-adding a keyword keeps one weight
+
+    def match(self, tokens: list) -> dict:
+        """{field: value} with the highest summed keyword weight per field; ties go to the value listed first."""
+        scores, words, phrases = {}, self.words, self.phrases
+        for i, tok in enumerate(tokens):
+            hits = words.get(tok)
+            if hits:
+                for key, weight in hits.items():
+                    scores[key] = scores.get(key, 0.0) + weight
+            if tok in phrases:
+                for rest, hits in phrases[tok].items():
+                    if tuple(tokens[i + 1:i + 1 + len(rest)]) == rest:
+                        for key, weight in hits.items():
+                            scores[key] = scores.get(key, 0.0) + weight
+        best, top = dict(PROMPT_DEFAULTS), {}
+        for (field, value), weight in scores.items():
+            rank = (weight, -self.order[field][value])
+            if field not in top or rank > top[field]:
+                top[field], best[field] = rank, value
+        return best
+
+
+_prompt_extra = []
+_prompt_index = PromptIndex(PROMPT_VOCAB)
+_prompt_index_lock = threading.Lock()
+
+
+def register_prompt_keywords(field: str, value: str, keywords: list, weight: float = 1.0):
+    """
+    Teach parse_prompt new keywords for an existing value, e.g.
+    register_prompt_keywords("category", "vehicle", ["mech", "airship"]).
+    Pool workers are spawned fresh and get the registered keywords from the pool
+    initializer; a running pool is retired so its replacement starts with them.
+    """
+    if field not in PROMPT_VOCAB:
+        raise ValueError(f"Unknown prompt field: {field} (choose from {', '.join(PROMPT_VOCAB)})")
+    if value not in PROMPT_VOCAB[field]:
+        raise ValueError(f"Unknown {field}: {value} (choose from {', '.join(PROMPT_VOCAB[field])})")
+    global _prompt_index
+    with _prompt_index_lock:
+        _prompt_extra.extend((field, value, kw, float(weight)) for kw in keywords)
+        _prompt_index = PromptIndex(PROMPT_VOCAB, _prompt_extra)
+    shutdown_process_pool(wait=False)  # queued work still finishes on the old workers
+
+
+def _prompt_size(tokens: list) -> int:
+    """First exact size token ("64px", "48x48", "128"), else the last size word, else DEFAULT_SIZE."""
+    word = None
+    for i, tok in enumerate(tokens):
+        if tok in SIZE_WORDS:
+            word = SIZE_WORDS[tok]
+            continue
+        m = tok[0] <= "9" and _SIZE_TOKEN_RE.fullmatch(tok)
+        if m and not (i + 1 < len(tokens) and tokens[i + 1] == "bit"):  # "16-bit" is a style
+            n = int(m.group(1))
+            explicit = m.group(2) or (i + 1 < len(tokens) and tokens[i + 1] in ("px", "pixels"))
+            if explicit and SIZE_LIMITS[0] <= n <= SIZE_LIMITS[1]:
+                return n
+            if n in BARE_SIZES:
+                return n
+    return word or DEFAULT_SIZE
+
+
+@timed("parse_prompt")
+def parse_prompt(prompt: str) -> dict:
+    """Extract tags, style, colors, and intent from a natural language prompt."""
+    tokens = _TOKEN_RE.findall(prompt.lower())
+    fields = _prompt_index.match(tokens)
 
     # Seed from prompt for reproducibility
     seed = int(hashlib.md5(prompt.encode()).hexdigest(), 16) % (2**32)
 
     return {
         "prompt": prompt,
-        "category": detected_category,
-        "style": detected_style,
-        "palette": detected_palette,
-        "size": size,
+        "category": fields["category"],
+        "style": fields["style"],
+        "palette": fields["palette"],
+        "size": _prompt_size(tokens),
         "seed": seed,
     }
 
 
+PALETTES = {
+    "fire":      [(255,60,0),(255,120,0),(255,200,0),(180,20,0),(255,255,180),(100,10,0)],
+    "ice":       [(180,230,255),(100,180,255),(50,120,220),(200,240,255),(255,255,255),(20,60,160)],
+    "nature":    [(34,120,20),(80,180,40),(150,210,80),(60,90,30),(200,230,100),(30,60,10)],
+    "dark":      [(20,10,30),(60,20,60),(100,30,80),(150,50,100),(200,80,120),(10,5,20)],
+    "gold":      [(220,180,0),(255,220,50),(180,130,0),(255,240,150),(150,100,0),(255,255,200)],
+    "poison":    [(80,180,0),(40,120,0),(120,220,30),(200,255,100),(20,80,0),(180,255,50)],
+    "ocean":     [(0,80,180),(0,140,220),(50,200,250),(0,200,200),(100,230,255),(0,50,130)],
+    "stone":     [(80,80,90),(120,120,130),(160,160,170),(60,60,70),(200,200,210),(40,40,50)],
+    "magic":     [(120,0,200),(180,50,255),(80,0,150),(230,150,255),(255,200,255),(40,0,100)],
+    "neon":      [(0,255,150),(255,0,150),(0,200,255),(255,255,0),(200,0,255),(255,100,0)],
+    "earth":     [(120,80,40),(160,110,60),(200,150,90),(80,50,20),(230,200,150),(50,30,10)],
+    "blood":     [(150,0,0),(200,20,20),(255,50,50),(100,0,0),(255,150,150),(50,0,0)],
+}
+
+
 def get_palette(name: str) -> list:
     """Return a list of (R,G,B) colors for a named palette."""
-    palettes = {
-        "fire":      [(255,60,0),(255,120,0),(255,200,0),(180,20,0),(255,255,180),(100,10,0)],
-        "ice":       [(180,230,255),(100,180,255),(50,120,220),(200,240,255),(255,255,255),(20,60,160)],
-        "nature":    [(34,120,20),(80,180,40),(150,210,80),(60,90,30),(200,230,100),(30,60,10)],
-        "dark":      [(20,10,30),(60,20,60),(100,30,80),(150,50,100),(200,80,120),(10,5,20)],
-        "gold":      [(220,180,0),(255,220,50),(180,130,0),(255,240,150),(150,100,0),(255,255,200)],
-        "poison":    [(80,180,0),(40,120,0),(120,220,30),(200,255,100),(20,80,0),(180,255,50)],
-        "ocean":     [(0,80,180),(0,140,220),(50,200,250),(0,200,200),(100,230,255),(0,50,130)],
-        "stone":     [(80,80,90),(120,120,130),(160,160,170),(60,60,70),(200,200,210),(40,40,50)],
-        "magic":     [(120,0,200),(180,50,255),(80,0,150),(230,150,255),(255,200,255),(40,0,100)],
-        "neon":      [(0,255,150),(255,0,150),(0,200,255),(255,255,0),(200,0,255),(255,100,0)],
-        "earth":     [(120,80,40),(160,110,60),(200,150,90),(80,50,20),(230,200,150),(50,30,10)],
-        "blood":     [(150,0,0),(200,20,20),(255,50,50),(100,0,0),(255,150,150),(50,0,0)],
-    }
-    return palettes.get(name, palettes["magic"])
+    return PALETTES.get(name, PALETTES["magic"])
+
+
+@timed("png_encode")
+def encode_png(img: Image.Image, mode: str = None, indexed=False) -> bytes:
+    """
+    PNG-encode an image (optionally converting mode first). indexed=True writes a
+    palette PNG (P + tRNS) when that is lossless, i.e. the image has at most 256 colours.
+    """
+    if mode:
+        img = img.convert(mode)
+    if indexed:
+        idx = IndexedImage.from_image(img)
+        if idx is not None:
+            return idx.encode_png()
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def png_b64(img: Image.Image, mode: str = None) -> str:
+    """PNG-encode an image and return it as a base64 string for JSON responses."""
+    return base64.b64encode(encode_png(img, mode)).decode()
+
+
+def decode_image(data) -> Image.Image:
+    """
+    Open PNG bytes or a base64 string as an RGBA PIL image. Palette PNGs (the
+    engine's own indexed output included) are expanded here, transparency and all.
+    """
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    return Image.open(io.BytesIO(data)).convert("RGBA")
 
 
 def color_to_hex(rgb):
@@ -128,20 +446,185 @@ def lerp_color(c1, c2, t):
     return tuple(int(c1[i] + (c2[i]-c1[i])*t) for i in range(3))
 
 
-def perlin_like_noise(w, h, scale=8, seed=0):
-    """Simple deterministic noise without external libs."""
-    rng = np.random.RandomState(seed)
-    grid_w = w // scale + 2
-    grid_h = h // scale + 2
-    grid = rng.rand(grid_h, grid_w)
-    # Upsample with smooth interpolation
-    from scipy.ndimage import zoom
-    factor_y = h / (grid_h * scale)
-    factor_x = w / (grid_w * scale)
-    big = zoom(grid, (h / grid_h, w / grid_w), order=3)
-    big = big[:h, :w]
-    big = (big - big.min()) / (big.max() - big.min() + 1e-9)
-    return big
+def palette_ramp(palette: list) -> list:
+    """Order a palette dark-to-light so it can be used as a gradient ramp."""
+    return sorted(palette, key=lambda c: 0.299*c[0] + 0.587*c[1] + 0.114*c[2])
+
+
+def gradient_ramp(t: np.ndarray, stops: list, positions=None) -> np.ndarray:
+    """Map values in [0,1] onto a multi-stop colour ramp. Returns float RGB array of shape t.shape + (3,)."""
+    cols = np.array([c[:3] for c in stops], dtype=float)
+    if len(cols) == 1:
+        return np.broadcast_to(cols[0], t.shape + (3,)).copy()
+    if positions is None:
+        positions = np.linspace(0.0, 1.0, len(cols))
+    if len(cols) == 2 and positions[0] == 0.0 and positions[1] == 1.0:
+        # Two-stop fast path: plain linear blend
+        tt = t[..., None]
+        return cols[0] * (1 - tt) + cols[1] * tt
+    out = np.empty(t.shape + (3,), dtype=float)
+    for ch in range(3):
+        out[..., ch] = np.interp(t, positions, cols[:, ch])
+    return out
+
+
+# ─────────────────────────────────────────────
+#  INDEXED COLOUR
+# ─────────────────────────────────────────────
+
+class IndexedImage:
+    """
+    Palette-indexed image: (H, W) uint8 indices into an (N, 4) uint8 RGBA palette, N <= 256.
+    Recolouring rewrites the palette table and never touches the pixels.
+    """
+
+    __slots__ = ("indices", "palette")
+
+    def __init__(self, indices: np.ndarray, palette: np.ndarray):
+        self.indices = indices
+        self.palette = palette
+
+    @classmethod
+    def from_image(cls, img: Image.Image):
+        """Lossless indexing of img, or None if it has more than 256 colours (fully transparent pixels count once)."""
+        rgba = img.convert("RGBA")
+        found = rgba.getcolors(1024)
+        if found is None:
+            return None
+        # Every fully transparent colour collapses onto (0, 0, 0, 0)
+        colors = sorted({c if c[3] else (0, 0, 0, 0) for _, c in found})
+        if len(colors) > 256:
+            return None
+        palette = np.array(colors, dtype=np.uint8)
+        arr = np.asarray(rgba)
+        packed = np.ascontiguousarray(arr).view("<u4")[..., 0]
+        packed = np.where(arr[..., 3] == 0, 0, packed)
+        keys = palette.view("<u4")[:, 0]
+        order = np.argsort(keys)
+        indices = order[np.searchsorted(keys[order], packed)].astype(np.uint8)
+        return cls(indices, palette)
+
+    @property
+    def size(self) -> tuple:
+        return self.indices.shape[1], self.indices.shape[0]
+
+    def recolor(self, palette) -> "IndexedImage":
+        """Same pixels over a new (N, 4) RGBA palette."""
+        return IndexedImage(self.indices, np.asarray(palette, dtype=np.uint8).reshape(-1, 4))
+
+    def to_rgba(self) -> Image.Image:
+        return Image.fromarray(self.palette[self.indices], "RGBA")
+
+    def to_image(self) -> Image.Image:
+        """P-mode image; per-entry alpha rides in info["transparency"] (written as tRNS)."""
+        img = Image.fromarray(self.indices, "P")
+        img.putpalette(self.palette[:, :3].tobytes())
+        alpha = self.palette[:, 3]
+        if (alpha < 255).any():
+            img.info["transparency"] = alpha.tobytes()
+        return img
+
+    @timed("png_encode")
+    def encode_png(self) -> bytes:
+        img = self.to_image()
+        n = len(self.palette)
+        bits = 1 if n <= 2 else 2 if n <= 4 else 4 if n <= 16 else 8
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", bits=bits, **({"transparency": img.info["transparency"]}
+                                                  if "transparency" in img.info else {}))
+        return buf.getvalue()
+
+
+# ─────────────────────────────────────────────
+#  NOISE (tileable gradient noise, fBm, domain warp)
+# ─────────────────────────────────────────────
+
+# fBm sums sit mostly within ±0.25; this spreads them over [0, 1] before clipping
+NOISE_CONTRAST = 1.6
+
+
+@functools.lru_cache(maxsize=256)
+def _noise_tables(seed: int) -> tuple:
+    """Permutation and unit-gradient tables for a seed (cached, read-only)."""
+    rng = np.random.default_rng(seed & 0xFFFFFFFF)
+    perm = rng.permutation(256).astype(np.intp)
+    ang = rng.random(256) * 2 * math.pi
+    gx, gy = np.cos(ang).astype(np.float32), np.sin(ang).astype(np.float32)
+    for t in (perm, gx, gy):
+        t.flags.writeable = False
+    return perm, gx, gy
+
+
+def gradient_noise(x, y, seed=0, period=None) -> np.ndarray:
+    """
+    2D gradient (Perlin) noise at lattice coordinates x, y (broadcastable arrays), roughly in [-0.7, 0.7].
+    period=(px, py) wraps the lattice so the noise repeats every px cells in x and py cells in y.
+    """
+    perm, gx, gy = _noise_tables(seed)
+    # Lattice cell in float64 so far-away windows keep their precision; offsets in float32
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    x0, y0 = np.floor(x), np.floor(y)
+    fx, fy = (x - x0).astype(np.float32), (y - y0).astype(np.float32)
+    ix, iy = x0.astype(np.intp), y0.astype(np.intp)
+    # Hash only the lattice points the window touches, then gather corners by flat index
+    xmin, ymin = int(ix.min()), int(iy.min())
+    nx, ny = int(ix.max()) - xmin + 2, int(iy.max()) - ymin + 2
+    lx, ly = np.arange(xmin, xmin + nx), np.arange(ymin, ymin + ny)
+    if period:
+        lx, ly = lx % period[0], ly % period[1]
+    g = perm[(perm[lx & 255][None, :] + ly[:, None]) & 255].ravel()
+    lgx, lgy = gx[g], gy[g]
+    idx = (iy - ymin) * nx + (ix - xmin)
+
+    def corner(offset, dx, dy):
+        i = idx + offset if offset else idx
+        return lgx[i] * dx + lgy[i] * dy
+
+    n00 = corner(0, fx, fy)
+    n10 = corner(1, fx - 1, fy)
+    n01 = corner(nx, fx, fy - 1)
+    n11 = corner(nx + 1, fx - 1, fy - 1)
+    u = fx * fx * fx * (fx * (fx * 6 - 15) + 10)
+    v = fy * fy * fy * (fy * (fy * 6 - 15) + 10)
+    top = n00 + u * (n10 - n00)
+    return top + v * (n01 + u * (n11 - n01) - top)
+
+
+def _fbm(x, y, seed, octaves, lacunarity, gain, period):
+    total, amp, freq, norm = 0.0, 1.0, 1.0, 0.0
+    for o in range(octaves):
+        p = None if period is None else (int(period[0] * freq), int(period[1] * freq))
+        total = total + amp * gradient_noise(x * freq, y * freq, seed + o, p)
+        norm += amp
+        amp *= gain
+        freq *= lacunarity
+    return total / norm
+
+
+@timed("noise")
+def fbm_noise(w, h, scale=8.0, seed=0, octaves=3, lacunarity=2.0, gain=0.5,
+              wrap=False, warp=0.0, origin=(0, 0)) -> np.ndarray:
+    """
+    w x h float32 field of fractal gradient noise in [0, 1]; scale is the base feature size in pixels.
+    wrap=True makes the field periodic over w x h (scale is rounded so whole cells fit).
+    warp > 0 displaces sample points by a second low-frequency fBm, up to `warp` base cells.
+    origin offsets the window in pixels, so adjacent windows of the same seed join exactly.
+    """
+    xs = (np.arange(w, dtype=np.float64) + origin[0])[None, :]
+    ys = (np.arange(h, dtype=np.float64) + origin[1])[:, None]
+    period = None
+    if wrap:
+        period = (max(1, round(w / scale)), max(1, round(h / scale)))
+        lacunarity = max(2, round(lacunarity))
+        x, y = xs * (period[0] / w), ys * (period[1] / h)
+    else:
+        x, y = xs / scale, ys / scale
+    if warp:
+        qx = _fbm(x, y, seed + 101, 2, lacunarity, gain, period)
+        qy = _fbm(x, y, seed + 202, 2, lacunarity, gain, period)
+        x, y = x + warp * qx, y + warp * qy
+    total = _fbm(x, y, seed, octaves, lacunarity, gain, period)
+    return np.clip(0.5 + total * NOISE_CONTRAST, 0.0, 1.0)
 
 
 # ─────────────────────────────────────────────
@@ -155,12 +638,36 @@ class SpriteGenerator:
         self.info = info
         self.size = info["size"]
         self.palette = get_palette(info["palette"])
-        random.seed(info["seed"])
-        np.random.seed(info["seed"] % (2**31))
+        # Instance-local RNGs: no process-global state, safe across threads
+        self.rng = random.Random(info["seed"])
+        self.np_rng = np.random.default_rng(info["seed"])
 
     def generate(self) -> Image.Image:
+        return self.stylize(self.render_base())
+
+    def generate_indexed(self) -> tuple:
+        """
+        generate() as (IndexedImage, None), or (None, RGBA image) if the sprite has
+        more than 256 colours. The base is drawn once either way, so both forms match
+        generate() on a fresh generator. Pixel style is indexed on its coarse grid
+        and upscaled as indices.
+        """
+        img = self.render_base()
+        if self.info["style"] == "pixel":
+            grid = IndexedImage.from_image(self._pixel_grid(img))
+            if grid is not None:
+                # Same sampling as the NEAREST upscale in _pixelize
+                n, s = grid.indices.shape[0], self.size
+                src = ((np.arange(s) + 0.5) * n / s).astype(np.intp)
+                return IndexedImage(grid.indices[np.ix_(src, src)], grid.palette), None
+        img = self.stylize(img)
+        indexed = IndexedImage.from_image(img)
+        return (indexed, None) if indexed is not None else (None, img)
+
+    @timed("draw")
+    def render_base(self) -> Image.Image:
+        """The sprite for info["category"] before style post-processing."""
         cat = self.info["category"]
-        style = self.info["style"]
 
         if cat == "character":
             img = self._gen_character()
@@ -182,8 +689,11 @@ class SpriteGenerator:
             img = self._gen_icon()
         else:
             img = self._gen_character()
+        return img
 
-        # Apply style post-processing
+    def stylize(self, img: Image.Image) -> Image.Image:
+        """Apply the info["style"] post-processing to img."""
+        style = self.info["style"]
         if style == "pixel":
             img = self._pixelize(img)
         elif style == "neon":
@@ -193,6 +703,15 @@ class SpriteGenerator:
 
         return img
 
+    def _tile_ramp(self) -> list:
+        """Colour stops for tile shading; info["ramp"] may be "palette" or a list of RGB stops."""
+        ramp = self.info.get("ramp")
+        if ramp == "palette":
+            return palette_ramp(self.palette)
+        if ramp:
+            return list(ramp)
+        return [self.palette[0], self.palette[1]]
+
     def _base_canvas(self, alpha=True):
         mode = "RGBA" if alpha else "RGB"
         return Image.new(mode, (self.size, self.size), (0, 0, 0, 0) if alpha else (0, 0, 0))
@@ -201,17 +720,22 @@ class SpriteGenerator:
         p = palette or self.palette
         if idx is not None:
             return p[idx % len(p)]
-        return random.choice(p)
+        return self.rng.choice(p)
 
     def _gen_character(self) -> Image.Image:
-        img = self._base_canvas()
-        draw = ImageDraw.Draw(img)
+        return compose_parts(trim_parts(self.character_parts()), self.size)
+
+    def character_parts(self) -> list:
+        """
+        The character drawn as separate layers, bottom to top:
+        [(name, RGBA layer, (pivot_x, pivot_y))]. Pivots are the joints a part swings around.
+        """
         s = self.size
         p = self.palette
 
         # Color assignments
-        skin = p[random.randint(0, len(p)//2)]
-        body = p[random.randint(0, len(p)-1)]
+        skin = p[self.rng.randint(0, len(p)//2)]
+        body = p[self.rng.randint(0, len(p)-1)]
         accent = p[(self.palette.index(body) + 2) % len(p)]
         dark = tuple(max(0, c-60) for c in body)
         highlight = tuple(min(255, c+80) for c in body)
@@ -227,18 +751,26 @@ class SpriteGenerator:
         body_bot = body_top + body_h
         leg_h = s // 5
 
-        # Legs
+        parts = []
+        def layer(name, pivot):
+            img = self._base_canvas()
+            parts.append((name, img, pivot))
+            return ImageDraw.Draw(img)
+
+        # Shadow
+        draw = layer("shadow", (cx, s-6))
+        draw.ellipse([cx-body_w//2, s-10, cx+body_w//2, s-2], fill=(0,0,0,80))
+
+        # Legs + feet
         leg_w = body_w // 2 - 2
-        lleg_x = cx - body_w // 2
-        rleg_x = cx + 2
-        for ly in range(body_bot, body_bot + leg_h, 2):
-            draw.rectangle([lleg_x, ly, lleg_x + leg_w, ly+2], fill=dark)
-            draw.rectangle([rleg_x, ly, rleg_x + leg_w, ly+2], fill=dark)
-        # Feet
-        draw.ellipse([lleg_x-2, body_bot+leg_h-4, lleg_x+leg_w+2, body_bot+leg_h+4], fill=dark)
-        draw.ellipse([rleg_x-2, body_bot+leg_h-4, rleg_x+leg_w+2, body_bot+leg_h+4], fill=dark)
+        for name, lx in (("leg_l", cx - body_w // 2), ("leg_r", cx + 2)):
+            draw = layer(name, (lx + leg_w // 2, body_bot))
+            for ly in range(body_bot, body_bot + leg_h, 2):
+                draw.rectangle([lx, ly, lx + leg_w, ly+2], fill=dark)
+            draw.ellipse([lx-2, body_bot+leg_h-4, lx+leg_w+2, body_bot+leg_h+4], fill=dark)
 
         # Body
+        draw = layer("body", (cx, body_bot))
         draw.rounded_rectangle([cx-body_w//2, body_top, cx+body_w//2, body_bot], radius=4, fill=body)
         # Body detail line
         draw.line([(cx, body_top+4), (cx, body_bot-4)], fill=dark, width=1)
@@ -246,21 +778,23 @@ class SpriteGenerator:
         ew = body_w // 3
         draw.ellipse([cx-ew//2, body_top+body_h//4, cx+ew//2, body_top+body_h//4+ew], fill=accent)
 
-        # Arms
+        # Arms + hands
         arm_w = s // 12
         arm_h = body_h // 2 + 4
-        draw.rounded_rectangle([cx-body_w//2-arm_w-1, body_top+2, cx-body_w//2, body_top+arm_h], radius=3, fill=body)
-        draw.rounded_rectangle([cx+body_w//2+1, body_top+2, cx+body_w//2+arm_w+1, body_top+arm_h], radius=3, fill=body)
-        # Hands
         hw = arm_w + 2
-        draw.ellipse([cx-body_w//2-arm_w-1, body_top+arm_h-4, cx-body_w//2+2, body_top+arm_h+hw], fill=skin)
-        draw.ellipse([cx+body_w//2-2, body_top+arm_h-4, cx+body_w//2+arm_w+2, body_top+arm_h+hw], fill=skin)
-
-        # Neck
+        ax = cx - body_w // 2 - arm_w - 1
+        draw = layer("arm_l", (ax + arm_w // 2, body_top + 3))
+        draw.rounded_rectangle([ax, body_top+2, cx-body_w//2, body_top+arm_h], radius=3, fill=body)
+        draw.ellipse([ax, body_top+arm_h-4, cx-body_w//2+2, body_top+arm_h+hw], fill=skin)
+        ax = cx + body_w // 2 + 1
+        draw = layer("arm_r", (ax + arm_w // 2, body_top + 3))
+        draw.rounded_rectangle([ax, body_top+2, ax+arm_w, body_top+arm_h], radius=3, fill=body)
+        draw.ellipse([cx+body_w//2-2, body_top+arm_h-4, ax+arm_w+1, body_top+arm_h+hw], fill=skin)
+
+        # Neck + head
+        draw = layer("head", (cx, body_top))
         nw = 6
         draw.rectangle([cx-nw//2, head_cy+head_r-2, cx+nw//2, body_top+2], fill=skin)
-
-        # Head
         draw.ellipse([cx-head_r, head_cy-head_r, cx+head_r, head_cy+head_r], fill=skin)
         # Eyes
         ey = head_cy - 2
@@ -282,32 +816,16 @@ class SpriteGenerator:
             hair_pts.append((hx, hy))
         if len(hair_pts) > 2:
             draw.polygon(hair_pts, fill=accent)
-
-        # Shadow
-        draw.ellipse([cx-body_w//2, s-10, cx+body_w//2, s-2], fill=(0,0,0,80))
-        return img
+        return parts
 
     def _gen_tile(self) -> Image.Image:
-        img = self._base_canvas(alpha=False)
-        draw = ImageDraw.Draw(img)
         s = self.size
         p = self.palette
 
-        # Background base
-        base = p[0]
-        img.paste(base + (255,) if len(base)==3 else base, [0,0,s,s])
-
-        noise = perlin_like_noise(s, s, scale=max(4, s//8), seed=self.info["seed"])
-        arr = np.array(img.convert("RGB"), dtype=float)
-
-        # Apply noise texture
-        c1 = np.array(p[0][:3], dtype=float)
-        c2 = np.array(p[1][:3], dtype=float)
-        for y in range(s):
-            for x in range(s):
-                t = noise[y, x]
-                color = c1 * (1-t) + c2 * t
-                arr[y, x] = color
+        # Noise texture shaded through the tile ramp in one broadcast pass
+        # Periodic, so a tile sprite repeats without seams
+        noise = fbm_noise(s, s, scale=max(4, s//8), seed=self.info["seed"], wrap=True)
+        arr = gradient_ramp(noise, self._tile_ramp())
         img = Image.fromarray(arr.astype(np.uint8), "RGB")
         draw = ImageDraw.Draw(img)
 
@@ -318,7 +836,7 @@ class SpriteGenerator:
             draw.line([(0, i), (s, i)], fill=tuple(max(0,c-30) for c in p[0][:3]), width=1)
 
         # Random details
-        rng = random.Random(self.info["seed"])
+        rng = self.rng
         for _ in range(rng.randint(3, 8)):
             x, y = rng.randint(4, s-12), rng.randint(4, s-12)
             w2, h2 = rng.randint(3, 8), rng.randint(3, 8)
@@ -566,7 +1084,7 @@ class SpriteGenerator:
         s = self.size
         p = self.palette
         cx, cy = s//2, s//2
-        rng = random.Random(self.info["seed"])
+        rng = self.rng
 
         for i in range(40):
             ang = rng.uniform(0, 2*math.pi)
@@ -607,14 +1125,19 @@ class SpriteGenerator:
         draw.polygon(pts[:4], fill=(*light2, 120))
         return img
 
-    def _pixelize(self, img: Image.Image, factor: int = None) -> Image.Image:
-        """Reduce then upscale for pixel art look."""
+    def _pixel_grid(self, img: Image.Image, factor: int = None) -> Image.Image:
+        """The coarse grid _pixelize samples, before upscaling."""
         s = self.size
         factor = factor or max(2, s // 16)
         small_w, small_h = max(1, s//factor), max(1, s//factor)
-        small = img.resize((small_w, small_h), Image.NEAREST)
-        return small.resize((s, s), Image.NEAREST)
+        return img.resize((small_w, small_h), Image.NEAREST)
 
+    @timed("pixelize")
+    def _pixelize(self, img: Image.Image, factor: int = None) -> Image.Image:
+        """Reduce then upscale for pixel art look."""
+        return self._pixel_grid(img, factor).resize((self.size, self.size), Image.NEAREST)
+
+    @timed("glow")
     def _add_glow(self, img: Image.Image) -> Image.Image:
         """Add neon glow effect."""
         glow = img.filter(ImageFilter.GaussianBlur(radius=6))
@@ -622,6 +1145,7 @@ class SpriteGenerator:
         result = Image.blend(glow, img, 0.55)
         return result
 
+    @timed("cartoonify")
     def _cartoonify(self, img: Image.Image) -> Image.Image:
         """Cartoonify with edge enhancement."""
         edges = img.filter(ImageFilter.FIND_EDGES)
@@ -630,10 +1154,489 @@ class SpriteGenerator:
         return result
 
 
+# ─────────────────────────────────────────────
+#  MESH (array-backed geometry + serializers)
+# ─────────────────────────────────────────────
+
+# Unit box corners and its six quads, wound counter-clockwise seen from outside
+_BOX_CORNERS = np.array([(-1,-1,-1),(1,-1,-1),(1,1,-1),(-1,1,-1),
+                         (-1,-1,1),(1,-1,1),(1,1,1),(-1,1,1)], dtype=np.float32) / 2
+_BOX_QUADS = np.array([(3,2,1,0),(4,5,6,7),(1,5,4,0),(3,7,6,2),(2,6,5,1),(0,4,7,3)], dtype=np.int32)
+
+# Rotations taking a primitive's local +y axis onto the requested axis (det +1, so winding survives)
+_AXIS_ROT = {
+    "y": np.eye(3, dtype=np.float32),
+    "x": np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]], dtype=np.float32),
+    "z": np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]], dtype=np.float32),
+}
+
+# LOD chain: fraction of LOD0 triangles kept at each level
+LOD_RATIOS = (1.0, 0.5, 0.25, 0.1)
+LOD_MIN_TRIS = 24   # below this, clustering just collapses low-poly meshes into slivers
+
+
+def _pack_rows(rows: np.ndarray) -> np.ndarray:
+    """Non-negative integer (n,3) rows → one int64 key per row (21 bits per column), for fast 1-D unique."""
+    rows = rows.astype(np.int64)
+    if len(rows) and rows.max() >= 1 << 21:   # too wide to pack: fall back to row ids
+        return np.unique(rows, axis=0, return_inverse=True)[1].ravel()
+    return (rows[:, 0] << 42) | (rows[:, 1] << 21) | rows[:, 2]
+
+
+def _triangulate(polys: np.ndarray) -> np.ndarray:
+    """Fan-triangulate an (m,k) array of convex polygons into (m*(k-2),3)."""
+    k = polys.shape[1]
+    return np.stack([np.repeat(polys[:, :1], k-2, axis=1), polys[:, 1:-1], polys[:, 2:]], axis=2).reshape(-1, 3)
+
+
+class Mesh:
+    """
+    Triangle mesh as arrays: float32 vertices (n,3), int32 faces (m,3) and an
+    int32 material id per face indexing `materials`. Generators append parts
+    with add()/add_box(); OBJ, binary PLY and GLB serializers and the
+    rasterizer read the arrays directly.
+    """
+
+    def __init__(self, materials=("Material_Base", "Material_Accent")):
+        self.materials = list(materials)
+        self.vertices = np.zeros((0, 3), dtype=np.float32)
+        self.faces = np.zeros((0, 3), dtype=np.int32)
+        self.material_ids = np.zeros(0, dtype=np.int32)
+
+    def add(self, vertices, faces, material=0) -> "Mesh":
+        """Append a part. Faces index into `vertices`; quads and larger polygons are fan-triangulated."""
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int32)
+        if faces.shape[1] > 3:
+            faces = _triangulate(faces)
+        mat = material if isinstance(material, (int, np.integer)) else self.materials.index(material)
+        self.faces = np.concatenate([self.faces, faces + len(self.vertices)])
+        self.vertices = np.concatenate([self.vertices, vertices])
+        self.material_ids = np.concatenate([self.material_ids, np.full(len(faces), mat, dtype=np.int32)])
+        return self
+
+    def add_box(self, cx, cy, cz, w, h, d, material=0) -> "Mesh":
+        return self.add(_BOX_CORNERS * (w, h, d) + (cx, cy, cz), _BOX_QUADS, material)
+
+    def add_lathe(self, center, profile, segments=24, axis="y", material=0) -> "Mesh":
+        """
+        Surface of revolution. profile: (radius, height) rows from top to bottom;
+        rows with radius 0 close the ends (their degenerate triangles go at weld()).
+        """
+        prof = np.asarray(profile, dtype=np.float32)
+        phi = np.arange(segments) * (2 * math.pi / segments)
+        ring = np.stack([np.cos(phi), np.zeros(segments), np.sin(phi)], axis=1).astype(np.float32)
+        verts = (prof[:, None, :1] * ring[None]).reshape(-1, 3)
+        verts[:, 1] = np.repeat(prof[:, 1], segments)
+        i, j = np.meshgrid(np.arange(len(prof) - 1), np.arange(segments), indexing="ij")
+        j1 = (j + 1) % segments
+        quads = np.stack([i*segments + j, i*segments + j1, (i+1)*segments + j1, (i+1)*segments + j],
+                         axis=-1).reshape(-1, 4)
+        return self.add(verts @ _AXIS_ROT[axis].T + center, quads, material)
+
+    def add_cylinder(self, center, radius, height, segments=24, axis="y", material=0) -> "Mesh":
+        h = height / 2
+        return self.add_lathe(center, [(0, h), (radius, h), (radius, -h), (0, -h)], segments, axis, material)
+
+    def add_cone(self, center, radius, height, segments=24, axis="y", material=0) -> "Mesh":
+        h = height / 2
+        return self.add_lathe(center, [(0, h), (radius, -h), (0, -h)], segments, axis, material)
+
+    def add_sphere(self, center, radius, segments=24, rings=12, axis="y", material=0) -> "Mesh":
+        return self.add_capsule(center, radius, 0.0, segments, rings, axis, material)
+
+    def add_capsule(self, center, radius, height, segments=24, rings=12, axis="y", material=0) -> "Mesh":
+        """Cylinder of `height` capped by hemispheres (height=0 gives a sphere)."""
+        theta = np.linspace(0, math.pi / 2, rings // 2 + 1)
+        top = [(radius * math.sin(t), height / 2 + radius * math.cos(t)) for t in theta]
+        bottom = [(r, -y) for r, y in reversed(top)]
+        return self.add_lathe(center, top + bottom[0 if height else 1:], segments, axis, material)
+
+    def add_extrusion(self, center, profile, depth, axis="z", material=0) -> "Mesh":
+        """Prism from a convex (x, y) profile listed counter-clockwise, extruded `depth` along the axis."""
+        prof = np.asarray(profile, dtype=np.float32)
+        k = len(prof)
+        # Built along +y: the profile lies in the xz plane, reoriented so the default axis is z
+        front = np.column_stack([prof[:, 0], np.full(k, depth / 2), -prof[:, 1]])
+        back = front * (1, -1, 1)
+        verts = np.concatenate([front, back])
+        idx = np.arange(k)
+        sides = np.stack([idx, k + idx, k + (idx + 1) % k, (idx + 1) % k], axis=1)
+        caps = [_triangulate(idx[None]), _triangulate(k + idx[None, ::-1])]
+        self.add(verts @ _AXIS_ROT[axis].T + center, sides, material)
+        for cap in caps:
+            self.add(verts @ _AXIS_ROT[axis].T + center, cap, material)
+        return self
+
+    def weld(self, tol=1e-5) -> "Mesh":
+        """Merge vertices closer than `tol` and drop triangles that collapse; returns a new Mesh."""
+        keys = np.round(self.vertices / tol)
+        _, first, inverse = np.unique(_pack_rows(keys - keys.min(axis=0)), return_index=True, return_inverse=True)
+        return self._remap(self.vertices[first], inverse)
+
+    def decimate(self, target_tris: int) -> "Mesh":
+        """
+        Vertex-clustering decimation: snap vertices to the grid that keeps the most
+        triangles without exceeding `target_tris`, merge each cell to its mean and
+        drop collapsed or duplicate triangles.
+        """
+        return self._pick(self._clusterings(target_tris), target_tris)
+
+    def lod_chain(self, ratios=LOD_RATIOS, min_tris=LOD_MIN_TRIS) -> list:
+        """[LOD0, LOD1, …] with each level decimated to ratio × LOD0 triangles (never below min_tris)."""
+        n = len(self.faces)
+        targets = [max(int(n * r), min(n, min_tris)) for r in ratios]
+        ladder = self._clusterings(max(t for t, r in zip(targets, ratios) if r < 1) if len(ratios) > 1 else 0)
+        return [self if r >= 1 else self._pick(ladder, t) for r, t in zip(ratios, targets)]
+
+    def _clusterings(self, max_tris: int) -> list:
+        """Clustered meshes over a geometric ladder of grid sizes, coarse to fine, until well past max_tris."""
+        if not len(self.vertices):
+            return []
+        lo = self.vertices.min(axis=0)
+        extent = max(float((self.vertices.max(axis=0) - lo).max()), 1e-6)
+        out = []
+        for cells in [1] + np.unique(np.round(1.15 ** np.arange(2, 46)).astype(int)).tolist():
+            _, inverse = np.unique(_pack_rows(np.floor((self.vertices - lo) * (cells / extent))),
+                                   return_inverse=True)
+            n = inverse.max() + 1
+            counts = np.bincount(inverse, minlength=n)[:, None]
+            means = np.stack([np.bincount(inverse, self.vertices[:, a], n) for a in range(3)], axis=1) / counts
+            out.append(self._remap(means.astype(np.float32), inverse))
+            if len(out[-1].faces) > 1.5 * max_tris or len(out[-1].faces) >= len(self.faces):
+                break
+        return out
+
+    def _pick(self, candidates: list, target_tris: int) -> "Mesh":
+        """Candidate with the most triangles within budget (triangle count isn't monotonic in grid size)."""
+        if len(self.faces) <= target_tris or not candidates:
+            return self._remap(self.vertices, np.arange(len(self.vertices)))
+        fits = [m for m in candidates if len(m.faces) <= target_tris] or candidates[:1]
+        return max(fits, key=lambda m: len(m.faces))
+
+    def _remap(self, vertices, inverse) -> "Mesh":
+        """New Mesh with faces re-indexed through `inverse`, minus degenerate and duplicate triangles."""
+        faces = inverse[self.faces]
+        keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+        faces, mats = faces[keep], self.material_ids[keep]
+        _, first = np.unique(_pack_rows(np.sort(faces, axis=1)), return_index=True)
+        first.sort()
+        used, compact = np.unique(faces[first], return_inverse=True)
+        out = Mesh(self.materials)
+        out.vertices = np.ascontiguousarray(vertices[used], dtype=np.float32)
+        out.faces = compact.reshape(-1, 3).astype(np.int32)
+        out.material_ids = mats[first].astype(np.int32)
+        return out
+
+    def face_normals(self) -> np.ndarray:
+        tri = self.vertices[self.faces]
+        n = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        return n / np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+
+    def front_uvs(self, bounds=None) -> np.ndarray:
+        """
+        Planar UVs projecting a front (+z) view onto the mesh: the square around its
+        x/y bounds (or the given (lo, hi), e.g. LOD0's) maps to [0,1]².
+        """
+        lo, hi = bounds if bounds is not None else (self.vertices[:, :2].min(axis=0), self.vertices[:, :2].max(axis=0))
+        center, span = (lo + hi) / 2, max(float((hi - lo).max()), 1e-6)
+        uv = (self.vertices[:, :2] - center) / span
+        return np.stack([0.5 + uv[:, 0], 0.5 - uv[:, 1]], axis=1).astype(np.float32)
+
+    def split_by_normal(self):
+        """
+        Duplicate vertices shared by faces with different normals, for flat shading with
+        explicit normals. Returns (vertex index map (k,), normals (k,3), faces (m,3)).
+        """
+        normals = self.face_normals()
+        keys = np.concatenate([self.faces.reshape(-1, 1).astype(np.float64),
+                               np.round(np.repeat(normals, 3, axis=0), 4)], axis=1)
+        uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+        return uniq[:, 0].astype(np.int64), uniq[:, 1:].astype(np.float32), \
+            inverse.reshape(-1, 3).astype(np.int32)
+
+    def to_obj(self, comments=(), mtllib="model.mtl") -> str:
+        """Wavefront OBJ text; consecutive faces sharing a material share one usemtl."""
+        lines = [f"# {c}" for c in comments] + [f"mtllib {mtllib}", ""]
+        lines += [f"v {x:.4f} {y:.4f} {z:.4f}" for x, y, z in self.vertices.tolist()]
+        lines.append("")
+        current = None
+        for (a, b, c), mat in zip((self.faces + 1).tolist(), self.material_ids.tolist()):
+            if mat != current:
+                lines.append(f"usemtl {self.materials[mat]}")
+                current = mat
+            lines.append(f"f {a} {b} {c}")
+        return "\n".join(lines)
+
+    def to_ply(self, colors=None) -> bytes:
+        """Binary little-endian PLY; `colors` (one RGB per material) adds per-face red/green/blue."""
+        header = ["ply", "format binary_little_endian 1.0", "comment Sprite! mesh",
+                  f"element vertex {len(self.vertices)}",
+                  "property float x", "property float y", "property float z",
+                  f"element face {len(self.faces)}", "property list uchar int vertex_indices"]
+        fields = [("n", "u1"), ("idx", "<i4", (3,))]
+        if colors is not None:
+            header += ["property uchar red", "property uchar green", "property uchar blue"]
+            fields.append(("rgb", "u1", (3,)))
+        header.append("end_header")
+        faces = np.empty(len(self.faces), dtype=np.dtype(fields))
+        faces["n"] = 3
+        faces["idx"] = self.faces
+        if colors is not None:
+            faces["rgb"] = np.asarray(colors, dtype=np.uint8)[self.material_ids]
+        return ("\n".join(header) + "\n").encode("ascii") + \
+            self.vertices.astype("<f4").tobytes() + faces.tobytes()
+
+    @timed("glb_encode")
+    def to_glb(self, materials=None, uvs=None, images=(), lods=()) -> bytes:
+        """
+        Binary glTF 2.0: one primitive per material in use, flat normals.
+        materials: glTF material dicts (index = material id); defaults to plain grey.
+        uvs: optional (n,2) per-vertex TEXCOORD_0, or a callable mesh -> uvs
+        (needed with lods, which have their own vertices).
+        images: PNG bytes embedded in the BIN chunk; texture i samples image i
+        with nearest filtering, so materials refer to them by index.
+        lods: coarser meshes, written as nodes "LOD1"… linked from "LOD0" via MSFT_lod.
+        """
+        if materials is None:
+            materials = [{"name": name, "pbrMetallicRoughness": {"baseColorFactor": [0.8, 0.8, 0.8, 1.0]}}
+                         for name in self.materials]
+        blobs, views, accessors = [], [], []
+
+        def add_view(data: bytes, target=None):
+            offset = sum(len(b) for b in blobs)
+            blobs.append(data + b"\0" * (-len(data) % 4))
+            views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(data),
+                          **({"target": target} if target else {})})
+            return len(views) - 1
+
+        def add_accessor(arr, ctype, kind, target, bounds=False):
+            acc = {"bufferView": add_view(arr.tobytes(), target), "componentType": ctype,
+                   "count": len(arr), "type": kind}
+            if bounds:
+                acc["min"], acc["max"] = arr.min(axis=0).tolist(), arr.max(axis=0).tolist()
+            accessors.append(acc)
+            return len(accessors) - 1
+
+        meshes = []
+        for mesh in (self,) + tuple(lods):
+            src, normals, faces = mesh.split_by_normal()
+            attributes = {}
+            if len(src):
+                attributes["POSITION"] = add_accessor(mesh.vertices[src].astype("<f4"), 5126, "VEC3", 34962, True)
+                attributes["NORMAL"] = add_accessor(normals.astype("<f4"), 5126, "VEC3", 34962)
+                if uvs is not None:
+                    tex = uvs(mesh) if callable(uvs) else uvs
+                    attributes["TEXCOORD_0"] = add_accessor(np.asarray(tex, "<f4")[src], 5126, "VEC2", 34962)
+            primitives = []
+            for mat in np.unique(mesh.material_ids).tolist():
+                idx = faces[mesh.material_ids == mat].astype("<u4").ravel()
+                primitives.append({"attributes": attributes, "material": mat,
+                                   "indices": add_accessor(idx, 5125, "SCALAR", 34963)})
+            meshes.append({"primitives": primitives})
+
+        nodes = [{"name": f"LOD{i}", "mesh": i} for i in range(len(meshes))]
+        gltf = {
+            "asset": {"version": "2.0", "generator": f"Sprite! {ENGINE_VERSION}"},
+            "scene": 0, "scenes": [{"nodes": [0]}], "nodes": nodes,
+            "meshes": meshes,
+            "materials": materials,
+        }
+        if lods:
+            nodes[0]["extensions"] = {"MSFT_lod": {"ids": list(range(1, len(nodes)))}}
+            nodes[0]["extras"] = {"triangles": [len(m.faces) for m in (self,) + tuple(lods)]}
+            gltf["extensionsUsed"] = ["MSFT_lod"]
+        if images:
+            gltf["images"] = [{"bufferView": add_view(png), "mimeType": "image/png"} for png in images]
+            gltf["samplers"] = [{"magFilter": 9728, "minFilter": 9728}]   # NEAREST keeps pixel art crisp
+            gltf["textures"] = [{"sampler": 0, "source": i} for i in range(len(images))]
+        binary = b"".join(blobs)
+        gltf.update({"buffers": [{"byteLength": len(binary)}], "bufferViews": views, "accessors": accessors})
+        return _glb_container(gltf, binary)
+
+
+def _glb_container(gltf: dict, binary: bytes) -> bytes:
+    """Wrap glTF JSON + BIN chunk in the GLB header (both chunks padded to 4 bytes)."""
+    js = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    js += b" " * (-len(js) % 4)
+    binary += b"\0" * (-len(binary) % 4)
+    total = 12 + 8 + len(js) + 8 + len(binary)
+    return (struct.pack("<4sII", b"glTF", 2, total) +
+            struct.pack("<I4s", len(js), b"JSON") + js +
+            struct.pack("<I4s", len(binary), b"BIN\0") + binary)
+
+
+# ─────────────────────────────────────────────
+#  SOFTWARE RASTERIZER (3D view renders)
+# ─────────────────────────────────────────────
+
+RASTER_TILES = (4, 8, 12, 16, 24, 32)   # bbox size buckets for batch-rasterized small triangles (larger ones loop)
+RASTER_BATCH_PIXELS = 1 << 20   # candidate pixels per batch, bounding the temporaries
+
+# (name, label, elevation°, azimuth°); y is up, azimuth 0 looks from +z
+RASTER_VIEWS = [
+    ("front", "FRONT", 10, 0),
+    ("rear", "REAR", 10, 180),
+    ("left", "LEFT SIDE", 10, -90),
+    ("top", "TOP", 90, 0),
+]
+
+
+def _camera_basis(elev: float, azim: float):
+    """Right, up and forward unit vectors for a camera orbiting the origin."""
+    e, a = math.radians(elev), math.radians(azim)
+    forward = -np.array([math.cos(e) * math.sin(a), math.sin(e), math.cos(e) * math.cos(a)])
+    world_up = np.array([0.0, 1.0, 0.0]) if abs(forward[1]) < 0.99 else np.array([0.0, 0.0, -1.0])
+    right = np.cross(forward, world_up)
+    right /= np.linalg.norm(right)
+    return right, np.cross(right, forward), forward
+
+
+def rasterize_mesh(V: np.ndarray, F: np.ndarray, face_rgb: np.ndarray, elev=10, azim=0,
+                   size=240, perspective=False, background=(17, 17, 24), ssaa=2,
+                   cull=False) -> np.ndarray:
+    """
+    Z-buffered triangle rasterizer with two-sided Lambert shading.
+    V: (n,3) vertices, F: (m,3) triangle indices, face_rgb: (m,3) base colours 0-255.
+    cull=True skips back faces; only valid for closed, consistently wound meshes.
+    Returns an (size,size,3) uint8 image; ssaa>1 supersamples then box-filters.
+    """
+    res = size * ssaa
+    color = np.empty((res, res, 3), dtype=np.uint8)
+    color[:] = background
+    if len(F) == 0:
+        return color[::ssaa, ::ssaa].copy()
+    zbuf = np.full((res, res), np.inf, dtype=np.float32)
+
+    V = np.asarray(V, dtype=np.float64)
+    center = (V.min(axis=0) + V.max(axis=0)) / 2
+    radius = max(float(np.linalg.norm(V - center, axis=1).max()), 1e-6)
+    right, up, forward = _camera_basis(elev, azim)
+    rel = V - center
+    cx, cy, depth = rel @ right, rel @ up, rel @ forward
+    if perspective:
+        dist = radius * 3.0
+        depth = depth + dist
+        f = dist / np.maximum(depth, 1e-6)
+        cx, cy = cx * f, cy * f
+        zkey = -1.0 / np.maximum(depth, 1e-6)   # 1/z interpolates linearly in screen space
+    else:
+        zkey = depth
+    scale = res * 0.45 / radius
+    sx = res / 2 + cx * scale
+    sy = res / 2 - cy * scale
+
+    # Per-face Lambert term from a light over the viewer's left shoulder
+    tri = V[F]
+    n = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    n /= np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+    light = -forward * 0.8 + up * 0.45 - right * 0.35
+    light /= np.linalg.norm(light)
+    shade = 0.35 + 0.65 * np.abs(n @ light)
+    face_col = np.clip(np.round(face_rgb * shade[:, None]), 0, 255).astype(np.uint8)
+    if cull:
+        # Signed volume tells whether the winding points normals outward or inward
+        outward = np.sign(np.einsum("ij,ij->i", tri[:, 0], np.cross(tri[:, 1], tri[:, 2])).sum()) or 1.0
+        if perspective:
+            facing = np.einsum("ij,ij->i", n, tri[:, 0] - (center - forward * radius * 3.0)) * outward < 0
+        else:
+            facing = (n @ forward) * outward < 0
+        F, face_col = F[facing], face_col[facing]
+
+    # Barycentrics and depth are affine in screen space: w = a*x + b*y + c per triangle
+    X, Y, Z = sx[F], sy[F], zkey[F]
+    area = (X[:, 1] - X[:, 0]) * (Y[:, 2] - Y[:, 0]) - (X[:, 2] - X[:, 0]) * (Y[:, 1] - Y[:, 0])
+    keep = np.abs(area) > 1e-9
+    X, Y, Z, area, face_col = X[keep], Y[keep], Z[keep], area[keep], face_col[keep]
+    i1, i2 = [1, 2, 0], [2, 0, 1]
+    wa = (Y[:, i1] - Y[:, i2]) / area[:, None]
+    wb = (X[:, i2] - X[:, i1]) / area[:, None]
+    wc = (X[:, i1] * Y[:, i2] - X[:, i2] * Y[:, i1]) / area[:, None]
+    za, zb_, zc = (wa * Z).sum(1), (wb * Z).sum(1), (wc * Z).sum(1)
+    wa, wb, wc, za, zb_, zc = (c.astype(np.float32) for c in (wa, wb, wc, za, zb_, zc))
+    x_lo = np.clip(np.floor(X.min(axis=1)), 0, res).astype(int)
+    x_hi = np.clip(np.ceil(X.max(axis=1)), 0, res).astype(int)
+    y_lo = np.clip(np.floor(Y.min(axis=1)), 0, res).astype(int)
+    y_hi = np.clip(np.ceil(Y.max(axis=1)), 0, res).astype(int)
+    centers = np.arange(res, dtype=np.float32) + 0.5
+    extent = np.maximum(x_hi - x_lo, y_hi - y_lo)
+    small = extent <= RASTER_TILES[-1]
+
+    # Small triangles: rasterize batches over fixed tile×tile windows (bucketed by size),
+    # then keep the nearest fragment per pixel
+    flat_z, flat_rgb = zbuf.reshape(-1), color.reshape(-1, 3)
+    batches = []
+    for lo_t, t in zip((-1,) + RASTER_TILES, RASTER_TILES):
+        in_bucket = np.nonzero((extent > lo_t) & (extent <= t))[0]
+        per = max(1, RASTER_BATCH_PIXELS // (t * t))
+        batches += [(t, in_bucket[k:k + per]) for k in range(0, len(in_bucket), per)]
+    for t, ids in batches:
+        tile = np.arange(t)
+        gx = x_lo[ids, None, None] + tile[None, None, :]
+        gy = y_lo[ids, None, None] + tile[None, :, None]
+        px, py = centers[np.minimum(gx, res - 1)], centers[np.minimum(gy, res - 1)]
+        hit = (gx < x_hi[ids, None, None]) & (gy < y_hi[ids, None, None])
+        for k in range(3):
+            hit &= (px * wa[ids, k, None, None] + py * wb[ids, k, None, None] + wc[ids, k, None, None]) >= 0
+        z = (px * za[ids, None, None] + py * zb_[ids, None, None] + zc[ids, None, None])[hit]
+        pix = (gy * res + gx)[hit]
+        tri_of = np.broadcast_to(ids[:, None, None], hit.shape)[hit]
+        order = np.lexsort((z, pix))
+        pix, z, tri_of = pix[order], z[order], tri_of[order]
+        first = np.ones(len(pix), dtype=bool)
+        first[1:] = pix[1:] != pix[:-1]
+        pix, z, tri_of = pix[first], z[first], tri_of[first]
+        closer = z < flat_z[pix]
+        flat_z[pix[closer]] = z[closer]
+        flat_rgb[pix[closer]] = face_col[tri_of[closer]]
+
+    for i in np.nonzero(~small)[0]:
+        xs, ys = slice(x_lo[i], x_hi[i]), slice(y_lo[i], y_hi[i])
+        px, py = centers[xs], centers[ys, None]
+        if px.size == 0 or py.size == 0:
+            continue
+        hit = (px * wa[i, 0] + (py * wb[i, 0] + wc[i, 0])) >= 0
+        hit &= (px * wa[i, 1] + (py * wb[i, 1] + wc[i, 1])) >= 0
+        hit &= (px * wa[i, 2] + (py * wb[i, 2] + wc[i, 2])) >= 0
+        z = px * za[i] + (py * zb_[i] + zc[i])
+        zbox = zbuf[ys, xs]
+        hit &= z < zbox
+        zbox[hit] = z[hit]
+        color[ys, xs][hit] = face_col[i]
+
+    if ssaa > 1:
+        return np.asarray(Image.fromarray(color, "RGB").reduce(ssaa))
+    return color
+
+
 # ─────────────────────────────────────────────
 #  3D ASSET GENERATORS (OBJ + multi-view renders)
 # ─────────────────────────────────────────────
 
+def _bleed_alpha(img: Image.Image) -> Image.Image:
+    """Fill transparent pixels with the nearest opaque colour so a texture has no black holes."""
+    from scipy.ndimage import distance_transform_edt
+    arr = np.asarray(img.convert("RGBA"))
+    empty = arr[..., 3] < 128
+    if not empty.any() or empty.all():
+        return img.convert("RGB")
+    _, (iy, ix) = distance_transform_edt(empty, return_indices=True)
+    return Image.fromarray(np.ascontiguousarray(arr[iy, ix, :3]), "RGB")
+
+
+def _metal_rough_texture(roughness: Image.Image, ao: Image.Image = None) -> Image.Image:
+    """glTF metallicRoughness layout: roughness in G, metallic (0) in B, plus occlusion in R (ORM) when given."""
+    g = np.asarray(roughness.convert("L"))
+    arr = np.zeros(g.shape + (3,), dtype=np.uint8)
+    arr[..., 1] = g
+    if ao is not None:
+        arr[..., 0] = np.asarray(ao.convert("L"))
+    return Image.fromarray(arr, "RGB")
+
+
+OBJ_TITLES = {"character": "Character", "vehicle": "Vehicle", "environment": "Environment"}
+
+
 class Asset3DGenerator:
     """Generates simple 3D mesh data + renders multi-view images."""
 
@@ -641,16 +1644,73 @@ class Asset3DGenerator:
         self.info = info
         self.size = min(info["size"], 256)
         self.palette = get_palette(info["palette"])
-        random.seed(info["seed"])
-        np.random.seed(info["seed"] % (2**31))
+        self.rng = random.Random(info["seed"])
+        self.np_rng = np.random.default_rng(info["seed"])
 
-    def generate_obj(self) -> str:
-        """Generate a .obj mesh string based on category."""
+    @timed("mesh")
+    def build_mesh(self) -> Mesh:
+        """Build the category's mesh."""
         cat = self.info["category"]
-        if cat == "character":   return self._char_obj()
-        elif cat == "vehicle":   return self._vehicle_obj()
-        elif cat == "environment": return self._env_obj()
-        else:                    return self._generic_obj()
+        mesh = Mesh()
+        if cat == "character":   self._char_parts(mesh)
+        elif cat == "vehicle":   self._vehicle_parts(mesh)
+        elif cat == "environment": self._env_parts(mesh)
+        else:                    self._generic_parts(mesh)
+        return mesh.weld()
+
+    @timed("lods")
+    def build_lods(self, mesh: Mesh = None) -> list:
+        """LOD0–LOD3 of the category mesh (see LOD_RATIOS)."""
+        return (mesh or self.build_mesh()).lod_chain()
+
+    def generate_obj(self, mesh: Mesh = None) -> str:
+        """Generate a .obj mesh string based on category."""
+        title = OBJ_TITLES.get(self.info["category"], "Generic")
+        return (mesh or self.build_mesh()).to_obj([f"Sprite! OBJ - {title}", self.info["prompt"]])
+
+    def generate_ply(self, mesh: Mesh = None) -> bytes:
+        """Binary PLY with per-face material colours."""
+        return (mesh or self.build_mesh()).to_ply([self.palette[0][:3], self.palette[1][:3]])
+
+    def generate_glb(self, mesh: Mesh = None, maps: dict = None, lods=None) -> bytes:
+        """
+        Binary glTF with PBR factors matching generate_mtl(). With `maps`
+        ({"sprite", "normal", "emissive", "roughness"} PIL images and optionally "ao",
+        as the pack computes them) the maps are embedded and wired to both materials,
+        front-projected onto the mesh. `lods` (from build_lods) adds LOD1+ nodes.
+        """
+        mesh = mesh or self.build_mesh()
+        lods = (lods or [mesh])[1:]
+        if not maps:
+            return mesh.to_glb(self.gltf_materials(), lods=lods)
+        images = [encode_png(_bleed_alpha(maps["sprite"]), "RGB"),
+                  encode_png(maps["normal"], "RGB"),
+                  encode_png(maps["emissive"], "RGB"),
+                  encode_png(_metal_rough_texture(maps["roughness"], maps.get("ao")), "RGB")]
+        bounds = (mesh.vertices[:, :2].min(axis=0), mesh.vertices[:, :2].max(axis=0))
+        return mesh.to_glb(self.gltf_materials(textured=True, occlusion="ao" in maps),
+                           uvs=lambda m: m.front_uvs(bounds), images=images, lods=lods)
+
+    def gltf_materials(self, textured=False, occlusion=False) -> list:
+        """
+        glTF materials; textured=True points them at images 0-3 (base, normal, emissive, metal/rough),
+        and occlusion=True also reads ambient occlusion from image 3's red channel.
+        """
+        out = []
+        for name, col, rough in (("Material_Base", self.palette[0], 0.6), ("Material_Accent", self.palette[1], 0.4)):
+            mat = {"name": name, "pbrMetallicRoughness": {
+                "baseColorFactor": [round(c/255, 4) for c in col[:3]] + [1.0],
+                "metallicFactor": 0.0, "roughnessFactor": rough}}
+            if textured:
+                pbr = mat["pbrMetallicRoughness"]
+                pbr.update({"baseColorFactor": [1.0, 1.0, 1.0, 1.0], "roughnessFactor": 1.0,
+                            "baseColorTexture": {"index": 0}, "metallicRoughnessTexture": {"index": 3}})
+                mat.update({"normalTexture": {"index": 1}, "emissiveTexture": {"index": 2},
+                            "emissiveFactor": [1.0, 1.0, 1.0]})
+                if occlusion:
+                    mat["occlusionTexture"] = {"index": 3}
+            out.append(mat)
+        return out
 
     def generate_mtl(self) -> str:
         """Generate .mtl material string."""
@@ -674,167 +1734,112 @@ Ns 64.0
 d 1.0
 """
 
-    def _char_obj(self) -> str:
-        """Simple humanoid mesh (body parts as boxes/cylinders approximated)."""
-        verts = []
-        faces = []
-
-        def add_box(cx, cy, cz, w, h, d, mat="Material_Base"):
-            base = len(verts) + 1
-            hw, hh, hd = w/2, h/2, d/2
-            box_verts = [
-                (cx-hw,cy-hh,cz-hd),(cx+hw,cy-hh,cz-hd),(cx+hw,cy+hh,cz-hd),(cx-hw,cy+hh,cz-hd),
-                (cx-hw,cy-hh,cz+hd),(cx+hw,cy-hh,cz+hd),(cx+hw,cy+hh,cz+hd),(cx-hw,cy+hh,cz+hd),
-            ]
-            for v in box_verts: verts.append(v)
-            box_faces = [
-                f"usemtl {mat}\n"
-                f"f {base} {base+1} {base+2} {base+3}\n"
-                f"f {base+7} {base+6} {base+5} {base+4}\n"
-                f"f {base} {base+4} {base+5} {base+1}\n"
-                f"f {base+2} {base+6} {base+7} {base+3}\n"
-                f"f {base+1} {base+5} {base+6} {base+2}\n"
-                f"f {base+3} {base+7} {base+4} {base}\n"
-            ]
-            faces.extend(box_faces)
-
-        # Body parts (y=up convention)
-        add_box(0, 0.5, 0, 0.5, 0.7, 0.3, "Material_Base")       # torso
-        add_box(0, 1.3, 0, 0.35, 0.35, 0.35, "Material_Accent")  # head
-        add_box(-0.4, 0.5, 0, 0.15, 0.6, 0.25, "Material_Base")  # left arm
-        add_box(0.4, 0.5, 0, 0.15, 0.6, 0.25, "Material_Base")   # right arm
-        add_box(-0.15, -0.2, 0, 0.18, 0.6, 0.25, "Material_Base") # left leg
-        add_box(0.15, -0.2, 0, 0.18, 0.6, 0.25, "Material_Base")  # right leg
-
-        lines = ["# Sprite! OBJ Export", f"# {self.info['prompt']}", "mtllib asset.mtl", ""]
-        for v in verts:
-            lines.append(f"v {v[0]:.4f} {v[1]:.4f} {v[2]:.4f}")
-        lines.append("")
-        for f in faces:
-            lines.append(f.strip())
-        return "\n".join(lines)
-
-    def _vehicle_obj(self) -> str:
-        verts = []
-        faces = []
-
-        def add_box(cx, cy, cz, w, h, d, mat="Material_Base"):
-            base = len(verts) + 1
-            hw, hh, hd = w/2, h/2, d/2
-            for v in [(cx-hw,cy-hh,cz-hd),(cx+hw,cy-hh,cz-hd),(cx+hw,cy+hh,cz-hd),(cx-hw,cy+hh,cz-hd),
-                      (cx-hw,cy-hh,cz+hd),(cx+hw,cy-hh,cz+hd),(cx+hw,cy+hh,cz+hd),(cx-hw,cy+hh,cz+hd)]:
-                verts.append(v)
-            faces.append(f"usemtl {mat}\nf {base} {base+1} {base+2} {base+3}\nf {base+7} {base+6} {base+5} {base+4}\nf {base} {base+4} {base+5} {base+1}\nf {base+2} {base+6} {base+7} {base+3}\nf {base+1} {base+5} {base+6} {base+2}\nf {base+3} {base+7} {base+4} {base}")
-
-        # Car body
-        add_box(0, 0.2, 0, 1.8, 0.4, 0.9, "Material_Base")
-        add_box(0, 0.6, 0.05, 1.0, 0.4, 0.75, "Material_Accent")
+    def _char_parts(self, mesh: Mesh):
+        """Humanoid: tapered torso, sphere head, capsule arms, cylinder legs (y=up)."""
+        mesh.add_extrusion((0, 0.5, 0), [(-0.2, -0.35), (0.2, -0.35), (0.27, 0.25), (0.2, 0.35),
+                                         (-0.2, 0.35), (-0.27, 0.25)], 0.3, material="Material_Base")  # torso
+        mesh.add_sphere((0, 1.08, 0), 0.2, material="Material_Accent")                   # head
+        mesh.add_cylinder((0, 0.9, 0), 0.07, 0.1, 12, material="Material_Base")           # neck
+        for side in (-1, 1):
+            mesh.add_capsule((side * 0.36, 0.52, 0), 0.07, 0.46, material="Material_Base")  # arms
+            mesh.add_cylinder((side * 0.12, -0.2, 0), 0.09, 0.6, material="Material_Base")  # legs
+            mesh.add_box(side * 0.12, -0.53, 0.04, 0.16, 0.08, 0.28, "Material_Accent")     # boots
+
+    def _vehicle_parts(self, mesh: Mesh):
+        # Body and cabin as extruded side profiles
+        mesh.add_extrusion((0, 0, 0), [(-0.9, 0.0), (0.9, 0.0), (0.9, 0.25), (0.7, 0.4), (-0.75, 0.4),
+                                       (-0.9, 0.3)], 0.9, axis="z", material="Material_Base")
+        mesh.add_extrusion((0, 0, 0.02), [(-0.45, 0.4), (0.35, 0.4), (0.2, 0.75), (-0.35, 0.75)], 0.75,
+                           axis="z", material="Material_Accent")
         # Wheels
-        for wx, wz in [(-0.7,-0.5),( 0.7,-0.5),(-0.7, 0.5),(0.7, 0.5)]:
-            add_box(wx, -0.05, wz, 0.15, 0.3, 0.3, "Material_Base")
-
-        lines = ["# Sprite! OBJ - Vehicle", f"# {self.info['prompt']}", "mtllib asset.mtl", ""]
-        for v in verts: lines.append(f"v {v[0]:.4f} {v[1]:.4f} {v[2]:.4f}")
-        lines.append("")
-        for f in faces: lines.append(f.strip())
-        return "\n".join(lines)
-
-    def _env_obj(self) -> str:
-        """Tree-like environment object."""
-        verts, faces = [], []
-
-        def add_box(cx,cy,cz,w,h,d,mat="Material_Base"):
-            base=len(verts)+1
-            hw,hh,hd=w/2,h/2,d/2
-            for v in [(cx-hw,cy-hh,cz-hd),(cx+hw,cy-hh,cz-hd),(cx+hw,cy+hh,cz-hd),(cx-hw,cy+hh,cz-hd),
-                      (cx-hw,cy-hh,cz+hd),(cx+hw,cy-hh,cz+hd),(cx+hw,cy+hh,cz+hd),(cx-hw,cy+hh,cz+hd)]:
-                verts.append(v)
-            faces.append(f"usemtl {mat}\nf {base} {base+1} {base+2} {base+3}\nf {base+7} {base+6} {base+5} {base+4}\nf {base} {base+4} {base+5} {base+1}\nf {base+2} {base+6} {base+7} {base+3}\nf {base+1} {base+5} {base+6} {base+2}\nf {base+3} {base+7} {base+4} {base}")
-
-        add_box(0, 0.5, 0, 0.2, 1.0, 0.2, "Material_Base")  # trunk
-        add_box(0, 1.4, 0, 0.9, 0.5, 0.9, "Material_Accent")  # canopy low
-        add_box(0, 1.9, 0, 0.65, 0.4, 0.65, "Material_Accent") # canopy mid
-        add_box(0, 2.3, 0, 0.4, 0.35, 0.4, "Material_Accent")  # canopy top
-
-        lines = ["# Sprite! OBJ - Environment", f"# {self.info['prompt']}", "mtllib asset.mtl", ""]
-        for v in verts: lines.append(f"v {v[0]:.4f} {v[1]:.4f} {v[2]:.4f}")
-        lines.append("")
-        for f in faces: lines.append(f.strip())
-        return "\n".join(lines)
-
-    def _generic_obj(self) -> str:
-        """Cube with chamfered-look layering."""
-        verts, faces = [], []
-
-        def add_box(cx,cy,cz,w,h,d,mat="Material_Base"):
-            base=len(verts)+1
-            hw,hh,hd=w/2,h/2,d/2
-            for v in [(cx-hw,cy-hh,cz-hd),(cx+hw,cy-hh,cz-hd),(cx+hw,cy+hh,cz-hd),(cx-hw,cy+hh,cz-hd),
-                      (cx-hw,cy-hh,cz+hd),(cx+hw,cy-hh,cz+hd),(cx+hw,cy+hh,cz+hd),(cx-hw,cy+hh,cz+hd)]:
-                verts.append(v)
-            faces.append(f"usemtl {mat}\nf {base} {base+1} {base+2} {base+3}\nf {base+7} {base+6} {base+5} {base+4}\nf {base} {base+4} {base+5} {base+1}\nf {base+2} {base+6} {base+7} {base+3}\nf {base+1} {base+5} {base+6} {base+2}\nf {base+3} {base+7} {base+4} {base}")
-
-        add_box(0,0,0,1,1,1,"Material_Base")
-        add_box(0,0,0,0.8,0.8,0.8,"Material_Accent")
-
-        lines = ["# Sprite! OBJ - Generic", f"# {self.info['prompt']}", "mtllib asset.mtl", ""]
-        for v in verts: lines.append(f"v {v[0]:.4f} {v[1]:.4f} {v[2]:.4f}")
-        lines.append("")
-        for f in faces: lines.append(f.strip())
-        return "\n".join(lines)
+        for wx, wz in [(-0.55,-0.45),( 0.55,-0.45),(-0.55, 0.45),(0.55, 0.45)]:
+            mesh.add_cylinder((wx, 0.0, wz), 0.16, 0.14, axis="z", material="Material_Base")
+
+    def _env_parts(self, mesh: Mesh):
+        """Tree: cylinder trunk under a stacked-cone pine or a cluster of round canopies."""
+        mesh.add_cylinder((0, 0.5, 0), 0.1, 1.0, 12, material="Material_Base")  # trunk
+        # Own rng, so every build_mesh() on this generator picks the same tree
+        if random.Random(self.info["seed"]).random() < 0.5:
+            for y, r, h in ((1.3, 0.6, 0.8), (1.75, 0.45, 0.65), (2.15, 0.3, 0.55)):
+                mesh.add_cone((0, y, 0), r, h, material="Material_Accent")
+        else:
+            mesh.add_sphere((0, 1.45, 0), 0.5, material="Material_Accent")
+            for dx, dy, dz, r in ((-0.35, 1.3, 0.1, 0.32), (0.35, 1.35, -0.05, 0.34), (0.05, 1.85, 0, 0.33)):
+                mesh.add_sphere((dx, dy, dz), r, material="Material_Accent")
+
+    def _generic_parts(self, mesh: Mesh):
+        """Chamfered crate with a band around its middle."""
+        c = 0.5 - 0.12
+        octagon = [(-c, -0.5), (c, -0.5), (0.5, -c), (0.5, c), (c, 0.5), (-c, 0.5), (-0.5, c), (-0.5, -c)]
+        mesh.add_extrusion((0, 0, 0), octagon, 1.0, material="Material_Base")
+        mesh.add_extrusion((0, 0, 0), [(x * 1.05, y * 1.05) for x, y in octagon], 0.2,
+                           material="Material_Accent")
 
     def render_views(self) -> dict:
         """
-        Render front, rear, side (left), top views using matplotlib 3D.
+        Render front, rear, side (left), top views with the configured backend.
         Returns dict of view_name -> PNG bytes (base64).
         """
-        import matplotlib
-        matplotlib.use('Agg')
-        import matplotlib.pyplot as plt
+        return {name: base64.b64encode(png).decode() for name, png in self.render_view_pngs().items()}
+
+    @timed("render_views")
+    def render_view_pngs(self, backend: str = None, mesh: Mesh = None) -> dict:
+        """Same views as render_views, as raw PNG bytes."""
+        backend = backend or RENDER_BACKEND
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend: {backend}")
+        mesh = mesh or self.build_mesh()
+        if backend == "matplotlib":
+            try:
+                return self._render_views_matplotlib(mesh)
+            except ImportError:
+                pass
+        return self._render_views_raster(mesh)
+
+    def _render_views_raster(self, mesh: Mesh, size=240) -> dict:
+        """Front/rear/left/top from the NumPy rasterizer, framed like the matplotlib renders."""
+        face_rgb = np.array([self.palette[0][:3], self.palette[1][:3]], dtype=np.float64)[mesh.material_ids]
+        out = {}
+        for name, label, elev, azim in RASTER_VIEWS:
+            arr = rasterize_mesh(mesh.vertices, mesh.faces, face_rgb, elev, azim, size=size, cull=True)
+            img = Image.new("RGB", (size + 16, size + 16), (10, 10, 15))
+            img.paste(Image.fromarray(arr, "RGB"), (8, 8))
+            draw = ImageDraw.Draw(img)
+            tw = draw.textlength(label)
+            draw.text(((img.width - tw) / 2, size - 6), label, fill=(160, 160, 176))
+            out[name] = encode_png(img)
+        return out
+
+    def _render_views_matplotlib(self, mesh: Mesh) -> dict:
+        """Original matplotlib Poly3DCollection renders (fallback backend)."""
+        # Figure + Agg canvas rather than pyplot: pyplot's global figure state is not thread-safe
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
         from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
-        obj_str = self.generate_obj()
-        verts_list = []
-        faces_data = []
-        current_mat = "Material_Base"
-
-        for line in obj_str.split('\n'):
-            line = line.strip()
-            if line.startswith('v '):
-                parts = line.split()
-                verts_list.append([float(parts[1]), float(parts[2]), float(parts[3])])
-            elif line.startswith('usemtl'):
-                current_mat = line.split()[-1]
-            elif line.startswith('f '):
-                indices = [int(x)-1 for x in line.split()[1:]]
-                faces_data.append((indices, current_mat))
-
-        V = np.array(verts_list) if verts_list else np.zeros((8,3))
+        V = mesh.vertices.astype(np.float64)
+        accent_id = mesh.materials.index("Material_Accent")
         col_base = [c/255 for c in self.palette[0][:3]] + [0.85]
         col_accent = [c/255 for c in self.palette[1][:3]] + [0.85]
 
         def render(elev, azim, title):
-            fig = plt.figure(figsize=(3,3), facecolor='#0a0a0f')
+            fig = Figure(figsize=(3,3), facecolor='#0a0a0f')
+            FigureCanvasAgg(fig)
             ax = fig.add_subplot(111, projection='3d', facecolor='#111118')
             ax.set_facecolor('#111118')
 
-            polys_base, polys_accent = [], []
-            for indices, mat in faces_data:
-                if len(indices) >= 3:
-                    poly = [V[i].tolist() for i in indices]
-                    if mat == "Material_Accent":
-                        polys_accent.append(poly)
-                    else:
-                        polys_base.append(poly)
+            is_accent = mesh.material_ids == accent_id
+            polys_base = V[mesh.faces[~is_accent]]
+            polys_accent = V[mesh.faces[is_accent]]
 
             ec1 = [c/255 for c in self.palette[0][:3]] + [0.3]
             ec2 = [c/255 for c in self.palette[1][:3]] + [0.3]
-            if polys_base:
+            if len(polys_base):
                 coll = Poly3DCollection(polys_base, alpha=0.85, linewidths=0.3,
                                         edgecolors=[ec1],
                                         facecolors=[col_base])
                 ax.add_collection3d(coll)
-            if polys_accent:
+            if len(polys_accent):
                 coll2 = Poly3DCollection(polys_accent, alpha=0.85, linewidths=0.3,
                                          edgecolors=[ec2],
                                          facecolors=[col_accent])
@@ -857,11 +1862,9 @@ d 1.0
                       fontfamily='monospace')
 
             buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=80, bbox_inches='tight',
+            fig.savefig(buf, format='png', dpi=80, bbox_inches='tight',
                        facecolor='#0a0a0f', edgecolor='none')
-            plt.close()
-            buf.seek(0)
-            return base64.b64encode(buf.read()).decode()
+            return buf.getvalue()
 
         return {
             "front": render(10, -90, "FRONT"),
@@ -875,51 +1878,365 @@ d 1.0
 #  TILEMAP GENERATOR
 # ─────────────────────────────────────────────
 
-class TilemapGenerator:
-    """Generates a full tilemap sheet from a prompt."""
+# Blob autotile neighbour bits, clockwise from north
+BLOB_N, BLOB_NE, BLOB_E, BLOB_SE, BLOB_S, BLOB_SW, BLOB_W, BLOB_NW = (1 << i for i in range(8))
+_BLOB_CORNERS = ((BLOB_NE, BLOB_N, BLOB_E), (BLOB_SE, BLOB_S, BLOB_E),
+                 (BLOB_SW, BLOB_S, BLOB_W), (BLOB_NW, BLOB_N, BLOB_W))
+
+
+def blob_mask(mask: int) -> int:
+    """Drop corner bits whose two adjacent edges are not both set (256 masks -> 47 blob tiles)."""
+    for corner, a, b in _BLOB_CORNERS:
+        if mask & corner and not (mask & a and mask & b):
+            mask &= ~corner
+    return mask
+
+
+# The 47 distinct blob tiles in sheet order; BLOB_INDEX maps any 8-neighbour mask to its tile
+BLOB_MASKS = sorted({blob_mask(m) for m in range(256)})
+BLOB_INDEX = [BLOB_MASKS.index(blob_mask(m)) for m in range(256)]
+BLOB_COLS = 8
 
-    def __init__(self, info: dict, cols=4, rows=4):
+TILEMAP_MAX_CELLS = 64
+
+
+class TilemapGenerator:
+    """
+    Generates a full tilemap sheet from a prompt.
+
+    Every tile is rendered at tile_size, cut from one noise field shared by the sheet,
+    so neighbouring tiles join. wrap=True makes the field periodic (the sheet tiles
+    seamlessly; a 1x1 sheet is a seamless tile). autotile=True emits the 47-tile blob set
+    instead, all cut from one tile-periodic field so any pair of blob tiles joins.
+    chunk=(cx, cy) renders that cols x rows window of an unbounded field instead (see WorldGenerator);
+    noise overrides fbm_noise arguments.
+    """
+
+    def __init__(self, info: dict, cols=4, rows=4, wrap=False, autotile=False, chunk=None, noise=None):
         self.info = info
-        self.cols = cols
-        self.rows = rows
+        self.cols = max(1, min(TILEMAP_MAX_CELLS, cols))
+        self.rows = max(1, min(TILEMAP_MAX_CELLS, rows))
         self.tile_size = info.get("tile_size", 32)
-
+        self.wrap = wrap
+        self.autotile = autotile
+        self.chunk = chunk
+        self.noise = noise or {}
+        if autotile:
+            self.cols, self.rows = BLOB_COLS, -(-len(BLOB_MASKS) // BLOB_COLS)
+
+    @timed("tilemap")
     def generate(self) -> Image.Image:
-        total_w = self.cols * self.tile_size
-        total_h = self.rows * self.tile_size
-        sheet = Image.new("RGBA", (total_w, total_h), (0,0,0,0))
-
+        gen = SpriteGenerator(self.info)
+        if self.autotile:
+            return self._blob_sheet(gen)
+        ts = self.tile_size
+        total_w = self.cols * ts
+        total_h = self.rows * ts
+
+        origin = (0, 0)
+        rng = gen.rng
+        if self.chunk is not None:
+            origin = (self.chunk[0] * total_w, self.chunk[1] * total_h)
+            # Details depend only on (seed, chunk), never on which chunks were generated before
+            rng = random.Random(f"{self.info['seed']}:{self.chunk[0]}:{self.chunk[1]}")
+        noise_args = dict(scale=max(4, ts // 8), wrap=self.wrap, origin=origin)
+        noise_args.update(self.noise)
+        noise = fbm_noise(total_w, total_h, seed=self.info["seed"], **noise_args)
+        arr = gradient_ramp(noise, gen._tile_ramp())
+        p = gen.palette
+        # Sub-grid lines and the per-tile edge highlight, for the whole sheet at once
+        sub = max(ts // 4, 4)
+        ys, xs = np.arange(total_h) % ts, np.arange(total_w) % ts
+        arr[(ys % sub == 0), :] = [max(0, c-30) for c in p[0][:3]]
+        arr[:, (xs % sub == 0)] = [max(0, c-30) for c in p[0][:3]]
+        edge = [min(255, c+40) for c in p[0][:3]]
+        arr[(ys == 0) | (ys == ts-1), :] = edge
+        arr[:, (xs == 0) | (xs == ts-1)] = edge
+        sheet = Image.fromarray(arr.astype(np.uint8), "RGB").convert("RGBA")
+
+        # Per-tile details
+        draw = ImageDraw.Draw(sheet)
+        scale = ts / 64
         for row in range(self.rows):
             for col in range(self.cols):
-                varied_info = dict(self.info)
-                varied_info["seed"] = self.info["seed"] + row*100 + col
-                gen = SpriteGenerator(varied_info)
-                tile = gen._gen_tile().resize((self.tile_size, self.tile_size), Image.LANCZOS)
-                sheet.paste(tile, (col*self.tile_size, row*self.tile_size))
+                ox, oy = col * ts, row * ts
+                for _ in range(rng.randint(1, 4)):
+                    w2, h2 = max(1, int(rng.randint(3, 8) * scale)), max(1, int(rng.randint(3, 8) * scale))
+                    x, y = ox + rng.randint(2, ts - w2 - 3), oy + rng.randint(2, ts - h2 - 3)
+                    draw.rectangle([x, y, x+w2, y+h2], fill=p[rng.randint(1, len(p)-1)][:3])
+
+        if not self.wrap and self.chunk is None:
+            # Grid overlay
+            for r in range(self.rows+1):
+                draw.line([(0, r*ts), (total_w, r*ts)], fill=(255,255,255,40), width=1)
+            for c in range(self.cols+1):
+                draw.line([(c*ts, 0), (c*ts, total_h)], fill=(255,255,255,40), width=1)
+        return sheet
 
-        # Grid overlay
-        draw = ImageDraw.Draw(sheet)
-        for r in range(self.rows+1):
-            draw.line([(0, r*self.tile_size), (total_w, r*self.tile_size)], fill=(255,255,255,40), width=1)
-        for c in range(self.cols+1):
-            draw.line([(c*self.tile_size, 0), (c*self.tile_size, total_h)], fill=(255,255,255,40), width=1)
+    def _blob_sheet(self, gen: SpriteGenerator) -> Image.Image:
+        from scipy.ndimage import binary_erosion
+        ts = self.tile_size
+        b = max(2, ts // 4)
+        noise = fbm_noise(ts, ts, scale=max(4, ts // 8), seed=self.info["seed"], wrap=True)
+        terrain = gradient_ramp(noise, gen._tile_ramp())
+        outline = [max(0, c-50) for c in gen.palette[0][:3]]
+        sheet = np.zeros((self.rows * ts, self.cols * ts, 4), dtype=np.uint8)
+        for i, mask in enumerate(BLOB_MASKS):
+            fill = np.ones((ts, ts), dtype=bool)
+            if not mask & BLOB_N: fill[:b] = False
+            if not mask & BLOB_S: fill[-b:] = False
+            if not mask & BLOB_W: fill[:, :b] = False
+            if not mask & BLOB_E: fill[:, -b:] = False
+            if not mask & BLOB_NE: fill[:b, -b:] = False
+            if not mask & BLOB_SE: fill[-b:, -b:] = False
+            if not mask & BLOB_SW: fill[-b:, :b] = False
+            if not mask & BLOB_NW: fill[:b, :b] = False
+            # Outline only where terrain ends inside the tile, not where it runs on into a neighbour
+            rim = fill & ~binary_erosion(fill, border_value=1)
+            tile = np.zeros((ts, ts, 4), dtype=np.uint8)
+            tile[fill, :3] = terrain[fill]
+            tile[rim, :3] = outline
+            tile[fill, 3] = 255
+            r, c = divmod(i, self.cols)
+            sheet[r*ts:(r+1)*ts, c*ts:(c+1)*ts] = tile
+        return Image.fromarray(sheet, "RGBA")
+
+
+# ─────────────────────────────────────────────
+#  WORLD CHUNKS (unbounded tilemaps)
+# ─────────────────────────────────────────────
+
+WORLD_CHUNK_TILES = 16
 
-        return sheet
+
+class WorldGenerator:
+    """
+    Unbounded terrain streamed as square chunks of tiles. Chunk (cx, cy) is a window
+    of one warped fBm field at pixel origin (cx, cy) * chunk size, so neighbouring
+    chunks join without seams, and each chunk depends only on (seed, cx, cy).
+    """
+
+    def __init__(self, info: dict, chunk_tiles=WORLD_CHUNK_TILES):
+        self.info = dict(info, category="tile")
+        self.info.setdefault("ramp", "palette")
+        self.chunk_tiles = max(1, min(TILEMAP_MAX_CELLS, chunk_tiles))
+        self.tile_size = self.info.get("tile_size", 32)
+        # Terrain features span several tiles, unlike a single floor sheet
+        self.noise = dict(scale=self.tile_size * 4, octaves=5, warp=1.0)
+
+    @property
+    def chunk_px(self) -> int:
+        return self.chunk_tiles * self.tile_size
+
+    @timed("world_chunk")
+    def chunk(self, cx: int, cy: int) -> Image.Image:
+        n = self.chunk_tiles
+        return TilemapGenerator(self.info, n, n, chunk=(cx, cy), noise=self.noise).generate()
 
 
 # ─────────────────────────────────────────────
 #  ANIMATION SPRITE SHEET GENERATOR
 # ─────────────────────────────────────────────
 
+# Parts that ride on another part's transform (a raised arm follows a leaning body)
+PART_PARENTS = {"head": "body", "arm_l": "body", "arm_r": "body"}
+
+# Parts that stay on the ground when the root moves
+GROUNDED_PARTS = ("shadow",)
+
+
+def _part_matrix(pivot, angle=0.0, dx=0.0, dy=0.0, scale=1.0) -> tuple:
+    """Affine (a, b, c, d, e, f): scale and rotate (degrees, clockwise on screen) about pivot, then shift."""
+    c, s = math.cos(math.radians(angle)) * scale, math.sin(math.radians(angle)) * scale
+    px, py = pivot
+    return (c, -s, px + dx - c*px + s*py,
+            s,  c, py + dy - s*px - c*py)
+
+
+def _affine_mul(m, n) -> tuple:
+    """m after n."""
+    return (m[0]*n[0] + m[1]*n[3], m[0]*n[1] + m[1]*n[4], m[0]*n[2] + m[1]*n[5] + m[2],
+            m[3]*n[0] + m[4]*n[3], m[3]*n[1] + m[4]*n[4], m[3]*n[2] + m[4]*n[5] + m[5])
+
+
+def _walk_pose(t, s):
+    ph = 2 * math.pi * t
+    swing = math.sin(ph)
+    return {"root": (0, -abs(swing) * s / 32),
+            "leg_l": (14 * swing, 0, -max(0.0, swing) * s / 24),
+            "leg_r": (-14 * swing, 0, -max(0.0, -swing) * s / 24),
+            "arm_l": (-12 * swing, 0, 0), "arm_r": (-12 * swing, 0, 0),
+            "body": (2 * swing, 0, 0)}
+
+
+def _idle_pose(t, s):
+    breath = math.sin(2 * math.pi * t)
+    return {"root": (0, breath * s / 64),
+            "head": (0, 0, breath * s / 96),
+            "arm_l": (3 * breath, 0, 0), "arm_r": (-3 * breath, 0, 0)}
+
+
+def _attack_pose(t, s):
+    # Wind up overhead, strike down and forward, recover
+    if t < 0.4:
+        k = t / 0.4
+        arm, lunge = -160 * k, -k * s / 32
+    elif t < 0.6:
+        k = (t - 0.4) / 0.2
+        arm, lunge = -160 + 130 * k, (-1 + 3 * k) * s / 32
+    else:
+        k = (t - 0.6) / 0.4
+        arm, lunge = -30 * (1 - k), 2 * (1 - k) * s / 32
+    return {"root": (lunge, 0),
+            "body": (lunge / s * 64, 0, 0),
+            "arm_r": (arm, 0, 0), "arm_l": (abs(arm) / 10, 0, 0),
+            "leg_l": (6 * lunge / s * 32, 0, 0), "leg_r": (-6 * lunge / s * 32, 0, 0)}
+
+
+def _jump_pose(t, s):
+    # Crouch, airborne arc, land; the shadow shrinks as the body rises
+    if t < 0.2 or t >= 0.85:
+        k = math.sin(math.pi * (t / 0.2 if t < 0.2 else (t - 0.85) / 0.15))
+        return {"root": (0, k * s / 24), "arm_l": (20 * k, 0, 0), "arm_r": (-20 * k, 0, 0),
+                "leg_l": (-8 * k, 0, 0), "leg_r": (8 * k, 0, 0)}
+    h = math.sin(math.pi * (t - 0.2) / 0.65)
+    return {"root": (0, -h * s / 6),
+            "arm_l": (110 * h, 0, 0), "arm_r": (-110 * h, 0, 0),
+            "leg_l": (12 * h, 0, -h * s / 32), "leg_r": (-12 * h, 0, -h * s / 32),
+            "shadow": (0, 0, 0, 1 - 0.5 * h)}
+
+
+# cycle name -> pose(t in [0, 1), frame size) -> {part: (angle, dx, dy[, scale]), "root": (dx, dy)}
+ANIMATION_CYCLES = {"walk": _walk_pose, "idle": _idle_pose, "attack": _attack_pose, "jump": _jump_pose}
+ANIMATION_MODES = ("parts", "reseed")
+
+
+def _prompt_cycle(prompt: str):
+    """First cycle named as a whole word in prompt ("jumps", "jumping" count; "jumpsuit" doesn't), else None."""
+    tokens = set(_TOKEN_RE.findall(prompt.lower()))
+    return next((c for c in ANIMATION_CYCLES if tokens & {c, c + "s", c + "ing", c + "ed"}), None)
+
+
+def trim_parts(parts: list) -> list:
+    """[(name, layer, pivot)] -> [(name, cropped layer, pivot, origin)] so poses only resample drawn pixels."""
+    out = []
+    for name, layer, pivot in parts:
+        box = layer.getbbox()
+        if box:
+            out.append((name, layer.crop(box), pivot, box[:2]))
+    return out
+
+
+def _posed_layer(layer: Image.Image, lin: tuple, resample) -> tuple:
+    """layer under the linear map lin -> (resampled image, its offset from the mapped layer origin)."""
+    w, h = layer.size
+    xs = [lin[0]*x + lin[1]*y for x, y in ((0, 0), (w, 0), (0, h), (w, h))]
+    ys = [lin[2]*x + lin[3]*y for x, y in ((0, 0), (w, 0), (0, h), (w, h))]
+    x0, y0 = math.floor(min(xs)), math.floor(min(ys))
+    ow, oh = math.ceil(max(xs)) - x0, math.ceil(max(ys)) - y0
+    det = lin[0]*lin[3] - lin[1]*lin[2]
+    ia, ib, ic, id_ = lin[3]/det, -lin[1]/det, -lin[2]/det, lin[0]/det
+    data = (ia, ib, ia*x0 + ib*y0, ic, id_, ic*x0 + id_*y0)
+    return layer.transform((ow, oh), Image.AFFINE, data, resample=resample), (x0, y0)
+
+
+def _pose_matrices(parts: list, pose: dict) -> dict:
+    """World affine per part name for one pose, following PART_PARENTS."""
+    root = _part_matrix((0, 0), 0, *pose.get("root", (0, 0)))
+    pivots = {p[0]: p[2] for p in parts}
+    out = {}
+    for name, pivot in pivots.items():
+        m = _part_matrix(pivot, *pose.get(name, ()))
+        parent = PART_PARENTS.get(name)
+        while parent in pivots:
+            m = _affine_mul(_part_matrix(pivots[parent], *pose.get(parent, ())), m)
+            parent = PART_PARENTS.get(parent)
+        out[name] = m if name in GROUNDED_PARTS else _affine_mul(root, m)
+    return out
+
+
+def compose_frames(parts: list, size: int, poses: list, resample=Image.NEAREST) -> Image.Image:
+    """
+    Horizontal strip with one frame per pose, alpha-compositing trimmed
+    [(name, layer, pivot, origin)] bottom to top. Parts land on whole pixels, so a
+    layer is only resampled once per distinct rotation/scale across the strip, and
+    each part is composited over the whole strip in one call.
+    """
+    sheet = Image.new("RGBA", (size * len(poses), size), (0, 0, 0, 0))
+    matrices = [_pose_matrices(parts, pose) for pose in poses]
+    for name, layer, pivot, (ox, oy) in parts:
+        plane = Image.new("RGBA", sheet.size, (0, 0, 0, 0))
+        posed = {}
+        for i, frame in enumerate(matrices):
+            m = frame[name]
+            lin = tuple(round(v, 3) for v in (m[0], m[1], m[3], m[4]))
+            if lin == (1, 0, 0, 1):
+                img, (bx, by) = layer, (0, 0)
+            else:
+                if lin not in posed:
+                    posed[lin] = _posed_layer(layer, lin, resample)
+                img, (bx, by) = posed[lin]
+            # Where the layer origin lands, snapped to the pixel grid and clipped to the frame
+            x = round(m[0]*ox + m[1]*oy + m[2]) + bx
+            y = round(m[3]*ox + m[4]*oy + m[5]) + by
+            sx, sy = max(0, -x), max(0, -y)
+            ex, ey = min(img.width, size - x), min(img.height, size - y)
+            if ex <= sx or ey <= sy:
+                continue
+            if (sx, sy, ex, ey) != (0, 0) + img.size:
+                img = img.crop((sx, sy, ex, ey))
+            plane.paste(img, (i * size + x + sx, y + sy))
+        sheet = Image.alpha_composite(sheet, plane)
+    return sheet
+
+
+def compose_parts(parts: list, size: int, pose: dict = None, resample=Image.NEAREST) -> Image.Image:
+    """Single frame of compose_frames."""
+    return compose_frames(parts, size, [pose or {}], resample)
+
+
 class AnimationGenerator:
-    """Generates a horizontal sprite animation sheet (walk cycle etc.)."""
+    """
+    Generates a horizontal sprite animation sheet (walk cycle etc.).
+
+    The sprite is drawn once as part layers (characters get legs, body, arms and head;
+    other categories move as one piece) and every frame is an affine pose of those layers.
+    mode="reseed" keeps the old behaviour of a fresh sprite per frame.
+    """
 
-    def __init__(self, info: dict, frames=8):
+    def __init__(self, info: dict, frames=8, cycle: str = None, mode: str = "parts"):
         self.info = info
         self.frames = frames
         self.frame_size = min(info["size"], 64)
-
+        self.cycle = cycle or _prompt_cycle(info.get("prompt", "")) or "walk"
+        if self.cycle not in ANIMATION_CYCLES:
+            raise ValueError(f"Unknown animation cycle: {cycle} (choose from {', '.join(ANIMATION_CYCLES)})")
+        if mode not in ANIMATION_MODES:
+            raise ValueError(f"Unknown animation mode: {mode}")
+        self.mode = mode
+
+    @timed("animation")
     def generate(self) -> Image.Image:
+        if self.mode == "reseed":
+            return self._generate_reseed()
+        fs = self.frame_size
+        gen = SpriteGenerator(dict(self.info, size=fs))
+        if self.info["category"] == "character":
+            parts = gen.character_parts()
+        else:
+            parts = [("body", gen.render_base(), (fs // 2, fs - 2))]
+        resample = Image.NEAREST if self.info["style"] == "pixel" else Image.BICUBIC
+
+        pose = ANIMATION_CYCLES[self.cycle]
+        sheet = compose_frames(trim_parts(parts), fs,
+                               [pose(i / self.frames, fs) for i in range(self.frames)], resample)
+        # Style post-processing runs on each posed frame so pixel grids and glows stay frame-aligned
+        for i in range(self.frames):
+            box = (i * fs, 0, (i + 1) * fs, fs)
+            sheet.paste(gen.stylize(sheet.crop(box)), box)
+        return sheet
+
+    def _generate_reseed(self) -> Image.Image:
         sheet = Image.new("RGBA", (self.frame_size * self.frames, self.frame_size), (0,0,0,0))
         for i in range(self.frames):
             frame_info = dict(self.info)
@@ -939,30 +2256,212 @@ class AnimationGenerator:
 #  SPRITE ATLAS GENERATOR
 # ─────────────────────────────────────────────
 
+class MaxRectsBin:
+    """MaxRects bin packer (best-short-side-fit) over a fixed-size page."""
+
+    def __init__(self, width: int, height: int, rotate=False):
+        self.width = width
+        self.height = height
+        self.rotate = rotate
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, w: int, h: int):
+        """Place a w×h rect; returns (x, y, rotated) or None if it doesn't fit."""
+        best = None
+        for fx, fy, fw, fh in self.free:
+            for rw, rh, rot in ((w, h, False), (h, w, True)) if self.rotate and w != h else ((w, h, False),):
+                if rw <= fw and rh <= fh:
+                    short, long_ = sorted((fw - rw, fh - rh))
+                    score = (short, long_)
+                    if best is None or score < best[0]:
+                        best = (score, fx, fy, rw, rh, rot)
+        if best is None:
+            return None
+        _, x, y, rw, rh, rot = best
+        self._split(x, y, rw, rh)
+        return x, y, rot
+
+    def _split(self, x, y, w, h):
+        out = []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or x + w <= fx or y >= fy + fh or y + h <= fy:
+                out.append((fx, fy, fw, fh))
+                continue
+            if x > fx:                out.append((fx, fy, x - fx, fh))
+            if x + w < fx + fw:       out.append((x + w, fy, fx + fw - x - w, fh))
+            if y > fy:                out.append((fx, fy, fw, y - fy))
+            if y + h < fy + fh:       out.append((fx, y + h, fw, fy + fh - y - h))
+        # Drop free rects fully contained in another
+        out = list(dict.fromkeys(out))
+        self.free = [a for i, a in enumerate(out)
+                     if not any(i != j and a[0] >= b[0] and a[1] >= b[1]
+                                and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]
+                                for j, b in enumerate(out))]
+
+
+def _next_pot(n: int) -> int:
+    return 1 << max(0, int(n) - 1).bit_length()
+
+
 class AtlasGenerator:
     """Packs multiple generated sprites into a texture atlas with JSON metadata."""
 
-    def __init__(self, items: list):
-        """items: list of (name, PIL.Image)"""
+    def __init__(self, items: list, padding=2, trim=False, rotate=False, pot=False, max_size=2048,
+                 maps=(), palettes=None):
+        """
+        items: list of (name, PIL.Image)
+        trim: crop transparent borders (offsets recorded in spriteSourceSize)
+        rotate: allow 90° clockwise rotation when it packs tighter
+        pot: round page sizes up to powers of two (max_size is then rounded down to one)
+        max_size: largest page edge; overflow spills onto extra pages
+        maps: PBR maps (see PBR_MAPS) to pack as extra pages with the same layout
+        palettes: one palette per item, for the emissive map
+        """
         self.items = items
+        self.padding = padding
+        self.trim = trim
+        self.rotate = rotate
+        self.pot = pot
+        # POT pages grow by doubling, so only a power-of-two limit can be reached exactly
+        self.max_size = 1 << (max(1, int(max_size)).bit_length() - 1) if pot else max_size
+        self.maps = tuple(maps)
+        self.palettes = palettes
+        self._map_tiles = {}
+
+    def _derive_maps(self, images: list) -> list:
+        """PBR maps per image, derived in one call per group of same-size sprites."""
+        out = [None] * len(images)
+        groups = {}
+        for i, img in enumerate(images):
+            groups.setdefault(img.size, []).append(i)
+        for idx in groups.values():
+            pals = [self.palettes[i] for i in idx] if self.palettes else None
+            derived = derive_pbr_maps([images[i] for i in idx], pals, self.maps)
+            for j, i in enumerate(idx):
+                out[i] = {m: Image.fromarray(a[j], PBR_MODES[m]) for m, a in derived.items()}
+        return out
+
+    def _prepare(self) -> list:
+        """Unique-named, optionally trimmed sprites: (name, image, source_size, trim_box)."""
+        seen = {}
+        out = []
+        images = [img.convert("RGBA") for _, img in self.items]
+        derived = self._derive_maps(images) if self.maps else [{}] * len(images)
+        self._map_tiles = {}
+        for (name, _), img, maps in zip(self.items, images, derived):
+            n = seen.get(name, 0)
+            seen[name] = n + 1
+            if n:
+                name = f"{name}_{n+1}"
+            box = (0, 0, img.width, img.height)
+            if self.trim:
+                box = img.getchannel("A").getbbox() or (0, 0, 1, 1)
+            full = box == (0, 0, img.width, img.height)
+            out.append((name, img if full else img.crop(box), img.size, box))
+            self._map_tiles[name] = {m: t if full else t.crop(box) for m, t in maps.items()}
+        for _, img, _, _ in out:
+            if max(img.width, img.height) + 2 * self.padding > self.max_size:
+                raise ValueError(f"Sprite of {img.width}x{img.height} exceeds max atlas size {self.max_size}"
+                                 + (" (pot rounds max_size down to a power of two)" if self.pot else ""))
+        return out
+
+    def _try_pack(self, sprites, w, h):
+        """Pack as many sprites as fit into a w×h page; returns (placements, leftovers)."""
+        pad = self.padding
+        bin_ = MaxRectsBin(w - pad, h - pad, self.rotate)
+        placed, rest = [], []
+        for spr in sprites:
+            img = spr[1]
+            pos = bin_.insert(img.width + pad, img.height + pad)
+            if pos is None:
+                rest.append(spr)
+            else:
+                placed.append((spr, pos[0] + pad, pos[1] + pad, pos[2]))
+        return placed, rest
+
+    def _page_sizes(self, area):
+        side = max(1, math.ceil(math.sqrt(area)))
+        # POT pages start one step down so e.g. 512x256 is tried before 512x512
+        w = h = max(1, _next_pot(side) // 2) if self.pot else side
+        while True:
+            yield min(w, self.max_size), min(h, self.max_size)
+            if w >= self.max_size and h >= self.max_size:
+                return
+            if w <= h:
+                w = w * 2 if self.pot else math.ceil(w * 1.25)
+            else:
+                h = h * 2 if self.pot else math.ceil(h * 1.25)
+
+    @timed("atlas_pack")
+    def pack_pages(self, with_maps=False) -> list:
+        """
+        Returns [(page_image, metadata_dict)], one entry per page; with_maps=True adds a third
+        item, {map: page_image} laid out like the sprite page.
+        """
+        pad = self.padding
+        sprites = sorted(self._prepare(), key=lambda t: (max(t[1].size), t[1].width * t[1].height),
+                         reverse=True)
+        pages = []
+        while sprites:
+            area = sum((img.width + pad) * (img.height + pad) for _, img, _, _ in sprites) + pad
+            for w, h in self._page_sizes(area):
+                placed, rest = self._try_pack(sprites, w, h)
+                if not rest:
+                    break
+            sprites = rest
+            pages.append(placed)
+
+        out = []
+        for idx, placed in enumerate(pages):
+            used_w = max(x + (img.height if rot else img.width) for (_, img, _, _), x, _, rot in placed) + pad
+            used_h = max(y + (img.width if rot else img.height) for (_, img, _, _), _, y, rot in placed) + pad
+            if self.pot:
+                used_w, used_h = _next_pot(used_w), _next_pot(used_h)
+            atlas = Image.new("RGBA", (used_w, used_h), (0, 0, 0, 0))
+            # Unused normal-map texels face straight out, like a flat sprite background
+            map_pages = {m: Image.new(PBR_MODES[m], (used_w, used_h), (127, 127, 255) if m == "normal" else 0)
+                         for m in self.maps}
+            frames = {}
+            for (name, img, src, box), x, y, rot in placed:
+                atlas.paste(img.transpose(Image.ROTATE_270) if rot else img, (x, y))
+                for m, tile in self._map_tiles[name].items():
+                    map_pages[m].paste(tile.transpose(Image.ROTATE_270) if rot else tile, (x, y))
+                frames[name] = {
+                    "frame": {"x": x, "y": y, "w": img.width, "h": img.height},
+                    "rotated": rot,
+                    "trimmed": (img.width, img.height) != tuple(src),
+                    "spriteSourceSize": {"x": box[0], "y": box[1], "w": img.width, "h": img.height},
+                    "sourceSize": {"w": src[0], "h": src[1]},
+                }
+            meta = {
+                "app": "Sprite!",
+                "version": ENGINE_VERSION,
+                "image": "atlas.png" if idx == 0 else f"atlas-{idx}.png",
+                "format": "RGBA8888",
+                "size": {"w": used_w, "h": used_h},
+                "scale": "1",
+            }
+            if len(pages) > 1:
+                meta["related_multi_packs"] = [("atlas.json" if i == 0 else f"atlas-{i}.json")
+                                               for i in range(len(pages)) if i != idx]
+            if self.maps:
+                meta["maps"] = {m: meta["image"][:-4] + f"_{m}.png" for m in self.maps}
+            out.append((atlas, {"frames": frames, "meta": meta}) + ((map_pages,) if with_maps else ()))
+        return out
 
     def pack(self) -> tuple:
-        """Returns (atlas_image, json_metadata_str)."""
+        """
+        Returns (atlas_image, json_metadata_str) in TexturePacker JSON-hash format.
+        Single-page only: raises ValueError if the sprites need more than one page
+        of max_size (use pack_pages() for those).
+        """
         if not self.items:
             return Image.new("RGBA", (64,64)), "{}"
-        max_dim = max(max(img.width, img.height) for _,img in self.items)
-        cols = math.ceil(math.sqrt(len(self.items)))
-        rows = math.ceil(len(self.items)/cols)
-        pad = 2
-        cell = max_dim + pad*2
-        atlas = Image.new("RGBA", (cols*cell, rows*cell), (0,0,0,0))
-        meta = {"frames": {}}
-        for idx, (name, img) in enumerate(self.items):
-            r, c = divmod(idx, cols)
-            x, y = c*cell + pad, r*cell + pad
-            atlas.paste(img.resize((max_dim,max_dim), Image.NEAREST), (x,y))
-            meta["frames"][name] = {"x": x, "y": y, "w": max_dim, "h": max_dim}
-        meta["meta"] = {"size": {"w": atlas.width, "h": atlas.height}, "format": "RGBA8"}
+        pages = self.pack_pages()
+        if len(pages) > 1:
+            raise ValueError(f"{len(self.items)} sprites need {len(pages)} pages of at most "
+                             f"{self.max_size}px; use pack_pages()")
+        atlas, meta = pages[0]
         return atlas, json.dumps(meta, indent=2)
 
 
@@ -986,79 +2485,184 @@ def generate_icon_set(base_info: dict, sizes=(16,32,64,128)):
 #  PALETTE EXTRACTOR / SWAPPER
 # ─────────────────────────────────────────────
 
+_dominant_colors = OrderedDict()
+_dominant_colors_lock = threading.Lock()
+MAX_DOMINANT_COLORS = 256
+
+
 def extract_dominant_colors(img: Image.Image, n=6) -> list:
-    """Quantize to n colors and return palette."""
+    """Quantize to n colors and return palette (cached per image content)."""
+    key = (hashlib.blake2b(img.tobytes(), digest_size=16).digest(), img.mode, img.size, n)
+    with _dominant_colors_lock:
+        colors = _dominant_colors.get(key)
+        if colors is not None:
+            _dominant_colors.move_to_end(key)
+            return list(colors)
     small = img.resize((64,64)).convert("RGB")
     quantized = small.quantize(colors=n, method=Image.Quantize.MEDIANCUT)
     raw_pal = quantized.getpalette()[:n*3]
-    return [(raw_pal[i*3], raw_pal[i*3+1], raw_pal[i*3+2]) for i in range(n)]
-
-
-def swap_palette(img: Image.Image, old_colors: list, new_colors: list, threshold=40) -> Image.Image:
-    """Swap approximate colors in an image."""
-    result = img.copy().convert("RGBA")
-    arr = np.array(result, dtype=np.int32)
-    for old, new in zip(old_colors, new_colors):
-        old = np.array(old[:3], dtype=np.int32)
-        new_c = np.array(new[:3], dtype=np.int32)
-        diff = np.abs(arr[:,:,:3] - old).sum(axis=2)
-        mask = diff < threshold
-        arr[mask, 0] = new_c[0]
-        arr[mask, 1] = new_c[1]
-        arr[mask, 2] = new_c[2]
-    return Image.fromarray(arr.astype(np.uint8), "RGBA")
+    # Images with fewer than n colours get a shorter palette
+    colors = tuple(zip(raw_pal[0::3], raw_pal[1::3], raw_pal[2::3]))
+    with _dominant_colors_lock:
+        _dominant_colors[key] = colors
+        while len(_dominant_colors) > MAX_DOMINANT_COLORS:
+            _dominant_colors.popitem(last=False)
+    return list(colors)
+
+
+def _nearest_colors(colors: np.ndarray, old: np.ndarray, threshold) -> np.ndarray:
+    """
+    For each RGBA colour, the index of the nearest old colour (L1 over RGB), or -1 when
+    none is closer than threshold. Fully transparent colours are never matched.
+    """
+    dist = np.abs(colors[..., None, :3].astype(np.int16) - old).sum(axis=-1)
+    nearest = dist.argmin(axis=-1)
+    close = np.take_along_axis(dist, nearest[..., None], axis=-1)[..., 0] < threshold
+    return np.where(close & (colors[..., 3] > 0), nearest, -1)
+
+
+def _swap_plan(img, old_colors: list, threshold) -> tuple:
+    """
+    (base, match) for swapping img away from old_colors: base is an IndexedImage whose
+    palette rows are matched, or an RGBA array matched per pixel (more than 256 colours).
+    """
+    old = np.array([c[:3] for c in old_colors], dtype=np.int16).reshape(-1, 3)
+    base = img if isinstance(img, IndexedImage) else IndexedImage.from_image(img)
+    if base is None:
+        base = np.array(img.convert("RGBA"))
+    colors = base.palette if isinstance(base, IndexedImage) else base
+    return base, _nearest_colors(colors, old, threshold)
+
+
+def _apply_swap(base, match: np.ndarray, new_colors: list):
+    """One gather of new_colors through a _swap_plan match."""
+    new = np.array([c[:3] for c in new_colors], dtype=np.uint8).reshape(-1, 3)
+    hit = (match >= 0) & (match < len(new))
+    if isinstance(base, IndexedImage):
+        table = base.palette.copy()
+        table[hit, :3] = new[match[hit]]
+        return base.recolor(table)
+    arr = base.copy()
+    arr[hit, :3] = new[match[hit]]
+    return Image.fromarray(arr, "RGBA")
+
+
+@timed("palette_swap")
+def swap_palette(img, old_colors: list, new_colors: list, threshold=40):
+    """
+    Recolour every pixel within threshold (L1 over RGB) of an old colour to the matching new
+    colour; pixels near several old colours take the nearest. Matching runs once per distinct
+    colour for images with at most 256 colours (and IndexedImage). The result has the input's type.
+    """
+    base, match = _swap_plan(img, old_colors, threshold)
+    out = _apply_swap(base, match, new_colors)
+    if isinstance(out, IndexedImage) and not isinstance(img, IndexedImage):
+        return out.to_rgba()
+    return out
+
+
+@timed("palette_variants")
+def palette_variants(img, names=None, threshold=40) -> dict:
+    """
+    {palette name: recoloured img} for each named palette (default: every built-in one).
+    Dominant colours and the colour matching are computed once; each variant is a table gather.
+    """
+    names = list(names or PALETTES)
+    source = img.to_rgba() if isinstance(img, IndexedImage) else img
+    base, match = _swap_plan(img, extract_dominant_colors(source, 6), threshold)
+    return {name: _apply_swap(base, match, get_palette(name)) for name in names}
 
 
 # ─────────────────────────────────────────────
-#  NORMAL MAP GENERATOR
+#  PBR MAPS (normal / emissive / roughness / AO / height)
 # ─────────────────────────────────────────────
 
+PBR_MAPS = ("normal", "emissive", "roughness", "ao", "height")
+PBR_MODES = {"normal": "RGB", "emissive": "RGB", "roughness": "L", "ao": "L", "height": "L"}
+# ITU-R 601 luma, as PIL's "L" conversion
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _blur_stack(arr: np.ndarray, sigma: float) -> np.ndarray:
+    """Gaussian blur over the H, W axes of an (N, H, W[, C]) stack only."""
+    sigmas = (0, sigma, sigma) + (0,) * (arr.ndim - 3)
+    return gaussian_filter(arr, sigma=sigmas)
+
+
+@timed("pbr")
+def derive_pbr_maps(sprites, palettes=None, maps=PBR_MAPS) -> dict:
+    """
+    Derive PBR maps in one float32 pass. Luminance is computed once, and every map shares
+    the same blurred height field.
+    sprites: an image, a list of same-size images, or an (N, H, W, C) uint8 array.
+    palettes: emissive source colours (the first two are used), one palette for every
+    sprite or one per sprite. Only needed for "emissive".
+    Returns {map: image} for a single image, otherwise {map: (N, H, W[, 3]) uint8 array}.
+    """
+    single = isinstance(sprites, Image.Image)
+    if isinstance(sprites, np.ndarray):
+        stack = sprites
+    else:
+        stack = np.stack([np.asarray(im.convert("RGBA")) for im in ([sprites] if single else sprites)])
+    rgb = stack[..., :3].astype(np.float32)
+    out = {}
+
+    if set(maps) & {"normal", "roughness", "ao", "height"}:
+        height = _blur_stack(rgb @ (_LUMA / 255), 1.5)
+    if "normal" in maps:
+        dy, dx = np.gradient(height, axis=(1, 2))
+        strength = 4.0
+        nx, ny = -dx * strength, dy * strength
+        inv = 1 / np.sqrt(nx * nx + ny * ny + 1)
+        out["normal"] = np.stack([(nx * inv + 1) * 127.5, (ny * inv + 1) * 127.5, inv * 255],
+                                 axis=-1).astype(np.uint8)
+    if "roughness" in maps:
+        # sigma 2 blur of luminance = a further sqrt(2² - 1.5²) on the shared height field
+        rough = _blur_stack(height, math.sqrt(1.75))
+        lo = rough.min(axis=(1, 2), keepdims=True)
+        hi = rough.max(axis=(1, 2), keepdims=True)
+        out["roughness"] = ((rough - lo) / (hi - lo + 1e-8) * 255).astype(np.uint8)
+    if "ao" in maps:
+        # Cavities: pixels darker than their wider neighbourhood are occluded
+        cavity = _blur_stack(height, 4.0) - height
+        out["ao"] = ((1 - np.clip(cavity * 4, 0, 1)) * 255).astype(np.uint8)
+    if "height" in maps:
+        out["height"] = np.round(height * 255).astype(np.uint8)
+    if "emissive" in maps:
+        if palettes is None:
+            raise ValueError("The emissive map needs palettes")
+        cols = np.array([[c[:3] for c in pal[:2]] for pal in
+                         ([palettes] if np.ndim(palettes[0]) == 1 else palettes)], dtype=np.float32)
+        cols = np.broadcast_to(cols, (len(stack),) + cols.shape[1:])
+        # The glow is a few flat colours, so blur one mask per colour rather than three channels
+        owner = np.full(rgb.shape[:3], -1, dtype=np.int8)
+        for k in range(cols.shape[1]):
+            owner[np.abs(rgb - cols[:, k, None, None, :]).sum(axis=-1) < 80] = k  # later colours win
+        glow = np.zeros(rgb.shape, dtype=np.float32)
+        for k in range(cols.shape[1]):
+            mask = owner == k
+            if mask.any():
+                glow += _blur_stack(mask.astype(np.float32), 2.0)[..., None] * cols[:, k, None, None, :]
+        out["emissive"] = glow.astype(np.uint8)
+
+    if single:
+        return {m: Image.fromarray(a[0], PBR_MODES[m]) for m, a in out.items()}
+    return out
+
+
 def generate_normal_map(img: Image.Image) -> Image.Image:
     """Generate a normal map from a grayscale heightmap or sprite."""
-    gray = np.array(img.convert("L"), dtype=float) / 255.0
-    smoothed = gaussian_filter(gray, sigma=1.5)
-    # Compute gradients
-    dx = np.gradient(smoothed, axis=1)
-    dy = np.gradient(smoothed, axis=0)
-    # Build normal (R=x, G=y, B=z)
-    strength = 4.0
-    nx = -dx * strength
-    ny = dy * strength
-    nz = np.ones_like(nx)
-    length = np.sqrt(nx**2 + ny**2 + nz**2) + 1e-8
-    nx, ny, nz = nx/length, ny/length, nz/length
-    r = ((nx + 1) / 2 * 255).astype(np.uint8)
-    g = ((ny + 1) / 2 * 255).astype(np.uint8)
-    b = (nz * 255).astype(np.uint8)
-    return Image.fromarray(np.stack([r,g,b], axis=2), "RGB")
+    return derive_pbr_maps(img, maps=("normal",))["normal"]
 
 
-# ─────────────────────────────────────────────
-#  EMISSIVE / ROUGHNESS MAP GENERATORS
-# ─────────────────────────────────────────────
-
 def generate_emissive_map(img: Image.Image, palette: list) -> Image.Image:
     """Highlight bright/accent areas as emissive (glowing) regions."""
-    arr = np.array(img.convert("RGBA"), dtype=np.float32)
-    result = np.zeros((arr.shape[0], arr.shape[1], 3), dtype=np.uint8)
-    for col in palette[:2]:
-        c = np.array(col[:3], dtype=np.float32)
-        diff = np.abs(arr[:,:,:3] - c).sum(axis=2)
-        mask = diff < 80
-        result[mask] = col[:3]
-    # Blur for glow
-    from PIL import ImageFilter
-    out = Image.fromarray(result, "RGB")
-    return out.filter(ImageFilter.GaussianBlur(radius=2))
+    return derive_pbr_maps(img, palette, maps=("emissive",))["emissive"]
 
 
 def generate_roughness_map(img: Image.Image) -> Image.Image:
     """Roughness map: bright = rough, dark = smooth."""
-    gray = img.convert("L")
-    arr = np.array(gray, dtype=np.float32)
-    arr = gaussian_filter(arr, sigma=2)
-    arr = (arr - arr.min()) / (arr.max() - arr.min() + 1e-8) * 255
-    return Image.fromarray(arr.astype(np.uint8), "L")
+    return derive_pbr_maps(img, maps=("roughness",))["roughness"]
 
 
 # ─────────────────────────────────────────────
@@ -1071,161 +2675,813 @@ def upscale_sprite(img: Image.Image, factor=4) -> Image.Image:
     return img.resize((w*factor, h*factor), Image.NEAREST)
 
 
+# ─────────────────────────────────────────────
+#  RESULT CACHE
+# ─────────────────────────────────────────────
+
+class ResultCache:
+    """
+    Content-addressed cache for public API results.
+    Tier 1 is an in-memory LRU bounded by total pickled size; tier 2 is an
+    optional directory of pickles that survives restarts, pruned oldest-first
+    (by mtime, refreshed on disk hits) once it passes max_disk_bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, disk_dir=None, max_disk_bytes=1024 * 2**20):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_bytes = None  # running estimate; None until the first scan
+        self._disk_lock = threading.Lock()
+        self.disk_evictions = 0
+        self._mem = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or bool(self.disk_dir)
+
+    @staticmethod
+    def key(endpoint: str, info: dict, **params) -> str:
+        """Hash of (endpoint, parsed prompt, parameters, engine version, render backend)."""
+        payload = json.dumps([endpoint, info, params, ENGINE_VERSION, RENDER_BACKEND],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".pkl")
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            blob = self._mem.get(key)
+            if blob is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+        if blob is None and self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    blob = f.read()
+            except OSError:
+                blob = None
+            if blob is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                try:
+                    os.utime(self._disk_path(key))
+                except OSError:
+                    pass
+                self._store(key, blob)
+        if blob is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return pickle.loads(blob)
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store(key, blob)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, path)
+            except OSError:
+                return
+            with self._lock:
+                over = self._disk_bytes is None or self._disk_bytes + len(blob) > self.max_disk_bytes
+                if not over:
+                    self._disk_bytes += len(blob)
+            if over:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        """Rescan the disk tier and delete the oldest pickles until it is back
+        under 90% of max_disk_bytes. Other processes sharing the directory are
+        accounted for because the scan measures the files, not our writes."""
+        with self._disk_lock:
+            files = []
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    if not name.endswith(".pkl"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            if total > self.max_disk_bytes:
+                target = self.max_disk_bytes * 0.9
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    removed += 1
+            with self._lock:
+                self._disk_bytes = total
+                self.disk_evictions += removed
+
+    def _store(self, key, blob):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._mem[key] = blob
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._mem.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._mem),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_dir": self.disk_dir,
+                "disk_bytes": self._disk_bytes or 0,
+                "max_disk_bytes": self.max_disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "engine_version": ENGINE_VERSION,
+            }
+
+
+RESULT_CACHE = ResultCache(
+    max_bytes=int(float(os.environ.get("SPRITE_CACHE_MB", 64)) * 2**20),
+    disk_dir=os.environ.get("SPRITE_CACHE_DIR") or None,
+    max_disk_bytes=int(float(os.environ.get("SPRITE_CACHE_DIR_MB", 1024)) * 2**20),
+)
+
+
+CHUNK_CACHE = ResultCache(max_bytes=int(float(os.environ.get("SPRITE_CHUNK_CACHE_MB", 32)) * 2**20))
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    computes, the rest wait and get its result (or exception). Nothing is kept
+    once the call finishes; that is the result cache's job.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn, label="other"):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            METRICS.inc("sprite_singleflight_shared_total", endpoint=label)
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+IN_FLIGHT = SingleFlight()
+
+
+def cached(endpoint: str, cache: ResultCache = None):
+    """
+    Cache a public API function on its parsed prompt and remaining arguments,
+    in RESULT_CACHE unless a dedicated cache is given. Concurrent calls with the
+    same key share one computation (IN_FLIGHT), with or without a cache.
+    """
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        def cache_key(prompt, *args, **kwargs):
+            bound = sig.bind(prompt, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop("prompt")
+            return ResultCache.key(endpoint, parse_prompt(prompt), **params)
+
+        @functools.wraps(fn)
+        def wrapper(prompt, *args, **kwargs):
+            store = cache if cache is not None else RESULT_CACHE
+            key = cache_key(prompt, *args, **kwargs)
+            if store.enabled:
+                result = store.get(key)
+                if result is not None:
+                    return result
+
+            def compute():
+                result = fn(prompt, *args, **kwargs)
+                if store.enabled:
+                    store.put(key, result)  # before the flight ends, so late arrivals hit the cache
+                return result
+            return IN_FLIGHT.do(key, compute, endpoint)
+
+        wrapper.cache_key = cache_key
+        wrapper.endpoint = endpoint
+        return wrapper
+    return decorator
+
+
+# ─────────────────────────────────────────────
+#  PACK PIPELINE (stage DAG)
+# ─────────────────────────────────────────────
+
+class PackPipeline:
+    """
+    The asset pack as a DAG of memoized stages:
+
+        sprite ─┬─ upscaled / normal / emissive / roughness
+        mesh ─┬─ obj / views
+              └─ lods ── glb (+ sprite, normal, emissive, roughness)
+        tilemap, animation, mtl               (independent)
+
+    Every stage also has an encoded "<stage>.png" child. Each stage is computed
+    at most once per pipeline, however many consumers (JSON pack, ZIP, 3D) ask
+    for it, and independent stages can run concurrently via submit()/run().
+    """
+
+    STAGES = {
+        "sprite":    (),
+        "upscaled":  ("sprite",),
+        "pbr":       ("sprite",),
+        "normal":    ("pbr",),
+        "emissive":  ("pbr",),
+        "roughness": ("pbr",),
+        "ao":        ("pbr",),
+        "height":    ("pbr",),
+        "tilemap":   (),
+        "animation": (),
+        "mesh":      (),
+        "obj":       ("mesh",),
+        "mtl":       (),
+        "views":     ("mesh",),
+        "lods":      ("mesh",),
+        "glb":       ("lods", "sprite", "normal", "emissive", "roughness", "ao"),
+    }
+    PNG_MODES = {"sprite": "RGBA", "upscaled": "RGBA", **PBR_MODES, "tilemap": None, "animation": None}
+    # Low-colour stages written as palette PNGs whenever that is lossless
+    INDEXED_PNGS = ("sprite", "upscaled", "animation")
+
+    def __init__(self, info: dict):
+        self.info = info
+        self.palette = get_palette(info["palette"])
+        self._results = {}
+        self._running = {}  # name -> Future for stages being computed
+        self._lock = threading.Lock()
+        self._gen3d = None
+        self._counted = set()  # ids already in nbytes (maps share arrays with "pbr")
+        self.nbytes = 0
+
+    def get(self, name: str):
+        """
+        Return a stage result, computing it (and its dependencies) on first use.
+        Failures reach every caller waiting at the time but are not kept, so a later get() retries.
+        """
+        with self._lock:
+            if name in self._results:
+                return self._results[name]
+            running = self._running.get(name)
+            owner = running is None
+            if owner:
+                running = self._running[name] = Future()
+        if not owner:
+            return running.result()
+        try:
+            result = self._compute(name)
+        except Exception as e:
+            with self._lock:
+                del self._running[name]
+            running.set_exception(e)
+            raise
+        with self._lock:
+            self._results[name] = result
+            del self._running[name]
+            self.nbytes += _nbytes(result, self._counted)
+        running.set_result(result)
+        _trim_pipelines()
+        return result
+
+    def submit(self, names) -> dict:
+        """Start stages on the shared stage pool; returns {name: Future}."""
+        pool = _stage_pool()
+        return {n: pool.submit(self.get, n) for n in names}
+
+    def run(self, names) -> dict:
+        """Compute several stages concurrently and return {name: result}."""
+        return {n: f.result() for n, f in self.submit(names).items()}
+
+    def _compute(self, name):
+        if name.endswith(".png"):
+            stage = name[:-4]
+            return encode_png(self.get(stage), self.PNG_MODES.get(stage), stage in self.INDEXED_PNGS)
+        if name not in self.STAGES:
+            raise KeyError(f"Unknown pack stage: {name}")
+        deps = [self.get(d) for d in self.STAGES[name]]
+        with span("pack." + name):
+            return getattr(self, "_stage_" + name)(*deps)
+
+    def _asset3d(self):
+        with self._lock:
+            if self._gen3d is None:
+                self._gen3d = Asset3DGenerator(self.info)
+            return self._gen3d
+
+    def _stage_sprite(self):
+        return SpriteGenerator(self.info).generate()
+
+    def _stage_upscaled(self, sprite):
+        return upscale_sprite(sprite, 4)
+
+    def _stage_pbr(self, sprite):
+        return derive_pbr_maps(sprite, self.palette)
+
+    def _stage_normal(self, pbr):
+        return pbr["normal"]
+
+    def _stage_emissive(self, pbr):
+        return pbr["emissive"]
+
+    def _stage_roughness(self, pbr):
+        return pbr["roughness"]
+
+    def _stage_ao(self, pbr):
+        return pbr["ao"]
+
+    def _stage_height(self, pbr):
+        return pbr["height"]
+
+    def _stage_tilemap(self):
+        ti = dict(self.info); ti["category"] = "tile"
+        return TilemapGenerator(ti, 4, 4).generate()
+
+    def _stage_animation(self):
+        return AnimationGenerator(self.info, 8).generate()
+
+    def _stage_mesh(self):
+        return self._asset3d().build_mesh()
+
+    def _stage_obj(self, mesh):
+        return self._asset3d().generate_obj(mesh)
+
+    def _stage_mtl(self):
+        return self._asset3d().generate_mtl()
+
+    def _stage_views(self, mesh):
+        return self._asset3d().render_view_pngs(mesh=mesh)
+
+    def _stage_lods(self, mesh):
+        return self._asset3d().build_lods(mesh)
+
+    def _stage_glb(self, lods, sprite, normal, emissive, roughness, ao):
+        maps = {"sprite": sprite, "normal": normal, "emissive": emissive, "roughness": roughness, "ao": ao}
+        return self._asset3d().generate_glb(lods[0], maps, lods)
+
+
+_stage_executor = None
+_pipelines = OrderedDict()
+_pipelines_lock = threading.Lock()
+MAX_PIPELINES = 16
+# Separate from SPRITE_CACHE_MB so stages are still shared with the result cache off
+PIPELINE_MAX_BYTES = int(float(os.environ.get("SPRITE_PIPELINE_MB", 32)) * 2**20)
+
+
+def _nbytes(value, seen: set) -> int:
+    """Approximate memory held by a stage result; objects whose id is in seen count once."""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    elif isinstance(value, Mesh):
+        value = [value.vertices, value.faces, value.material_ids]
+    elif isinstance(value, IndexedImage):
+        value = [value.indices, value.palette]
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v, seen) for v in value)
+    return 0
+
+
+def _trim_pipelines():
+    """
+    Forget the least recently used pipelines until the rest fit in PIPELINE_MAX_BYTES
+    (SPRITE_PIPELINE_MB) and MAX_PIPELINES. Callers still holding one keep using it.
+    """
+    with _pipelines_lock:
+        total = sum(p.nbytes for p in _pipelines.values())
+        while _pipelines and (total > PIPELINE_MAX_BYTES or len(_pipelines) > MAX_PIPELINES):
+            _, pipe = _pipelines.popitem(last=False)
+            total -= pipe.nbytes
+
+
+def _stage_pool() -> ThreadPoolExecutor:
+    global _stage_executor
+    with _pipelines_lock:
+        if _stage_executor is None:
+            _stage_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4),
+                                                 thread_name_prefix="sprite-stage")
+        return _stage_executor
+
+
+def pack_pipeline(prompt: str) -> PackPipeline:
+    """Shared pipeline for a prompt, so pack, ZIP and 3D requests reuse each other's stages."""
+    info = parse_prompt(prompt)
+    key = (json.dumps(info, sort_keys=True), ENGINE_VERSION)
+    with _pipelines_lock:
+        pipe = _pipelines.get(key)
+        if pipe is None:
+            pipe = _pipelines[key] = PackPipeline(info)
+        else:
+            _pipelines.move_to_end(key)
+    _trim_pipelines()
+    return pipe
+
+
+# ─────────────────────────────────────────────
+#  ASSET BUNDLES (binary responses)
+# ─────────────────────────────────────────────
+
+BUNDLE_MAGIC = b"SPRB"
+BUNDLE_VERSION = 1
+BUNDLE_CONTENT_TYPE = "application/x-sprite-bundle"
+
+
+class AssetBundle:
+    """
+    Result of one generation call: JSON-safe metadata plus named binary files.
+    Encodes to the legacy base64-in-JSON shape (to_json), a length-prefixed
+    container (to_container) or multipart/mixed (to_multipart).
+    """
+
+    def __init__(self, kind: str, meta: dict, files: list):
+        """files: list of (filename, content_type, bytes|str)"""
+        self.kind = kind
+        self.meta = meta
+        self.files = [(n, t, d.encode("utf-8") if isinstance(d, str) else d) for n, t, d in files]
+
+    def data(self, name: str) -> bytes:
+        for n, _, d in self.files:
+            if n == name:
+                return d
+        raise KeyError(name)
+
+    @timed("base64")
+    def b64(self, name: str) -> str:
+        return base64.b64encode(self.data(name)).decode()
+
+    def text(self, name: str) -> str:
+        return self.data(name).decode("utf-8")
+
+    def first_image(self):
+        """(filename, bytes) of the primary PNG, or None."""
+        for n, t, d in self.files:
+            if t == "image/png":
+                return n, d
+        return None
+
+    def to_json(self) -> dict:
+        return _JSON_VIEWS[self.kind](self)
+
+    @timed("bundle_encode")
+    def to_container(self) -> bytes:
+        """
+        Length-prefixed container, little-endian:
+          magic "SPRB" | u8 version | u16 entry count
+          per entry: u16 name len, name | u16 type len, type | u32 size, data
+        Entry 0 is always "meta.json".
+        """
+        entries = [("meta.json", "application/json", json.dumps(self.meta).encode("utf-8"))] + self.files
+        out = [BUNDLE_MAGIC, struct.pack("<BH", BUNDLE_VERSION, len(entries))]
+        for name, ctype, data in entries:
+            n, t = name.encode("utf-8"), ctype.encode("ascii")
+            out += [struct.pack("<H", len(n)), n, struct.pack("<H", len(t)), t,
+                    struct.pack("<I", len(data)), data]
+        return b"".join(out)
+
+    @timed("bundle_encode")
+    def to_multipart(self, boundary: str) -> bytes:
+        entries = [("meta.json", "application/json", json.dumps(self.meta).encode("utf-8"))] + self.files
+        out = []
+        for name, ctype, data in entries:
+            out.append((f"--{boundary}\r\nContent-Type: {ctype}\r\n"
+                        f'Content-Disposition: attachment; filename="{name}"\r\n'
+                        f"Content-Length: {len(data)}\r\n\r\n").encode("utf-8"))
+            out.append(data)
+            out.append(b"\r\n")
+        out.append(f"--{boundary}--\r\n".encode("utf-8"))
+        return b"".join(out)
+
+
+def read_container(data: bytes) -> tuple:
+    """Parse a to_container() payload back into (meta, [(name, content_type, bytes)])."""
+    if data[:4] != BUNDLE_MAGIC:
+        raise ValueError("Not a Sprite! bundle")
+    _, count = struct.unpack_from("<BH", data, 4)
+    pos, entries = 7, []
+    for _ in range(count):
+        (n,) = struct.unpack_from("<H", data, pos); pos += 2
+        name = data[pos:pos+n].decode("utf-8"); pos += n
+        (t,) = struct.unpack_from("<H", data, pos); pos += 2
+        ctype = data[pos:pos+t].decode("ascii"); pos += t
+        (size,) = struct.unpack_from("<I", data, pos); pos += 4
+        entries.append((name, ctype, data[pos:pos+size])); pos += size
+    return json.loads(entries[0][2]), entries[1:]
+
+
+def image_bundle(kind: str, filename: str, img: Image.Image, indexed=False, **meta) -> AssetBundle:
+    """Single-image bundle (addon endpoints); indexed=True writes a palette PNG when lossless."""
+    return AssetBundle(kind, meta, [(filename, "image/png", encode_png(img, indexed=indexed))])
+
+
+_JSON_VIEWS = {
+    "sprite": lambda b: {"image_b64": b.b64("sprite.png"), **b.meta},
+    "tilemap": lambda b: {"image_b64": b.b64("tilemap_sheet.png"), **b.meta},
+    "animation": lambda b: {"image_b64": b.b64("animation_sheet.png"), **b.meta},
+    "world_chunk": lambda b: {"image_b64": b.b64(f"chunk_{b.meta['x']}_{b.meta['y']}.png"), **b.meta},
+    "pack": lambda b: {**{m: b.b64(f) for m, f in (("sprite", "sprite.png"), ("normal", "normal_map.png"),
+                                                   ("emissive", "emissive_map.png"),
+                                                   ("roughness", "roughness_map.png"),
+                                                   ("upscaled", "sprite_4x.png"))}, **b.meta},
+    "3d": lambda b: {"obj": b.text("model.obj"), "mtl": b.text("model.mtl"), "glb_b64": b.b64("model.glb"),
+                     "views": {v: b.b64(f"view_{v}.png") for v in ("front", "rear", "left", "top")},
+                     **b.meta},
+    "iconset": lambda b: {"icons": {n[:-4]: base64.b64encode(d).decode() for n, _, d in b.files},
+                          **b.meta},
+    "atlas": lambda b: _atlas_json(b),
+    "normalmap": lambda b: {"normal_b64": b.b64("normal_map.png")},
+    "upscale": lambda b: {"upscaled_b64": b.b64("sprite_4x.png"), **b.meta},
+    "palette_swap": lambda b: {"swapped_b64": b.b64("sprite_recolored.png")},
+    "palette_variants": lambda b: {"variants": {p: b.b64(f"sprite_{p}.png") for p in b.meta["palettes"]},
+                                   **b.meta},
+}
+
+
+def _atlas_json(b: AssetBundle) -> dict:
+    pages = [{"atlas_b64": b.b64(m["meta"]["image"]), "metadata": m,
+              **({"maps_b64": {k: b.b64(f) for k, f in m["meta"]["maps"].items()}} if "maps" in m["meta"] else {})}
+             for m in b.meta["pages"]]
+    out = {**pages[0], "pages": pages} if len(pages) > 1 else dict(pages[0])
+    if "dropped" in b.meta:
+        out["dropped"] = b.meta["dropped"]
+    return out
+
+
+def palette_variants_bundle(img: Image.Image, names=None) -> AssetBundle:
+    """img recoloured into each named palette (default: all of PALETTES) as sprite_<palette>.png files."""
+    variants = palette_variants(img, names)
+    files = [(f"sprite_{name}.png", "image/png",
+              v.encode_png() if isinstance(v, IndexedImage) else encode_png(v))
+             for name, v in variants.items()]
+    return AssetBundle("palette_variants", {"palettes": list(variants)}, files)
+
+
+def atlas_bundle(atlas_gen: "AtlasGenerator") -> AssetBundle:
+    """
+    Bundle every atlas page (atlas.png, atlas-1.png, …) plus any PBR map pages (atlas_normal.png, …);
+    meta["pages"] holds the TexturePacker JSON per page.
+    """
+    pages = atlas_gen.pack_pages(with_maps=True)
+    files = []
+    for img, meta, maps in pages:
+        files.append((meta["meta"]["image"], "image/png", encode_png(img)))
+        files += [(meta["meta"]["maps"][m], "image/png", encode_png(page)) for m, page in maps.items()]
+    return AssetBundle("atlas", {"pages": [meta for _, meta, _ in pages]}, files)
+
+
+def prompt_atlas_bundle(prompts: list, maps=(), layout=None) -> AssetBundle:
+    """
+    Render prompts (on the process pool) and pack them into atlas_bundle pages;
+    layout holds AtlasGenerator options. A prompt that fails to render is left out
+    and listed in meta["dropped"] as {"prompt", "error"}. Raises RuntimeError if a
+    worker crashed or nothing rendered, ValueError for an empty prompt list.
+    """
+    prompts = list(prompts)
+    if not prompts:
+        raise ValueError("No prompts given")
+    images = render_batch(prompts)
+    if WORKER_CRASHED in images:
+        raise RuntimeError("A worker process crashed while rendering the atlas")
+    items = [(p, img) for p, img in zip(prompts, images) if not isinstance(img, str)]
+    dropped = [{"prompt": p, "error": img} for p, img in zip(prompts, images) if isinstance(img, str)]
+    if not items:
+        raise RuntimeError(f"No sprites could be generated: {dropped[0]['error']}")
+    palettes = [get_palette(parse_prompt(p)["palette"]) for p, _ in items]
+    bundle = atlas_bundle(AtlasGenerator(items, maps=maps, palettes=palettes, **(layout or {})))
+    if dropped:
+        bundle.meta["dropped"] = dropped
+    return bundle
+
+
 # ─────────────────────────────────────────────
 #  MAIN PUBLIC API
 # ─────────────────────────────────────────────
 
+def render_sprite(prompt: str, as_array=False):
+    """In-process pipeline: parse prompt → generate sprite → PIL image (or RGBA uint8 array). No encoding."""
+    img = SpriteGenerator(parse_prompt(prompt)).generate()
+    return np.asarray(img.convert("RGBA")) if as_array else img
+
+
+@cached("sprite")
+def sprite_bundle(prompt: str) -> AssetBundle:
+    """Full pipeline: parse prompt → generate sprite → bundle."""
+    return _sprite_bundle_and_pixels(prompt)[0]
+
+
+def _sprite_bundle_and_pixels(prompt: str) -> tuple:
+    """sprite_bundle's work, also returning the rendered (IndexedImage or RGBA image) sprite."""
+    info = parse_prompt(prompt)
+    indexed, img = SpriteGenerator(info).generate_indexed()
+    if indexed is not None:
+        size, png = indexed.size, indexed.encode_png()
+    else:
+        size, png = img.size, encode_png(img)
+    bundle = AssetBundle("sprite", {"info": info, "format": "PNG", "size": f"{size[0]}x{size[1]}"},
+                         [("sprite.png", "image/png", png)])
+    return bundle, indexed if indexed is not None else img
+
+
 def generate_sprite(prompt: str) -> dict:
     """Full pipeline: parse prompt → generate sprite → return result dict."""
-    info = parse_prompt(prompt)
-    gen = SpriteGenerator(info)
-    img = gen.generate()
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return {
-        "image_b64": base64.b64encode(buf.read()).decode(),
-        "info": info,
-        "format": "PNG",
-        "size": f"{img.width}x{img.height}",
-    }
+    return sprite_bundle(prompt).to_json()
+
+
+@cached("3d")
+def asset3d_bundle(prompt: str) -> AssetBundle:
+    """Full 3D pipeline: parse → GLB + OBJ + MTL + multi-view renders."""
+    pipe = pack_pipeline(prompt)
+    stages = pipe.run(["glb", "lods", "obj", "mtl", "views"])
+    files = [("model.glb", "model/gltf-binary", stages["glb"]),
+             ("model.obj", "text/plain", stages["obj"]), ("model.mtl", "text/plain", stages["mtl"])]
+    files += [(f"view_{v}.png", "image/png", png) for v, png in stages["views"].items()]
+    lods = [{"level": i, "triangles": len(m.faces), "vertices": len(m.vertices)}
+            for i, m in enumerate(stages["lods"])]
+    return AssetBundle("3d", {"info": pipe.info, "lods": lods}, files)
 
 
 def generate_3d_asset(prompt: str) -> dict:
-    """Full 3D pipeline: parse → OBJ + MTL + multi-view renders."""
-    info = parse_prompt(prompt)
-    gen3d = Asset3DGenerator(info)
-    obj_str = gen3d.generate_obj()
-    mtl_str = gen3d.generate_mtl()
-    views = gen3d.render_views()
-    return {
-        "obj": obj_str,
-        "mtl": mtl_str,
-        "views": views,
-        "info": info,
-    }
+    """Full 3D pipeline: parse → GLB + OBJ + MTL + multi-view renders."""
+    return asset3d_bundle(prompt).to_json()
 
 
-def generate_tilemap(prompt: str, cols=4, rows=4) -> dict:
-    """Generate a tilemap sheet."""
+@cached("tilemap")
+def tilemap_bundle(prompt: str, cols=4, rows=4, wrap=False, autotile=False) -> AssetBundle:
+    """Generate a tilemap sheet (or the 47-tile blob autotile set)."""
     info = parse_prompt(prompt)
     info["category"] = "tile"
-    gen = TilemapGenerator(info, cols, rows)
+    gen = TilemapGenerator(info, cols, rows, wrap, autotile)
     img = gen.generate()
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return {
-        "image_b64": base64.b64encode(buf.read()).decode(),
-        "width": img.width,
-        "height": img.height,
-        "cols": cols,
-        "rows": rows,
-        "tile_size": gen.tile_size,
-    }
+    meta = {"width": img.width, "height": img.height, "cols": gen.cols, "rows": gen.rows,
+            "tile_size": gen.tile_size, "wrap": wrap}
+    if autotile:
+        # Tile i of the sheet (row-major) is BLOB_MASKS[i]; blob_index[mask] looks it up for any neighbour mask
+        meta.update(autotile="blob47", blob_masks=BLOB_MASKS, blob_index=BLOB_INDEX)
+    return AssetBundle("tilemap", meta, [("tilemap_sheet.png", "image/png", encode_png(img))])
+
+
+def generate_tilemap(prompt: str, cols=4, rows=4, wrap=False, autotile=False) -> dict:
+    """Generate a tilemap sheet."""
+    return tilemap_bundle(prompt, cols, rows, wrap, autotile).to_json()
+
+
+@cached("world_chunk", CHUNK_CACHE)
+def world_chunk_bundle(prompt: str, x=0, y=0, chunk_tiles=WORLD_CHUNK_TILES) -> AssetBundle:
+    """One chunk of the unbounded world for a prompt; chunks cache in their own LRU (CHUNK_CACHE)."""
+    world = WorldGenerator(parse_prompt(prompt), chunk_tiles)
+    img = world.chunk(x, y)
+    meta = {"x": x, "y": y, "chunk_tiles": world.chunk_tiles, "tile_size": world.tile_size,
+            "width": img.width, "height": img.height,
+            "origin_px": [x * world.chunk_px, y * world.chunk_px]}
+    return AssetBundle("world_chunk", meta, [(f"chunk_{x}_{y}.png", "image/png", encode_png(img))])
+
+
+def generate_world_chunk(prompt: str, x=0, y=0, chunk_tiles=WORLD_CHUNK_TILES) -> dict:
+    """One chunk of the unbounded world for a prompt."""
+    return world_chunk_bundle(prompt, x, y, chunk_tiles).to_json()
 
 
-def generate_animation(prompt: str, frames=8) -> dict:
+@cached("animation")
+def animation_bundle(prompt: str, frames=8, cycle=None, mode="parts") -> AssetBundle:
     """Generate animation sprite sheet."""
     info = parse_prompt(prompt)
-    gen = AnimationGenerator(info, frames)
+    gen = AnimationGenerator(info, frames, cycle, mode)
     img = gen.generate()
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return {
-        "image_b64": base64.b64encode(buf.read()).decode(),
-        "frames": frames,
-        "frame_width": gen.frame_size,
-        "frame_height": gen.frame_size,
-    }
+    meta = {"frames": frames, "frame_width": gen.frame_size, "frame_height": gen.frame_size,
+            "cycle": gen.cycle, "mode": gen.mode}
+    return AssetBundle("animation", meta, [("animation_sheet.png", "image/png", encode_png(img, indexed=True))])
 
 
-def generate_full_pack(prompt: str) -> dict:
-    """Generate a full asset pack: sprite, normal map, emissive, roughness, animation sheet."""
-    info = parse_prompt(prompt)
-    palette = get_palette(info["palette"])
+def generate_animation(prompt: str, frames=8, cycle=None, mode="parts") -> dict:
+    """Generate animation sprite sheet."""
+    return animation_bundle(prompt, frames, cycle, mode).to_json()
 
-    # Base sprite
-    gen = SpriteGenerator(info)
-    sprite = gen.generate()
 
-    # Extra maps
-    normal  = generate_normal_map(sprite)
-    emissive = generate_emissive_map(sprite, palette)
-    roughness = generate_roughness_map(sprite)
-    upscaled = upscale_sprite(sprite, 4)
+@cached("pack")
+def pack_bundle(prompt: str) -> AssetBundle:
+    """Generate a full asset pack: sprite, normal map, emissive, roughness, 4x upscale."""
+    pipe = pack_pipeline(prompt)
+    files = PACK_FILES[:5]
+    pngs = pipe.run([stage for _, stage in files])
+    return AssetBundle("pack", {"info": pipe.info},
+                       [(name, "image/png", pngs[stage]) for name, stage in files])
 
-    def img_b64(img, mode="RGBA"):
-        buf = io.BytesIO()
-        img.convert(mode).save(buf, "PNG")
-        buf.seek(0)
-        return base64.b64encode(buf.read()).decode()
 
-    return {
-        "sprite":    img_b64(sprite),
-        "normal":    img_b64(normal, "RGB"),
-        "emissive":  img_b64(emissive, "RGB"),
-        "roughness": img_b64(roughness, "L"),
-        "upscaled":  img_b64(upscaled),
-        "info": info,
-    }
+def generate_full_pack(prompt: str) -> dict:
+    """Generate a full asset pack: sprite, normal map, emissive, roughness, animation sheet."""
+    return pack_bundle(prompt).to_json()
 
 
-def build_download_zip(prompt: str, include_3d=True) -> bytes:
-    """Build a complete downloadable ZIP with all assets."""
+@cached("iconset")
+def iconset_bundle(prompt: str, sizes=(16,32,64,128)) -> AssetBundle:
+    """One icon rendered at several sizes."""
     info = parse_prompt(prompt)
-    palette = get_palette(info["palette"])
-
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        # 2D Sprite
-        gen = SpriteGenerator(info)
-        sprite = gen.generate()
-        sb = io.BytesIO(); sprite.save(sb, "PNG"); sb.seek(0)
-        zf.writestr("sprite.png", sb.read())
-
-        # Upscaled
-        up = upscale_sprite(sprite, 4)
-        ub = io.BytesIO(); up.save(ub, "PNG"); ub.seek(0)
-        zf.writestr("sprite_4x.png", ub.read())
-
-        # Normal map
-        nm = generate_normal_map(sprite)
-        nb = io.BytesIO(); nm.save(nb, "PNG"); nb.seek(0)
-        zf.writestr("normal_map.png", nb.read())
-
-        # Emissive
-        em = generate_emissive_map(sprite, palette)
-        eb = io.BytesIO(); em.save(eb, "PNG"); eb.seek(0)
-        zf.writestr("emissive_map.png", eb.read())
-
-        # Roughness
-        rm = generate_roughness_map(sprite)
-        rb = io.BytesIO(); rm.save(rb, "PNG"); rb.seek(0)
-        zf.writestr("roughness_map.png", rb.read())
-
-        # Tilemap
-        ti = dict(info); ti["category"] = "tile"
-        tgen = TilemapGenerator(ti, 4, 4)
-        tmap = tgen.generate()
-        tb = io.BytesIO(); tmap.save(tb, "PNG"); tb.seek(0)
-        zf.writestr("tilemap_sheet.png", tb.read())
-
-        # Animation sheet
-        agen = AnimationGenerator(info, 8)
-        anim = agen.generate()
-        ab = io.BytesIO(); anim.save(ab, "PNG"); ab.seek(0)
-        zf.writestr("animation_sheet.png", ab.read())
-
-        # 3D OBJ + MTL
-        if include_3d:
-            gen3d = Asset3DGenerator(info)
-            zf.writestr("model.obj", gen3d.generate_obj())
-            zf.writestr("model.mtl", gen3d.generate_mtl())
-
-        # README
-        readme = f"""# Sprite! Asset Pack
+    icons = generate_icon_set(info, tuple(sizes))
+    return AssetBundle("iconset", {"info": info},
+                       [(f"{sz}.png", "image/png", encode_png(img, indexed=True)) for sz, img in icons.items()])
+
+
+def generate_iconset(prompt: str, sizes=(16,32,64,128)) -> dict:
+    """One icon at several sizes as {"icons": {size: b64}, "info"}."""
+    return iconset_bundle(prompt, sizes).to_json()
+
+
+PACK_FILES = [
+    ("sprite.png", "sprite.png"),
+    ("sprite_4x.png", "upscaled.png"),
+    ("normal_map.png", "normal.png"),
+    ("emissive_map.png", "emissive.png"),
+    ("roughness_map.png", "roughness.png"),
+    ("ao_map.png", "ao.png"),
+    ("height_map.png", "height.png"),
+    ("tilemap_sheet.png", "tilemap.png"),
+    ("animation_sheet.png", "animation.png"),
+]
+
+
+def _zip_entries(prompt: str, include_3d=True):
+    """Yield (filename, data) for every file of the download pack in order, as each stage finishes."""
+    pipe = pack_pipeline(prompt)
+    info = pipe.info
+    files = PACK_FILES + ([("model.glb", "glb"), ("model.obj", "obj"), ("model.mtl", "mtl")]
+                          if include_3d else [])
+    # Start every stage up front; entries are emitted in order as their stage completes
+    futures = pipe.submit([stage for _, stage in files])
+    for filename, stage in files:
+        yield filename, futures[stage].result()
+
+    # README
+    readme = f"""# Sprite! Asset Pack
 Prompt: "{prompt}"
 Category: {info['category']}
 Style: {info['style']}
@@ -1238,24 +3494,323 @@ Seed: {info['seed']}
 - normal_map.png      — Normal map (for lighting)
 - emissive_map.png    — Emissive/glow map
 - roughness_map.png   — PBR roughness map
+- ao_map.png          — Ambient occlusion map
+- height_map.png      — Height map (for parallax/displacement)
 - tilemap_sheet.png   — 4x4 tile sheet
 - animation_sheet.png — 8-frame animation strip
+- model.glb           — 3D mesh (LOD0–LOD3) + PBR materials with embedded maps (binary glTF)
 - model.obj           — 3D mesh (Wavefront OBJ)
 - model.mtl           — Material definitions
 
 ## Engine Import
-- Unity: drag .png into Assets, .obj into scene
+- Unity: drag .png into Assets, .glb (glTFast) or .obj into scene
 - Unreal: import via Content Browser
 - Godot: drag into FileSystem dock
 - GameMaker: Sprite → Import from file
 
 Generated by Sprite! — Game Asset Generator by Shivani
 """
-        zf.writestr("README.md", readme)
+    yield "README.md", readme
 
-    buf.seek(0)
-    return buf.read()
 
+class _ZipSink:
+    """Unseekable write target for ZipFile; written bytes are collected until drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _stream_zip(prompt: str, include_3d=True):
+    """Yield the pack as ZIP bytes, one chunk per finished entry. PNGs are stored, text is deflated."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in _zip_entries(prompt, include_3d):
+            compress = zipfile.ZIP_STORED if name.endswith(".png") else zipfile.ZIP_DEFLATED
+            zf.writestr(name, data, compress_type=compress)
+            yield sink.drain()
+    yield sink.drain()
+
+
+@cached("zip")
+def build_download_zip(prompt: str, include_3d=True) -> bytes:
+    """Build a complete downloadable ZIP with all assets."""
+    return b"".join(_stream_zip(prompt, include_3d))
+
+
+ZIP_SPOOL_BYTES = 2**20  # streamed ZIPs kept for the cache move from memory to a temp file past this
+
+
+def iter_download_zip(prompt: str, include_3d=True):
+    """
+    Streaming form of build_download_zip: yields ZIP bytes as each asset is ready.
+    Serves from the result cache when possible and fills it once the stream completes;
+    the copy kept for that is spooled to a temp file rather than held in memory.
+    """
+    key = build_download_zip.cache_key(prompt, include_3d) if RESULT_CACHE.enabled else None
+    hit = RESULT_CACHE.get(key) if key else None
+    if hit is not None:
+        yield hit
+        return
+    if key is None:
+        yield from _stream_zip(prompt, include_3d)
+        return
+    with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_BYTES) as spool:
+        for chunk in _stream_zip(prompt, include_3d):
+            spool.write(chunk)
+            yield chunk
+        if spool.tell() <= RESULT_CACHE.max_bytes or RESULT_CACHE.disk_dir:
+            spool.seek(0)
+            RESULT_CACHE.put(key, spool.read())
+
+
+# ─────────────────────────────────────────────
+#  BATCH GENERATION (process pool)
+# ─────────────────────────────────────────────
+
+_process_pool = None
+_process_pool_size = 0
+_process_pool_lock = threading.Lock()
+WORKER_CRASHED = "worker process crashed"
+_worker_caches = {}  # pid -> {"result": stats, "chunk": stats}, as of that worker's last task
+_worker_caches_lock = threading.Lock()
+
+
+def process_pool(workers=None) -> ProcessPoolExecutor:
+    """
+    Shared worker-process pool. `workers` sizes it when it is created (default:
+    the previous pool's size, else the core count); later callers share that pool whatever they pass, so
+    mixed callers never rebuild it. Call shutdown_process_pool() to resize.
+    """
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        if _process_pool is None:
+            # A pool replaced after a crash or keyword registration keeps the previous size
+            _process_pool_size = workers or _process_pool_size or os.cpu_count() or 4
+            # spawn, not fork: callers (e.g. the server) may already be running threads
+            _process_pool = ProcessPoolExecutor(max_workers=_process_pool_size,
+                                                mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_pool_worker,
+                                                initargs=(list(_prompt_extra),))
+        return _process_pool
+
+
+def _init_pool_worker(prompt_extra):
+    """Pool initializer: spawned workers re-import this module, so replay the parent's registered keywords."""
+    global _prompt_index
+    _prompt_extra[:] = prompt_extra
+    _prompt_index = PromptIndex(PROMPT_VOCAB, _prompt_extra)
+
+
+def shutdown_process_pool(wait=True):
+    """Stop the shared pool (waiting for queued work by default)."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    with _worker_caches_lock:
+        _worker_caches.clear()
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def _drop_broken_pool(pool):
+    """Forget a pool whose worker died, unless another caller has already replaced it."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return
+        _process_pool = None
+    with _worker_caches_lock:
+        _worker_caches.clear()
+
+
+def _pool_task(fn, args):
+    """Process-pool side of submit_to_pool: the result, the stage timings it produced and this worker's cache stats."""
+    result = fn(*args)
+    caches = {"result": RESULT_CACHE.stats(), "chunk": CHUNK_CACHE.stats()}
+    return result, METRICS.drain(), (os.getpid(), caches)
+
+
+def submit_to_pool(fn, *args, workers=None) -> Future:
+    """
+    Run fn(*args) on the process pool. Stage timings recorded in the worker are
+    merged into this process's METRICS when it finishes, so /api/metrics sees them;
+    the worker's cache stats are kept for cache_stats(). If a worker dies the
+    future fails with BrokenProcessPool and the next call gets a fresh pool.
+    """
+    outer = Future()
+    pool = process_pool(workers)
+
+    def done(inner):
+        try:
+            result, series, (pid, caches) = inner.result()
+        except BaseException as e:
+            if isinstance(e, BrokenProcessPool):
+                _drop_broken_pool(pool)
+            outer.set_exception(e)
+            return
+        METRICS.merge(series)
+        with _worker_caches_lock:
+            _worker_caches[pid] = caches
+        outer.set_result(result)
+    try:
+        inner = pool.submit(_pool_task, fn, args)
+    except BrokenProcessPool:
+        # Broke between our process_pool() call and the submit; retry once on its replacement
+        _drop_broken_pool(pool)
+        pool = process_pool(workers)
+        inner = pool.submit(_pool_task, fn, args)
+    inner.add_done_callback(done)
+    return outer
+
+
+def cache_stats(name="result") -> dict:
+    """
+    Stats of RESULT_CACHE ("result") or CHUNK_CACHE ("chunk") summed over this
+    process and every pool worker that has reported back. Each process has its
+    own memory tier, so bytes and entries add up; the disk tier is shared, so
+    disk_bytes is the largest figure any process has seen.
+    """
+    own = (RESULT_CACHE if name == "result" else CHUNK_CACHE).stats()
+    with _worker_caches_lock:
+        workers = [caches[name] for caches in _worker_caches.values()]
+    out = dict(own, processes=1 + len(workers))
+    for w in workers:
+        for k in ("entries", "bytes", "hits", "disk_hits", "misses", "evictions", "disk_evictions"):
+            out[k] += w[k]
+        out["disk_bytes"] = max(out["disk_bytes"], w["disk_bytes"])
+    lookups = out["hits"] + out["disk_hits"] + out["misses"]
+    out["hit_rate"] = round((out["hits"] + out["disk_hits"]) / lookups, 4) if lookups else 0.0
+    return out
+
+
+def _batch_sprite(prompt):
+    """Process-pool task: one uncached sprite bundle."""
+    return sprite_bundle.__wrapped__(prompt)
+
+
+def _batch_sprite_pixels(prompt):
+    """Process-pool task for batches with maps: the bundle plus the sprite's (H, W, 4) RGBA array."""
+    bundle, sprite = _sprite_bundle_and_pixels(prompt)
+    if isinstance(sprite, IndexedImage):
+        return bundle, sprite.palette[sprite.indices]
+    return bundle, np.asarray(sprite.convert("RGBA"))
+
+
+def _fan_out(fn, items: list, workers=None) -> list:
+    """Run fn over items on the process pool; returns [(ok, value_or_error_str)] in input order."""
+    if len(items) <= 1 or workers == 1:
+        out = []
+        for item in items:
+            try:
+                out.append((True, fn(item)))
+            except Exception as e:
+                out.append((False, f"{type(e).__name__}: {e}"))
+        return out
+    futures = [submit_to_pool(fn, item, workers=workers) for item in items]
+    out = []
+    for fut in futures:
+        try:
+            out.append((True, fut.result()))
+        except BrokenProcessPool:
+            # submit_to_pool has already dropped the broken pool
+            out.append((False, WORKER_CRASHED))
+        except Exception as e:
+            out.append((False, f"{type(e).__name__}: {e}"))
+    return out
+
+
+def generate_batch(prompts: list, workers=None, maps=()) -> list:
+    """
+    Generate sprites for many prompts in parallel.
+    Returns one entry per prompt, in input order: {"prompt", "image_b64", "info"}
+    or {"prompt", "error"} if that prompt failed. maps (see PBR_MAPS) adds a
+    "<map>_b64" PNG per entry, derived in one call per sprite size.
+    """
+    prompts = list(prompts)
+    results = [None] * len(prompts)
+    keys = [None] * len(prompts)
+    todo = []
+    for i, p in enumerate(prompts):
+        try:
+            keys[i] = sprite_bundle.cache_key(p)
+            hit = RESULT_CACHE.get(keys[i]) if RESULT_CACHE.enabled else None
+        except Exception as e:
+            results[i] = (False, f"{type(e).__name__}: {e}")
+            continue
+        if hit is not None:
+            results[i] = (True, hit)
+        else:
+            todo.append(i)
+
+    pixels = [None] * len(prompts)  # RGBA arrays of fresh renders, when maps are wanted
+    task = _batch_sprite_pixels if maps else _batch_sprite
+    for i, (ok, value) in zip(todo, _fan_out(task, [prompts[i] for i in todo], workers)):
+        if ok and maps:
+            value, pixels[i] = value
+        results[i] = (ok, value)
+        if ok and RESULT_CACHE.enabled:
+            RESULT_CACHE.put(keys[i], value)
+
+    out = []
+    for p, (ok, value) in zip(prompts, results):
+        if ok:
+            out.append({"prompt": p, "image_b64": value.b64("sprite.png"), "info": value.meta["info"]})
+        else:
+            out.append({"prompt": p, "error": value})
+    if maps:
+        _batch_maps(out, results, pixels, tuple(maps))
+    return out
+
+
+def _batch_maps(entries: list, results: list, pixels: list, maps: tuple):
+    """
+    Add "<map>_b64" to each successful batch entry, one derive_pbr_maps call per sprite size.
+    Fresh renders come with their pixels; only cache hits have to decode sprite.png.
+    """
+    groups = {}
+    for entry, (ok, value), arr in zip(entries, results, pixels):
+        if not ok:
+            continue
+        if arr is None:
+            arr = np.asarray(Image.open(io.BytesIO(value.data("sprite.png"))).convert("RGBA"))
+        groups.setdefault(arr.shape, []).append((entry, arr))
+    for group in groups.values():
+        derived = derive_pbr_maps(np.stack([arr for _, arr in group]),
+                                  [get_palette(e["info"]["palette"]) for e, _ in group], maps)
+        for j, (entry, _) in enumerate(group):
+            for m, arr in derived.items():
+                png = encode_png(Image.fromarray(arr[j], PBR_MODES[m]))
+                entry[f"{m}_b64"] = base64.b64encode(png).decode()
+
+
+def render_batch(prompts: list, workers=None, as_array=False) -> list:
+    """
+    In-process counterpart of generate_batch: returns a PIL image (or array) per
+    prompt, in input order, or an error string for prompts that failed.
+    """
+    fn = _render_array if as_array else render_sprite
+    return [value for _, value in _fan_out(fn, list(prompts), workers)]
+
+
+def _render_array(prompt):
+    return render_sprite(prompt, as_array=True)
 
 if __name__ == "__main__":
     # Quick test